@@ -0,0 +1,129 @@
+"""
+Bulk loading of tables to the postgres database with the COPY FROM STDIN
+command (see DB_LOADING_METHOD in config). Rows are serialized to the CSV
+format in memory and streamed to the database in batches, which is much
+faster than INSERT statements sent by 'DataFrame.to_sql' by default -
+especially for the messages_all_words table, containing one row per word
+occurrence.
+"""
+
+import io
+import csv
+import itertools
+
+import pandas as pd
+
+from typing import Callable, Dict, Iterable, Optional, Union
+from sqlalchemy import Engine, Connection, BigInteger, Boolean, DateTime, Float, Integer, SmallInteger, Text
+from sqlalchemy.types import TypeEngine
+from config.config import DB_LOADING_METHOD
+
+# Number of rows sent by a single COPY command - it limits size of the
+# CSV buffer kept in memory
+_COPY_BATCH_SIZE = 100000
+
+
+class _Null(float):
+    """
+    Marker of missing values. The csv module doesn't quote numbers when
+    QUOTE_NONNUMERIC is used, so missing values are written as unquoted \\N,
+    while strings (including empty ones and '\\N') are always quoted.
+    """
+
+    def __str__(self) -> str:
+        return "\\N"
+
+    __repr__ = __str__
+
+
+_NULL = _Null()
+
+
+def get_sql_types(tab: pd.DataFrame) -> Dict[str, TypeEngine]:
+    """
+    Get SQL types of the columns of the table, derived from their pandas
+    types in the same way as 'DataFrame.to_sql' does, but without looking
+    at values - e.g. column of strings containing only missing values is
+    still a TEXT column.
+
+    :param tab: table to load as pandas DataFrame
+    :return: dictionary containing names of the columns as keys and
+        SQLAlchemy types as values
+    """
+
+    res = {}
+    for col_name, col_type in tab.dtypes.items():
+        if pd.api.types.is_bool_dtype(col_type):
+            res[col_name] = Boolean()
+        elif pd.api.types.is_integer_dtype(col_type):
+            if col_type.name in ("int8", "uint8", "int16"):
+                res[col_name] = SmallInteger()
+            elif col_type.name in ("uint16", "int32"):
+                res[col_name] = Integer()
+            else:
+                res[col_name] = BigInteger()
+        elif pd.api.types.is_float_dtype(col_type):
+            res[col_name] = Float(precision=23 if col_type.name == "float32" else 53)
+        elif pd.api.types.is_datetime64_any_dtype(col_type):
+            res[col_name] = DateTime(timezone=isinstance(col_type, pd.DatetimeTZDtype))
+        else:
+            res[col_name] = Text()
+
+    return res
+
+
+def copy_from_stdin(pd_table, conn: Connection, keys: list, data_iter: Iterable[tuple]) -> int:
+    """
+    Insertion method for 'DataFrame.to_sql' (its 'method' parameter), which
+    streams rows with the COPY FROM STDIN command. It requires the psycopg2
+    driver.
+
+    :param pd_table: pandas SQLTable object describing the target table
+    :param conn: SQLAlchemy connection
+    :param keys: names of the columns
+    :param data_iter: iterable of rows (None in place of missing values)
+    :return: number of loaded rows
+    """
+
+    preparer = conn.dialect.identifier_preparer
+    table_name = preparer.quote(pd_table.name)
+    if pd_table.schema is not None:
+        table_name = "{0}.{1}".format(preparer.quote_schema(pd_table.schema), table_name)
+    copy_statement = "COPY {0} ({1}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+        table_name, ", ".join(preparer.quote(key) for key in keys)
+    )
+
+    rows = (tuple(_NULL if val is None else val for val in row) for row in data_iter)
+    res = 0
+    with conn.connection.cursor() as cursor:
+        while True:
+            batch = list(itertools.islice(rows, _COPY_BATCH_SIZE))
+            if not batch:
+                break
+
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(copy_statement, buffer)
+            res += len(batch)
+
+    return res
+
+
+def get_insertion_method(db_engine: Union[Engine, Connection]) -> Optional[Callable]:
+    """
+    Get insertion method for 'DataFrame.to_sql' according to the
+    DB_LOADING_METHOD. COPY is used only with the postgres database
+    connected by the psycopg2 driver.
+
+    :param db_engine: db engine or connection
+    :return: insertion method or None (INSERT statements)
+    """
+
+    if DB_LOADING_METHOD not in ("copy", "insert"):
+        raise ValueError("Unknown DB loading method: '{0}'".format(DB_LOADING_METHOD))
+
+    if DB_LOADING_METHOD == "copy" and db_engine.dialect.name == "postgresql" and db_engine.dialect.driver == "psycopg2":
+        return copy_from_stdin
+
+    return None
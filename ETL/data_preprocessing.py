@@ -1,27 +1,269 @@
 """
 Tools responsible for conducting preprocessing of the data - it transforms
-raw .csv files to pandas table ready to load to the database.
+raw data files (.csv, Parquet or Arrow IPC, see RAW_DATA_FORMAT) to pandas
+table ready to load to the database.
 """
 
 import os
-import re
+import time
 import numpy as np
 
 import pandas as pd
 import logging.config
 
-from datetime import datetime
-from typing import Dict, List, Tuple
-from config.config import OUTPUT_FILES
-from nltk.stem import PorterStemmer
-
-# Format in which date will be stored in the Postgres database
-_DATE_FORMAT = "%Y-%m-%d"
+from contextlib import ExitStack
+from pandas.io.parsers import TextFileReader
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from config.config import HEADERS, RAW_DATA_FORMAT, NEAREST_MERGE_METHOD
+from common.compact_schema import compact_table
+from common.time_features import get_time_features, to_local_datetime, format_dates
+from ETL.merge_ancestry import find_nearest_merges
+from ETL.raw_data_files import get_raw_data_file_name, read_columnar_table, ColumnarChunkReader, \
+    CSV_SEPARATOR, CSV_QUOTING
+from ETL.stem_cache import get_stem_cache
+
+# ASCII characters removed from commit messages during tokenization - all
+# except lowercase letters, spaces and line breaks
+_NON_WORD_CHARS = bytes(
+    c for c in range(128)
+    if not (ord("a") <= c <= ord("z") or c in (ord(" "), ord("\n")))
+)
 
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
 logger = logging.getLogger("consoleLogger")
 
 
+# Types of columns of raw .csv files. Text columns are read as strings even
+# if they look like numbers (e.g. author name consisting of digits), identities
+# are read directly as categoricals (see common.compact_schema)
+_RAW_DATA_DTYPES = {
+    "commit_hash": str,
+    "merge_hash": str,
+    "merge_unix_time": np.int64,
+    "author_email": "category",
+    "author_name": "category",
+    "commit_unix_time": np.int64,
+    "commiter_email": "category",
+    "commiter_name": "category",
+    "commit_message": str,
+    "insertions": np.int64,
+    "deletions": np.int64,
+    "parent_hashes": str
+}
+
+
+class RepoRawDataset:
+    """
+    Raw data of single repository shared by all the providers. Each raw
+    table is read from the file only once, when it's needed for the
+    first time, and kept in memory afterwards in the compact representation
+    (see common.compact_schema). The same applies to the
+    join of commits general info with insertions and deletions, which is
+    used both by the general info table and by the authors summary.
+    """
+
+    def __init__(
+            self,
+            raw_data_path: str,
+            raw_tables: Optional[Dict[str, pd.DataFrame]] = None,
+            nearest_merges: Optional[pd.DataFrame] = None
+    ):
+        """
+        Create an instance of the class
+
+        :param raw_data_path: path to directory where raw data
+            files are stored
+        :param raw_tables: raw data tables (chunk of the history in the
+            streaming mode) with keys the same as in the OUTPUT_FILES
+            dictionary. If provided, files are not read and
+            'raw_data_path' is used only to determine repo name
+        :param nearest_merges: nearest merges of commits (see
+            'get_nearest_merges') found for the whole history, used when
+            raw tables contain only a chunk of it
+        """
+        self.raw_data_path = raw_data_path
+        self.repo_name = os.path.basename(raw_data_path)
+        self._tables = {
+            file_type: compact_table(tab) for file_type, tab in raw_tables.items()
+        } if raw_tables is not None else {}
+        self._commits_with_insertions_deletions = None
+        self._nearest_merges = nearest_merges
+
+    def get_file_path(self, file_type: str) -> str:
+        """
+        Get path to the raw data file of given type.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :return: path to the file
+        """
+        return os.path.join(self.raw_data_path, get_raw_data_file_name(file_type, RAW_DATA_FORMAT))
+
+    def _read_table(self, file_type: str) -> pd.DataFrame:
+        """
+        Read single raw table from the file and log time of reading and
+        memory usage of the table. Files in .csv format are parsed using
+        explicit types of columns, columnar files are memory mapped and
+        only columns of the table are read.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :return: table as pandas DataFrame
+        """
+
+        start = time.perf_counter()
+        if RAW_DATA_FORMAT == "csv":
+            res = pd.read_csv(
+                self.get_file_path(file_type),
+                sep=CSV_SEPARATOR, quoting=CSV_QUOTING, header=0,
+                dtype={col: _RAW_DATA_DTYPES.get(col) for col in HEADERS.get(file_type)}
+            )
+        else:
+            res = read_columnar_table(
+                self.get_file_path(file_type), RAW_DATA_FORMAT, columns=HEADERS.get(file_type)
+            )
+        res = compact_table(res)
+
+        logger.info(
+            "Table '{0}' of repo '{1}' loaded in {2:.2f}s: {3} rows, {4:.2f} MB".format(
+                file_type, self.repo_name, time.perf_counter() - start,
+                len(res), res.memory_usage(deep=True).sum() / 1024 ** 2
+            )
+        )
+
+        return res
+
+    def get_table(self, file_type: str) -> pd.DataFrame:
+        """
+        Get single raw table, reading it from disk if it wasn't read yet.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :return: table as pandas DataFrame
+        """
+
+        if file_type not in self._tables:
+            self._tables[file_type] = self._read_table(file_type)
+
+        return self._tables[file_type]
+
+    def _read_next_chunk(self, reader: Iterator[pd.DataFrame], file_type: str, chunk_size: int) -> pd.DataFrame:
+        """
+        Read next chunk of the raw table.
+
+        :param reader: reader created by 'pd.read_csv' with 'iterator' option
+            or ColumnarChunkReader
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :param chunk_size: maximum number of rows to read
+        :return: chunk as pandas DataFrame, empty if the whole file was read
+        """
+
+        try:
+            res = reader.get_chunk(chunk_size)
+        except StopIteration:
+            res = pd.DataFrame(columns=HEADERS.get(file_type))
+
+        return res
+
+    def _open_chunk_reader(self, file_type: str) -> Union[TextFileReader, ColumnarChunkReader]:
+        """
+        Open reader returning subsequent chunks of the raw table.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :return: reader, which should be used as a context manager
+        """
+
+        if RAW_DATA_FORMAT == "csv":
+            return pd.read_csv(
+                self.get_file_path(file_type),
+                sep=CSV_SEPARATOR, quoting=CSV_QUOTING, header=0, iterator=True,
+                dtype={col: _RAW_DATA_DTYPES.get(col) for col in HEADERS.get(file_type)}
+            )
+
+        return ColumnarChunkReader(self.get_file_path(file_type), RAW_DATA_FORMAT, columns=HEADERS.get(file_type))
+
+    def iter_chunks(self, chunk_size: Callable[[], int]) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Read raw tables describing commits (all except merges info) in chunks,
+        without loading whole files to memory. Files are written in the same
+        order of commits, so their subsequent rows are read together. Order
+        is verified using commits hashes.
+
+        Insertions and deletions file can contain headers only (if diff
+        stats were not extracted) - chunks of this table are empty in such case.
+
+        :param chunk_size: function returning number of commits which should
+            be read in the next chunk (it can change between chunks)
+        :return: generator of dictionaries containing tables, with keys the
+            same as in the OUTPUT_FILES dictionary (except 'merges_info')
+        """
+
+        file_types = ["commits_hashes", "commits_info", "commits_messages", "insertions_deletions"]
+        with ExitStack() as stack:
+            readers = {
+                file_type: stack.enter_context(self._open_chunk_reader(file_type))
+                for file_type in file_types
+            }
+
+            while True:
+                next_chunk_size = chunk_size()
+                res = {
+                    file_type: self._read_next_chunk(reader, file_type, next_chunk_size)
+                    for file_type, reader in readers.items()
+                }
+
+                commits_hashes = res.get("commits_hashes").commit_hash
+                if commits_hashes.empty:
+                    return
+
+                for file_type, tab in res.items():
+                    if file_type == "insertions_deletions" and tab.empty:
+                        continue
+                    if not commits_hashes.equals(tab.commit_hash):
+                        raise ValueError(
+                            "Order of commits in raw table '{0}' of repo '{1}' is different than in "
+                            "list of commits, it can't be read in chunks".format(file_type, self.repo_name)
+                        )
+
+                yield res
+
+    def get_commits_with_insertions_deletions(self) -> pd.DataFrame:
+        """
+        Get commits general info joined with number of insertions and
+        deletions. Join is made only once.
+
+        :return: joined table as pandas DataFrame
+        """
+
+        if self._commits_with_insertions_deletions is None:
+            self._commits_with_insertions_deletions = self.get_table("commits_info").merge(
+                self.get_table("insertions_deletions"),
+                how="left", on="commit_hash"
+            )
+
+        return self._commits_with_insertions_deletions
+
+    def get_nearest_merges(self) -> Optional[pd.DataFrame]:
+        """
+        Get nearest merge of each commit found using ancestry of commits
+        (see ETL.merge_ancestry). Merges are found only once.
+
+        :return: table containing commit_hash, merge_hash and merge_unix_time
+            columns or None, if NEAREST_MERGE_METHOD is not 'ancestry'
+        """
+
+        if NEAREST_MERGE_METHOD != "ancestry":
+            return None
+
+        if self._nearest_merges is None:
+            start = time.perf_counter()
+            self._nearest_merges = find_nearest_merges(
+                self.get_table("commits_parents"), self.get_table("merges_info")
+            )
+            logger.info("Nearest merges of {0} commits of repo '{1}' found in {2:.2f}s".format(
+                len(self._nearest_merges), self.repo_name, time.perf_counter() - start)
+            )
+
+        return self._nearest_merges
+
+
 class GeneralTableProvider:
     """
     Class responsible for generating 'general table', storing all
@@ -47,75 +289,29 @@ class GeneralTableProvider:
     - nearest_merge_hash - hash of nearest merge
     """
 
-    def __init__(self, raw_data_path: str):
+    def __init__(self, raw_data_path: str, dataset: Optional[RepoRawDataset] = None):
         """
         Create an instance of the class
 
         :param raw_data_path: path to directory where raw data
             are stored in the .csv format
+        :param dataset: raw dataset of the repository shared with other
+            providers. If not provided, a new one is created for
+            'raw_data_path'
         """
         self.raw_data_path = raw_data_path
-
-    def _load_required_data(self) -> Dict[str, pd.DataFrame]:
-        """
-        Load all raw dataset from provided directory, using OUTPUT_FILES
-        specification from config.
-
-        :return: dictionary containing tables stored as pandas DataFrames
-        """
-        res = {
-            file_type: pd.read_csv(
-                os.path.join(self.raw_data_path, file_name),
-                sep=";", header=0
-            )
-            for file_type, file_name in OUTPUT_FILES.items()
-        }
-
-        return res
-
-    @staticmethod
-    def _get_date_details(df_row: pd.Series) -> Dict[str, object]:
-        """
-        Retrieve all date details from unix timestamp, including:
-            - date in provided format (%Y-%m-%d recommended)
-            - year
-            - month
-            - day
-            - day of week
-            - hour
-
-        It will be returned as dictionary, which will allow to
-        use this function inside the 'apply' method and directly
-        merge this information to the source DataFrame as additional
-        columns
-
-        :param df_row: row of the general info DataFrame
-        :return: dictionary containing date's details
-        """
-        dt_object = datetime.fromtimestamp(df_row["commit_unix_time"])
-        res = {
-            "date_str": dt_object.strftime(_DATE_FORMAT),
-            "commit_year": dt_object.year,
-            "commit_month": dt_object.month,
-            "commit_month_day": dt_object.day,
-            "commit_week_day": dt_object.isoweekday(),
-            "commit_hour": dt_object.hour
-        }
-
-        return res
+        self.dataset = dataset if dataset is not None else RepoRawDataset(raw_data_path)
 
     def _append_date_details(self, general_info_tab: pd.DataFrame) -> pd.DataFrame:
         """
-        Append date details to the general info table
+        Append date details (see 'get_time_features') to the general info table.
+        They are calculated for the whole timestamp column at once.
 
         :param general_info_tab: general info table
         :return: input DataFrame with date details appended
         """
 
-        dates_details = general_info_tab.apply(
-            lambda x: self._get_date_details(x),
-            axis='columns', result_type='expand'
-        )
+        dates_details = get_time_features(general_info_tab.commit_unix_time)
 
         res = pd.concat([general_info_tab, dates_details], axis='columns')
         return res
@@ -127,7 +323,8 @@ class GeneralTableProvider:
     ) -> pd.DataFrame:
         """
         Append info about nearest future merge (hash of the merge and timestamp)
-        to the general info table.
+        to the general info table - the first merge made after the commit
+        ('timestamp' method of finding nearest merges).
 
         :param general_info_tab: table containing general info
         :param merge_info_tab: table containing merge info
@@ -146,6 +343,32 @@ class GeneralTableProvider:
         res = general_info_tab.merge(merges_info_filled, how="left", on="commit_unix_time")
         return res
 
+    @staticmethod
+    def append_merges_info(
+            general_info_tab: pd.DataFrame,
+            merge_info_tab: pd.DataFrame,
+            nearest_merges_tab: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Append info about nearest merge (hash of the merge and timestamp) to
+        the general info table, using method set as NEAREST_MERGE_METHOD.
+
+        :param general_info_tab: table containing general info
+        :param merge_info_tab: table containing merge info
+        :param nearest_merges_tab: table containing nearest merges found
+            using ancestry of commits, required by the 'ancestry' method
+        :return: general info tab with nearest merge details joined
+        """
+
+        if NEAREST_MERGE_METHOD == "ancestry":
+            res = general_info_tab.merge(nearest_merges_tab, how="left", on="commit_hash")
+        elif NEAREST_MERGE_METHOD == "timestamp":
+            res = GeneralTableProvider._append_merges_info(general_info_tab, merge_info_tab)
+        else:
+            raise ValueError("Unknown nearest merge method: '{0}'".format(NEAREST_MERGE_METHOD))
+
+        return res
+
     def get_general_info_table(self) -> pd.DataFrame:
         """
         Provide DataFrame with general info about commits. The process contains a few
@@ -157,31 +380,34 @@ class GeneralTableProvider:
         repo_name = os.path.basename(self.raw_data_path)
         logger.info("Preparing general info tab for repo '{0}'".format(repo_name))
 
-        logger.info("Reading raw data from .csv files")
-        raw_data_all_tables = self._load_required_data()
+        # Join with insertions and deletions is shared with the authors summary,
+        # columns are reordered afterwards, so the table has the same structure
+        # as if insertions and deletions were joined at the end
+        commits_tab = self.dataset.get_commits_with_insertions_deletions()
 
         logger.info("Appending date details")
-        general_tab_dates_append = self._append_date_details(
-            raw_data_all_tables.get("commits_info")
-        )
+        general_tab_dates_append = self._append_date_details(commits_tab)
 
         logger.info("Joining messages")
         general_tab_messages_append = general_tab_dates_append.merge(
-            raw_data_all_tables.get("commits_messages"),
-            how="left", on="commit_hash"
-        )
-
-        logger.info("Joining insertions and deletions info")
-        general_tab_insertions_deletions_append = general_tab_messages_append.merge(
-            raw_data_all_tables.get("insertions_deletions"),
+            self.dataset.get_table("commits_messages"),
             how="left", on="commit_hash"
         )
+        insertions_deletions_cols = [
+            col for col in HEADERS.get("insertions_deletions") if col != "commit_hash"
+        ]
+        general_tab_messages_append = general_tab_messages_append[
+            [col for col in general_tab_messages_append.columns if col not in insertions_deletions_cols]
+            + insertions_deletions_cols
+        ]
 
         logger.info("Appending merge info")
-        res = self._append_merges_info(
-            general_tab_insertions_deletions_append,
-            raw_data_all_tables.get("merges_info")
+        general_tab_merges_append = self.append_merges_info(
+            general_tab_messages_append,
+            self.dataset.get_table("merges_info"),
+            self.dataset.get_nearest_merges()
         )
+        res = compact_table(general_tab_merges_append)
 
         return res
 
@@ -194,29 +420,65 @@ class AuthorsSummaryTableProvider:
     for analysis and dashboard.
     """
 
-    def __init__(self, raw_data_path: str):
+    def __init__(self, raw_data_path: str, dataset: Optional[RepoRawDataset] = None):
         """
         Create an instance of the class
 
         :param raw_data_path: path to directory where raw data
             are stored in the .csv format
+        :param dataset: raw dataset of the repository shared with other
+            providers. If not provided, a new one is created for
+            'raw_data_path'
         """
         self.raw_data_path = raw_data_path
+        self.dataset = dataset if dataset is not None else RepoRawDataset(raw_data_path)
 
-    def _load_required_data(self) -> Dict[str, pd.DataFrame]:
+    def get_partial_authors_summary(self) -> pd.DataFrame:
         """
-        Load tables containing general info and number of insertions / deletions
+        Aggregate activity of authors - number of commits, insertions and
+        deletions, first and last commit date. Aggregates can be merged
+        with 'merge_partial_authors_summaries', so in the streaming mode the
+        summary is calculated chunk by chunk.
 
-        :return: dictionary containing tables stored as pandas DataFrames
+        :return: DataFrame containing author_email, author_name, number_of_insertions,
+            number_of_deletions, number_of_commits, min_date and max_date columns
         """
-        res = {
-            file_type: pd.read_csv(
-                os.path.join(self.raw_data_path, file_name),
-                sep=";", header=0
-            )
-            for file_type, file_name in OUTPUT_FILES.items()
-            if file_type in ["commits_info", "insertions_deletions"]
-        }
+
+        # Shared join is not modified, date column is added to a copy
+        df_insertions_deletions_joined = self.dataset.get_commits_with_insertions_deletions().assign(
+            commit_date=lambda df: to_local_datetime(df.commit_unix_time)
+        )
+
+        res = df_insertions_deletions_joined.groupby(
+            ["author_email", "author_name"], observed=True
+        ).agg(
+            number_of_insertions=("insertions", "sum"),
+            number_of_deletions=("deletions", "sum"),
+            number_of_commits=("commit_hash", "count"),
+            min_date=("commit_date", "min"),
+            max_date=("commit_date", "max")
+        ).reset_index()
+
+        return res
+
+    @staticmethod
+    def merge_partial_authors_summaries(summaries: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Merge partial summaries calculated for separate parts of the history.
+
+        :param summaries: list of tables returned by 'get_partial_authors_summary'
+        :return: summary of the whole history covered by the input tables
+        """
+
+        res = pd.concat(summaries).groupby(
+            ["author_email", "author_name"], observed=True
+        ).agg(
+            number_of_insertions=("number_of_insertions", "sum"),
+            number_of_deletions=("number_of_deletions", "sum"),
+            number_of_commits=("number_of_commits", "sum"),
+            min_date=("min_date", "min"),
+            max_date=("max_date", "max")
+        ).reset_index()
 
         return res
 
@@ -240,29 +502,24 @@ class AuthorsSummaryTableProvider:
         repo_name = os.path.basename(self.raw_data_path)
         logger.info("Preparing commits authors stats tab for repo '{0}'".format(repo_name))
 
-        input_data = self._load_required_data()
-        df_insertions_deletions_joined = input_data.get(
-            "commits_info"
-        ).merge(
-            input_data.get("insertions_deletions"),
-            how="left", on="commit_hash"
-        )
+        summary = self.get_partial_authors_summary()
+        res = self.finalize_authors_summary(summary)
 
-        ### Add column containing date
-        df_insertions_deletions_joined["commit_date"] = \
-            df_insertions_deletions_joined.commit_unix_time.apply(
-                lambda x: datetime.fromtimestamp(x)
-            )
+        return res
 
-        summary = df_insertions_deletions_joined.groupby(
-            ["author_email", "author_name"]
-        ).agg(
-            number_of_insertions=("insertions", "sum"),
-            number_of_deletions=("deletions", "sum"),
-            number_of_commits=("commit_hash", "count"),
-            min_date=("commit_date", "min"),
-            max_date=("commit_date", "max")
-        ).reset_index()
+    @staticmethod
+    def finalize_authors_summary(summary: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate derived columns of the authors summary table - ratio of
+        insertions to deletions and number of days of activity - and
+        transform dates to strings. It is also used when the summary is
+        recalculated in the database during incremental loads.
+
+        :param summary: DataFrame containing author_email, author_name,
+            number_of_insertions, number_of_deletions, number_of_commits,
+            min_date and max_date (of datetime64 type) columns
+        :return: final summary table as pandas DataFrame
+        """
 
         res = summary.assign(
             insertions_deletions_ratio=summary.number_of_insertions / summary.number_of_deletions
@@ -273,8 +530,8 @@ class AuthorsSummaryTableProvider:
         res["days_of_activity"] = res.max_date - res.min_date
         res["days_of_activity"] = res["days_of_activity"].dt.days + 1  # Retrieve days from timedelta object, add one because in case of
                                                                        # single commit we would get 0
-        res["min_date"] = res.min_date.apply(lambda x: x.strftime(_DATE_FORMAT))
-        res["max_date"] = res.max_date.apply(lambda x: x.strftime(_DATE_FORMAT))
+        res["min_date"] = format_dates(res.min_date)
+        res["max_date"] = format_dates(res.max_date)
 
         # In cases when number of deletions is queal to zero we will
         # replace Inf with max value + 1 (to indicate that the ratio
@@ -292,60 +549,66 @@ class CommitMessagesStatsProvider:
     about words statistics in commit messages.
     """
 
-    def __init__(self, raw_data_path: str):
+    def __init__(self, raw_data_path: str, dataset: Optional[RepoRawDataset] = None):
         """
         Create an instance of the class
 
         :param raw_data_path: path to directory where raw data
             are stored in the .csv format
+        :param dataset: raw dataset of the repository shared with other
+            providers. If not provided, a new one is created for
+            'raw_data_path'
         """
         self.raw_data_path = raw_data_path
-
-    def _load_required_data(self) -> pd.DataFrame:
-        """
-        Load table containing commit messages.
-
-        :return: commit messages table as pandas DataFrame
-        """
-        file_path = os.path.join(
-            self.raw_data_path, OUTPUT_FILES.get("commits_messages")
-        )
-        res = pd.read_csv(
-            file_path, sep=";", header=0
-        )
-
-        return res
+        self.dataset = dataset if dataset is not None else RepoRawDataset(raw_data_path)
 
     @staticmethod
-    def _preprocess_words(words: List[str]) -> List[str]:
+    def _tokenize_messages(messages: pd.Series) -> pd.Series:
         """
-        Take a list of words from commit message, transform each word
-        to lowercase, get rid of signs which are not characters
-        (numbers, series of special characters, etc.) and words shorter than
-        4 letters ('a', 'an', 'and', 'for', etc.)
-
-        :param words: list of words (effect of sentence.split(" ") operation)
-        :return: list containing preprocessed and filtered words
+        Split commit messages into single words (by spaces), transform them
+        to lowercase, get rid of signs which are not characters (numbers,
+        series of special characters, etc.) and words shorter than 4 letters
+        ('a', 'an', 'and', 'for', etc.).
+
+        Instead of processing each word separately, all the messages are
+        joined into a single text (one message per line), which is lowercased
+        and cleaned at once. Characters other than letters and spaces are
+        removed before splitting, which gives the same words as removing them
+        from each word separately - e.g. "Don't" results in "dont", not in "don".
+        Boundaries of words are then found with numpy, so Python strings are
+        created only for words which are kept.
+
+        :param messages: series containing commit messages
+        :return: series of words with index of messages they come from
         """
 
-        words_lowercase = [w.lower() for w in words]
-        # Get rid of all special characters and numbers
-        special_chars_numbers_excluded = [
-            re.sub('[^a-z]', '', w)
-            for w in words_lowercase
+        # Line breaks would be removed anyway, we need them as messages separators
+        text = "\n".join(m.replace("\n", "") for m in messages.astype(str)).lower()
+        # Non-ASCII characters can't be latin letters a-z, so they are dropped
+        # during encoding, then all remaining signs except letters, spaces
+        # and line breaks are deleted
+        text_cleaned = text.encode("ascii", errors="ignore").translate(None, _NON_WORD_CHARS)
+
+        buffer = np.frombuffer(text_cleaned, dtype=np.uint8)
+        is_line_break = buffer == ord("\n")
+        separators = np.flatnonzero(is_line_break | (buffer == ord(" ")))
+        starts = np.concatenate(([0], separators + 1))
+        ends = np.concatenate((separators, [len(buffer)]))
+        # Number of message for each word - number of line breaks before it
+        messages_positions = np.concatenate(([0], np.cumsum(is_line_break[separators])))
+
+        to_keep = ends - starts > 3
+        text_cleaned = text_cleaned.decode("ascii")
+        words = [
+            text_cleaned[start:end]
+            for start, end in zip(starts[to_keep].tolist(), ends[to_keep].tolist())
         ]
 
-        short_words_excluded = list(
-            filter(
-                lambda x: len(x) > 3,
-                special_chars_numbers_excluded
-            )
-        )
-
-        return short_words_excluded
+        res = pd.Series(words, index=messages.index[messages_positions[to_keep]], dtype=object)
+        return res
 
     @staticmethod
-    def _stem_words(words: List[str]) -> List[str]:
+    def _stem_words(words: pd.Series) -> pd.Series:
         """
         In order to improve word frequency analysis we will create additional
         column with words stems. For example, simple grouping will treat 'strings'
@@ -360,11 +623,36 @@ class CommitMessagesStatsProvider:
         time-consuming. We decided that to achieve goal of this analysis stemming will be
         sufficient.
 
-        :param words: list of words to stem
-        :return: list of stemmed words
+        Vocabulary of commit messages is small and highly repetitive, so each
+        distinct word is stemmed only once (see ETL.stem_cache) and stems are
+        mapped back to all the occurrences.
+
+        :param words: series of words to stem
+        :return: series of stemmed words
         """
-        ps = PorterStemmer()
-        res = [ps.stem(w) for w in words]
+        stems = get_stem_cache().get_stems(words.unique())
+        res = words.map(stems)
+        return res
+
+    @staticmethod
+    def merge_words_counts(words_counts: List[pd.DataFrame], word_col_name: str, freq_col_name: str) -> pd.DataFrame:
+        """
+        Merge words frequency tables calculated for separate parts of the
+        history (chunks in the streaming mode, or old and new commits in the
+        incremental mode).
+
+        :param words_counts: list of words frequency tables
+        :param word_col_name: name of column containing words
+        :param freq_col_name: name of column containing frequencies
+        :return: merged words frequency table
+        """
+
+        res = pd.concat(
+            [words_count[[word_col_name, freq_col_name]] for words_count in words_counts]
+        ).groupby(word_col_name, observed=True).agg(
+            **{freq_col_name: (freq_col_name, "sum")}
+        ).reset_index()
+
         return res
 
     def get_output_tables(self) -> Dict[str, pd.DataFrame]:
@@ -396,35 +684,26 @@ class CommitMessagesStatsProvider:
         repo_name = os.path.basename(self.raw_data_path)
         logger.info("Preparing messages stats tables for repo '{0}'".format(repo_name))
 
-        messages_tab = self._load_required_data()
-
-        # Split messages into single words
-        words_lists = messages_tab.commit_message.map(
-            lambda x: str(x).split(" ")
-        )
+        messages_tab = self.dataset.get_table("commits_messages")
 
-        words_preprocessed = words_lists.apply(
-            lambda x: self._preprocess_words(x)
-        )
-        words_stemmed = words_preprocessed.apply(
-            lambda x: self._stem_words(x)
+        # Messages which contained only numbers and special characters
+        # don't produce any words
+        all_words_tab = compact_table(
+            pd.DataFrame(
+                {
+                    "raw_word": self._tokenize_messages(messages_tab.commit_message)
+                }
+            )
         )
+        # Words are categorical, so only their categories are mapped to stems
+        all_words_tab["stemmed_word"] = self._stem_words(all_words_tab.raw_word)
+        all_words_tab = compact_table(all_words_tab)
 
-        all_words_tab = pd.DataFrame(
-            {
-                "raw_word": words_preprocessed,
-                "stemmed_word": words_stemmed
-            }
-        ).explode(
-            ["raw_word", "stemmed_word"]  # Explode words list to tabular form
-        ).dropna()  # After preprocessing some of the messages might have produced empty lists
-                    # if they contained only numbers and special characters
-
-        raw_words_count = all_words_tab.groupby("raw_word").agg(
+        raw_words_count = all_words_tab.groupby("raw_word", observed=True).agg(
             raw_word_freq=("raw_word", "count")
         ).reset_index()
 
-        stemmed_words_count = all_words_tab.groupby("stemmed_word").agg(
+        stemmed_words_count = all_words_tab.groupby("stemmed_word", observed=True).agg(
             stemmed_word_freq=("stemmed_word", "count")
         ).reset_index()
 
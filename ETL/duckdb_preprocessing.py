@@ -0,0 +1,348 @@
+"""
+Preprocessing backend running transformations of raw data as SQL queries
+in DuckDB - embedded, multithreaded, columnar engine. It produces the same
+tables as the pandas providers (see ETL.data_preprocessing):
+    - joins of commits info with messages, insertions / deletions and
+        nearest merges ('timestamp' method is an ASOF join)
+    - authors summary
+    - words of commit messages (tokenization, the same rules as in
+        CommitMessagesStatsProvider) and their frequencies
+
+Parquet files are scanned by DuckDB directly, Arrow IPC files are memory
+mapped and scanned without copying. Text of .csv files is parsed by pandas
+(with its quoting rules, which DuckDB doesn't accept), so results don't
+depend on the backend. Steps which can't be expressed in SQL - stemming of
+words (shared cache) and finding nearest merges using ancestry of commits
+(graph traversal) - are still done in Python, only on distinct words and
+on the commits graph.
+
+duckdb package is required only by this backend.
+"""
+
+import os
+import time
+
+import pandas as pd
+import logging.config
+
+from types import TracebackType
+from typing import Dict, Optional, Type
+from config.config import HEADERS, RAW_DATA_FORMAT, NEAREST_MERGE_METHOD, PREPROCESSING_MEMORY_BUDGET_MB, DUCKDB_THREADS
+from common.compact_schema import compact_table
+from common.time_features import get_time_features, to_local_datetime
+from ETL.data_preprocessing import RepoRawDataset, AuthorsSummaryTableProvider
+from ETL.raw_data_files import read_arrow_table
+from ETL.stem_cache import get_stem_cache
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+# Types of columns of raw tables in DuckDB, all the remaining ones are strings
+_SQL_TYPES = {
+    "merge_unix_time": "BIGINT",
+    "commit_unix_time": "BIGINT",
+    "insertions": "BIGINT",
+    "deletions": "BIGINT"
+}
+
+# Words of commit messages with number of message (row of commits messages
+# table) they come from. Rules are the same as in
+# 'CommitMessagesStatsProvider._tokenize_messages' - line breaks are removed,
+# text is lowercased, all signs except latin letters and spaces are deleted
+# and words shorter than 4 letters are skipped. There is no sorting - DuckDB
+# preserves insertion order of rows, so words are in the original order
+_ALL_WORDS_QUERY = """
+    WITH messages_words AS (
+        SELECT
+            rowid AS message_number,
+            string_split(
+                regexp_replace(lower(replace(commit_message, chr(10), '')), '[^a-z ]', '', 'g'), ' '
+            ) AS words
+        FROM commits_messages
+        WHERE commit_message IS NOT NULL
+    ), words AS (
+        SELECT message_number, unnest(words) AS raw_word
+        FROM messages_words
+    )
+    SELECT message_number, raw_word
+    FROM words
+    WHERE length(raw_word) > 3
+"""
+
+# Authors summary, derived columns are calculated by
+# 'AuthorsSummaryTableProvider.finalize_authors_summary'
+_AUTHORS_SUMMARY_QUERY = """
+    SELECT
+        author_email,
+        author_name,
+        CAST(SUM(insertions) AS BIGINT) AS number_of_insertions,
+        CAST(SUM(deletions) AS BIGINT) AS number_of_deletions,
+        COUNT(commit_hash) AS number_of_commits,
+        MIN(commit_unix_time) AS min_unix_time,
+        MAX(commit_unix_time) AS max_unix_time
+    FROM commits_info
+    LEFT JOIN insertions_deletions USING (commit_hash)
+    WHERE author_email IS NOT NULL AND author_name IS NOT NULL
+    GROUP BY author_email, author_name
+    ORDER BY author_email, author_name
+"""
+
+# Nearest merges found with the 'timestamp' method - the first merge made
+# after the commit. If a few merges have the same timestamp, the first one
+# from the file is used
+_TIMESTAMP_NEAREST_MERGES_QUERY = """
+    WITH merges AS (
+        SELECT merge_hash, merge_unix_time
+        FROM merges_info
+        QUALIFY row_number() OVER (PARTITION BY merge_unix_time ORDER BY rowid) = 1
+    )
+    SELECT commits_info.commit_hash, merges.merge_hash, merges.merge_unix_time
+    FROM commits_info
+    ASOF JOIN merges ON commits_info.commit_unix_time <= merges.merge_unix_time
+"""
+
+# Commits general info joined with messages, insertions / deletions and
+# nearest merges, in the order of commits info file
+_GENERAL_INFO_QUERY = """
+    SELECT
+        commits_info.*,
+        commits_messages.commit_message,
+        insertions_deletions.insertions,
+        insertions_deletions.deletions,
+        nearest_merges.merge_hash,
+        nearest_merges.merge_unix_time
+    FROM commits_info
+    LEFT JOIN commits_messages USING (commit_hash)
+    LEFT JOIN insertions_deletions USING (commit_hash)
+    LEFT JOIN nearest_merges USING (commit_hash)
+    ORDER BY commits_info.rowid
+"""
+
+
+class DuckDBPreprocessingError(Exception):
+    """
+    Exception raised in case when DuckDB backend can't be used.
+    """
+    pass
+
+
+class DuckDBPreprocessor:
+    """
+    Preprocessing of raw data of single repository using DuckDB. Raw tables
+    are loaded into the in-memory database when they are needed for the
+    first time. Memory used by DuckDB is limited to the preprocessing memory
+    budget (PREPROCESSING_MEMORY_BUDGET_MB, split between the processes when
+    repositories are preprocessed in parallel), above it data is spilled
+    to disk.
+    """
+
+    def __init__(
+            self,
+            raw_data_path: str,
+            dataset: Optional[RepoRawDataset] = None,
+            memory_budget_mb: float = PREPROCESSING_MEMORY_BUDGET_MB,
+            threads: Optional[int] = DUCKDB_THREADS
+    ):
+        """
+        Create an instance of the class and connect to the in-memory database
+
+        :param raw_data_path: path to directory where raw data files are stored
+        :param dataset: raw dataset of the repository - .csv files and
+            nearest merges found using ancestry of commits are taken from it.
+            If not provided, a new one is created for 'raw_data_path'
+        :param memory_budget_mb: memory limit of the database in megabytes
+        :param threads: number of threads used by the database, None - number
+            of CPU cores
+        """
+
+        if duckdb is None:
+            raise DuckDBPreprocessingError("DuckDB preprocessing backend requires duckdb package to be installed")
+
+        self.raw_data_path = raw_data_path
+        self.repo_name = os.path.basename(raw_data_path)
+        self.dataset = dataset if dataset is not None else RepoRawDataset(raw_data_path)
+
+        config = {"memory_limit": "{0:.0f}MB".format(memory_budget_mb)}
+        if threads is not None:
+            config["threads"] = threads
+        self.conn = duckdb.connect(config=config)
+        self._loaded_tables = set()
+
+    def _load_raw_table(self, file_type: str) -> None:
+        """
+        Load single raw table into the database (if it wasn't loaded yet),
+        keeping order of rows from the file.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        """
+
+        if file_type in self._loaded_tables:
+            return
+
+        start = time.perf_counter()
+        if RAW_DATA_FORMAT == "csv":
+            self.conn.register("raw_table", self.dataset.get_table(file_type))
+            source = "raw_table"
+        elif RAW_DATA_FORMAT == "parquet":
+            source = "read_parquet('{0}')".format(self.dataset.get_file_path(file_type).replace("'", "''"))
+        else:
+            self.conn.register(
+                "raw_table", read_arrow_table(self.dataset.get_file_path(file_type), RAW_DATA_FORMAT)
+            )
+            source = "raw_table"
+
+        columns = ", ".join(
+            "CAST({0} AS {1}) AS {0}".format(col, _SQL_TYPES.get(col, "VARCHAR"))
+            for col in HEADERS.get(file_type)
+        )
+        self.conn.execute("CREATE TABLE {0} AS SELECT {1} FROM {2}".format(file_type, columns, source))
+        if source == "raw_table":
+            self.conn.unregister("raw_table")
+        self._loaded_tables.add(file_type)
+
+        logger.info("Table '{0}' of repo '{1}' loaded to DuckDB in {2:.2f}s".format(
+            file_type, self.repo_name, time.perf_counter() - start)
+        )
+
+    def _load_nearest_merges(self) -> None:
+        """
+        Create 'nearest_merges' view containing commit_hash, merge_hash and
+        merge_unix_time columns, using method set as NEAREST_MERGE_METHOD.
+        """
+
+        if NEAREST_MERGE_METHOD == "ancestry":
+            self.conn.register("nearest_merges", self.dataset.get_nearest_merges())
+        elif NEAREST_MERGE_METHOD == "timestamp":
+            self._load_raw_table("merges_info")
+            self.conn.execute("CREATE OR REPLACE VIEW nearest_merges AS {0}".format(_TIMESTAMP_NEAREST_MERGES_QUERY))
+        else:
+            raise ValueError("Unknown nearest merge method: '{0}'".format(NEAREST_MERGE_METHOD))
+
+    def get_general_info_table(self) -> pd.DataFrame:
+        """
+        Provide DataFrame with general info about commits, the same as
+        'GeneralTableProvider.get_general_info_table'.
+
+        :return: DataFrame containing results
+        """
+
+        logger.info("Preparing general info tab for repo '{0}' using DuckDB".format(self.repo_name))
+        for file_type in ["commits_info", "commits_messages", "insertions_deletions"]:
+            self._load_raw_table(file_type)
+        self._load_nearest_merges()
+
+        joined = self.conn.execute(_GENERAL_INFO_QUERY).df()
+
+        # Date details are calculated the same way as by the pandas backend
+        commits_info_cols = HEADERS.get("commits_info")
+        res = pd.concat(
+            [
+                joined[commits_info_cols],
+                get_time_features(joined.commit_unix_time),
+                joined.drop(columns=commits_info_cols)
+            ],
+            axis="columns"
+        )
+        res = compact_table(res)
+
+        return res
+
+    def get_authors_summary_table(self) -> pd.DataFrame:
+        """
+        Get table containing summary of authors activity, the same as
+        'AuthorsSummaryTableProvider.get_authors_summary_table'.
+
+        :return: summary table as pandas DataFrame
+        """
+
+        logger.info("Preparing commits authors stats tab for repo '{0}' using DuckDB".format(self.repo_name))
+        for file_type in ["commits_info", "insertions_deletions"]:
+            self._load_raw_table(file_type)
+
+        summary = self.conn.execute(_AUTHORS_SUMMARY_QUERY).df()
+        summary["min_date"] = to_local_datetime(summary.min_unix_time)
+        summary["max_date"] = to_local_datetime(summary.max_unix_time)
+        summary = summary.drop(columns=["min_unix_time", "max_unix_time"])
+
+        res = AuthorsSummaryTableProvider.finalize_authors_summary(summary)
+
+        return res
+
+    def get_messages_stats_tables(self) -> Dict[str, pd.DataFrame]:
+        """
+        Get tables containing words frequency analysis, the same as
+        'CommitMessagesStatsProvider.get_output_tables'. Each distinct word
+        is stemmed once, using the shared stem cache.
+
+        :return: dictionary containing output tables with following keys:
+            - all_words_tab
+            - raw_words_count
+            - stemmed_words_count
+        """
+
+        logger.info("Preparing messages stats tables for repo '{0}' using DuckDB".format(self.repo_name))
+        self._load_raw_table("commits_messages")
+
+        self.conn.execute("CREATE OR REPLACE TABLE all_words AS {0}".format(_ALL_WORDS_QUERY))
+        raw_words_count = self.conn.execute(
+            "SELECT raw_word, COUNT(*) AS raw_word_freq FROM all_words GROUP BY raw_word ORDER BY raw_word"
+        ).df()
+
+        # Words are returned as enum (pandas categorical) with sorted categories,
+        # so Python strings are created only for distinct words
+        self.conn.execute("DROP TYPE IF EXISTS raw_word_enum")
+        self.conn.execute("CREATE TYPE raw_word_enum AS ENUM (SELECT DISTINCT raw_word FROM all_words ORDER BY raw_word)")
+        all_words_tab = self.conn.execute(
+            "SELECT message_number, CAST(raw_word AS raw_word_enum) AS raw_word FROM all_words"
+        ).df()
+        # Words keep index of messages they come from
+        all_words_tab = compact_table(all_words_tab.set_index("message_number").rename_axis(None))
+        stems = get_stem_cache().get_stems(raw_words_count.raw_word)
+        all_words_tab["stemmed_word"] = all_words_tab.raw_word.map(stems)
+        all_words_tab = compact_table(all_words_tab)
+
+        self.conn.register(
+            "stems", pd.DataFrame({"raw_word": list(stems.keys()), "stemmed_word": list(stems.values())})
+        )
+        self.conn.register("raw_words_count", raw_words_count)
+        stemmed_words_count = self.conn.execute(
+            """
+            SELECT stemmed_word, CAST(SUM(raw_word_freq) AS BIGINT) AS stemmed_word_freq
+            FROM raw_words_count
+            JOIN stems USING (raw_word)
+            GROUP BY stemmed_word
+            ORDER BY stemmed_word
+            """
+        ).df()
+        self.conn.unregister("stems")
+        self.conn.unregister("raw_words_count")
+
+        res = {
+            "all_words_tab": all_words_tab,
+            "raw_words_count": raw_words_count,
+            "stemmed_words_count": stemmed_words_count
+        }
+
+        return res
+
+    def close(self) -> None:
+        """
+        Close the database, releasing its memory
+        """
+        self.conn.close()
+
+    def __enter__(self) -> "DuckDBPreprocessor":
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc_val: Optional[BaseException],
+            exc_tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
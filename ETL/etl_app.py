@@ -2,12 +2,16 @@ import requests
 import os
 import importlib
 
-from flask import Flask
+from flask import Flask, jsonify
 from config import config
 from ETL.get_repos import get_repos, GetReposError
+from ETL.mirror_pool import MirrorPool, MirrorPoolError
 from ETL.cleanup import delete_repos, cleanup, ReposDeletingError
 from ETL.raw_data_retriever import generate_raw_data_for_all_repos, RawDataGenerationError
 from ETL.load_data_to_db import load_data_all_repos, DBLoadingError
+from ETL.streaming_etl import stream_data_all_repos, StreamingETLError
+from ETL.watermarks import get_watermarks, WatermarksError
+from database.get_db_engine import get_db_engine, get_pool_metrics
 
 import logging.config
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
@@ -29,17 +33,41 @@ def run_etl() -> requests.Response:
 
     logger.info("Launching ETL process.")
     try:
-        logger.info("Cloning repositories.")
-        get_repos(repos_list=config.REPOS_TO_ANALYZE, submodules_dir=config.SUBMODULES_DIR)
+        if config.USE_MIRROR_POOL:
+            logger.info("Updating mirrors of repositories.")
+            repos_paths = MirrorPool(
+                config.MIRRORS_DIR, config.MIRRORS_DISK_BUDGET_GB, config.CLONE_STRATEGY
+            ).get_mirrors(config.REPOS_TO_ANALYZE)
+        else:
+            logger.info("Cloning repositories.")
+            get_repos(repos_list=config.REPOS_TO_ANALYZE, submodules_dir=config.SUBMODULES_DIR)
+            repos_paths = None
+
+        if config.INCREMENTAL_ETL:
+            logger.info("Reading watermarks of already loaded repositories.")
+            watermarks = get_watermarks(get_db_engine(inside_compose_network=True))
+        else:
+            watermarks = {}
 
-        logger.info("Generating raw data in the format of .csv files.")
-        generate_raw_data_for_all_repos(config.SUBMODULES_DIR, config.RAW_DATA_DIR)
+        # Raw .csv files are generated only if they are kept for debugging
+        streaming = config.STREAMING_ETL and config.CLEAN_RAW_DATA
 
-        logger.info("Deleting submodules.")
-        delete_repos(repos_dir=config.SUBMODULES_DIR)
+        if streaming:
+            logger.info("Streaming data from repositories to Postgres DB.")
+            stream_data_all_repos(config.SUBMODULES_DIR, watermarks=watermarks, repos_paths=repos_paths)
+        else:
+            logger.info("Generating raw data in the format of .csv files.")
+            generate_raw_data_for_all_repos(
+                config.SUBMODULES_DIR, config.RAW_DATA_DIR, watermarks=watermarks, repos_paths=repos_paths
+            )
 
-        logger.info("Uploading data to Postgres DB.")
-        load_data_all_repos(config.RAW_DATA_DIR)
+        if not config.USE_MIRROR_POOL:
+            logger.info("Deleting submodules.")
+            delete_repos(repos_dir=config.SUBMODULES_DIR)
+
+        if not streaming:
+            logger.info("Uploading data to Postgres DB.")
+            load_data_all_repos(config.RAW_DATA_DIR)
     except GetReposError as gre:
         error_msg = str(gre)
         res = app.response_class(
@@ -48,6 +76,22 @@ def run_etl() -> requests.Response:
             ),
             status=500
         )
+    except MirrorPoolError as mpe:
+        error_msg = str(mpe)
+        res = app.response_class(
+            response="ETL process failed at the stage of updating mirrors.\nError msg: '{0}'".format(
+                error_msg
+            ),
+            status=500
+        )
+    except WatermarksError as we:
+        error_msg = str(we)
+        res = app.response_class(
+            response="ETL process failed at the stage of reading watermarks.\nError msg: '{0}'".format(
+                error_msg
+            ),
+            status=500
+        )
     except RawDataGenerationError as rge:
         error_msg = str(rge)
         res = app.response_class(
@@ -56,6 +100,14 @@ def run_etl() -> requests.Response:
             ),
             status=500
         )
+    except StreamingETLError as sde:
+        error_msg = str(sde)
+        res = app.response_class(
+            response="ETL process failed at the stage of streaming data to DB.\nError msg: '{0}'".format(
+                error_msg
+            ),
+            status=500
+        )
     except ReposDeletingError as rde:
         error_msg = str(rde)
         res = app.response_class(
@@ -78,6 +130,8 @@ def run_etl() -> requests.Response:
             status=200
         )
 
+    logger.info("Database pool metrics: {0}".format(get_pool_metrics()))
+
     if res.status_code == 500 or config.CLEAN_RAW_DATA:
         try:
             logger.info("Running cleanup")
@@ -90,5 +144,17 @@ def run_etl() -> requests.Response:
     return res
 
 
+@app.route("/db_pool_metrics")
+def db_pool_metrics() -> requests.Response:
+    """
+    Get statistics of database connections checkouts of the ETL process
+    (see database.get_db_engine.get_pool_metrics).
+
+    :return: HTTP response
+    """
+
+    return jsonify(get_pool_metrics())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0")
@@ -4,14 +4,31 @@ to the postgres database
 """
 
 import os
+import time
+import multiprocessing
 
 import logging.config
 
 import pandas as pd
-from database.get_db_engine import get_db_engine
-from sqlalchemy import Engine
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Tuple, Union
+from database.get_db_engine import get_db_engine, get_engine_for_url
+from database.rollups import COUNT_COLUMN
+from database.tables_layout import REPO_COLUMN, is_partitioned, get_table_name, get_parent_table_name
+from sqlalchemy import Engine, Connection, URL, text
+from sqlalchemy.types import TypeEngine
 from config.config import *
-from ETL.data_preprocessing import GeneralTableProvider, AuthorsSummaryTableProvider, CommitMessagesStatsProvider
+from common.time_features import to_local_datetime
+from ETL.copy_loading import get_sql_types, get_insertion_method
+from ETL.data_preprocessing import RepoRawDataset, GeneralTableProvider, AuthorsSummaryTableProvider, CommitMessagesStatsProvider
+from ETL.duckdb_preprocessing import DuckDBPreprocessor
+from ETL.memory_budget import MemoryBudget, get_tables_memory
+from ETL.rollups import ROLLUP_KEYS, get_rollup_tables, get_days_to_merge_rollup, merge_all_rollup_tables
+from ETL.stem_cache import get_stem_cache
+from ETL.table_swap import get_staging_table_name, create_staging_table, swap_staging_tables, append_staging_table
+from ETL.tables_schema import get_column_types, convert_columns, create_constraints_and_indexes, create_partitioned_table
+from ETL.watermarks import read_extraction_state, save_watermark
 
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
 logger = logging.getLogger("consoleLogger")
@@ -24,87 +41,974 @@ class DBLoadingError(Exception):
     """
     pass
 
+
 def load_single_table_to_db(
         tab_to_load: pd.DataFrame,
         table_prefix: str,
         table_type: str,
-        db_engine: Engine
+        db_engine: Union[Engine, Connection],
+        if_exists: str = "replace",
+        sql_types: Optional[Dict[str, TypeEngine]] = None,
+        staging: bool = False
 ) -> int:
     """
-    Load singe table to the databae
+    Load singe table to the databae. Rows are streamed with the COPY
+    command or inserted with INSERT statements (see DB_LOADING_METHOD).
+    Types of columns are declared in ETL.tables_schema, the remaining ones
+    are derived from pandas types. In the partitioned layout (see
+    DB_TABLES_LAYOUT) the table is loaded to the partition of given
+    repository, with the repo_name column added.
 
     :param tab_to_load: table to load to db as pandas DataFrame
     :param table_prefix: table prefix (repo name)
     :param table_type: type of the table
-    :param db_engine: db engine created by 'create_engine' method
+    :param db_engine: db engine created by 'create_engine' method or
+        connection (when table is loaded as a part of bigger transaction)
+    :param if_exists: what to do if table already exists ('replace' or 'append')
+    :param sql_types: SQL types of the columns overriding the declared ones
+        and the ones derived from pandas types (see 'get_sql_types')
+    :param staging: whether to load the table into its staging table, which
+        has to be swapped with the target one afterwards (see
+        ETL.table_swap.swap_staging_tables). Requires connection
 
-    :return: SQL code
+    :return: number of loaded rows
     """
 
-    table_name = DB_TABLES_NAMES.get(table_type).format(table_prefix)
+    table_name = get_table_name(table_type, table_prefix)
+    tab_to_load = convert_columns(tab_to_load, table_type)
+    if is_partitioned():
+        tab_to_load = tab_to_load.assign(**{REPO_COLUMN: table_prefix})[[REPO_COLUMN] + list(tab_to_load.columns)]
+    sql_types = {
+        **get_sql_types(tab_to_load),
+        **get_column_types(tab_to_load, table_type),
+        **(sql_types or {})
+    }
+    if staging:
+        if if_exists == "replace":
+            create_staging_table(tab_to_load, table_name, db_engine, sql_types)
+        table_name = get_staging_table_name(table_name)
+        if_exists = "append"
+
+    start = time.perf_counter()
     res = tab_to_load.to_sql(
-        table_name, db_engine, if_exists="replace"
+        table_name, db_engine, if_exists=if_exists, dtype=sql_types,
+        method=get_insertion_method(db_engine)
+    )
+
+    elapsed = time.perf_counter() - start
+    logger.info("Loaded {0} rows to table '{1}' in {2:.2f}s ({3:.0f} rows/s)".format(
+        len(tab_to_load), table_name, elapsed, len(tab_to_load) / elapsed if elapsed > 0 else 0.0)
     )
 
     return res
 
 
-def load_data_single_repo(raw_data_path: str, db_engine: Engine, repo_name: str = None) -> None:
+def preprocess_single_repo(
+        raw_data_path: str,
+        dataset: RepoRawDataset,
+        authors_summary: bool = True,
+        memory_budget_mb: float = PREPROCESSING_MEMORY_BUDGET_MB,
+        duckdb_threads: Optional[int] = DUCKDB_THREADS
+) -> Dict[str, pd.DataFrame]:
     """
-    Load all tables for single repository. Please note that tables names
-    are in format {repo_name}_table_suffix. As default the directory name
-    is treat as repo name - to change this behaviour please set 'repo_name'
-    argument.
+    Transform raw data of single repository into tables loaded to the
+    database, using backend set as PREPROCESSING_BACKEND. Rollup tables
+    (see ETL.rollups) are calculated from the general info table.
+
+    :param raw_data_path: path to directory where raw data is stored
+    :param dataset: raw dataset of the repository
+    :param authors_summary: whether to prepare the authors summary table
+        (it's recalculated in the database during incremental loads)
+    :param memory_budget_mb: memory limit of the 'duckdb' backend in megabytes
+    :param duckdb_threads: number of threads used by the 'duckdb' backend,
+        None - number of CPU cores
+    :return: dictionary containing tables with keys the same as in the
+        DB_TABLES_NAMES dictionary
+    """
+
+    start = time.perf_counter()
+    if PREPROCESSING_BACKEND == "duckdb":
+        with DuckDBPreprocessor(raw_data_path, dataset, memory_budget_mb, duckdb_threads) as preprocessor:
+            res = {"general_info": preprocessor.get_general_info_table()}
+            if authors_summary:
+                res["authors_stats"] = preprocessor.get_authors_summary_table()
+            commits_messages_stats_tabs = preprocessor.get_messages_stats_tables()
+    elif PREPROCESSING_BACKEND == "pandas":
+        res = {"general_info": GeneralTableProvider(raw_data_path, dataset).get_general_info_table()}
+        if authors_summary:
+            res["authors_stats"] = AuthorsSummaryTableProvider(raw_data_path, dataset).get_authors_summary_table()
+        commits_messages_stats_tabs = CommitMessagesStatsProvider(raw_data_path, dataset).get_output_tables()
+    else:
+        raise ValueError("Unknown preprocessing backend: '{0}'".format(PREPROCESSING_BACKEND))
+
+    res["messages_all_words"] = commits_messages_stats_tabs.get("all_words_tab")
+    res["messages_raw_words_freq"] = commits_messages_stats_tabs.get("raw_words_count")
+    res["messages_stemmed_words_freq"] = commits_messages_stats_tabs.get("stemmed_words_count")
+    res.update(get_rollup_tables(res.get("general_info")))
 
-    If given table already exists in the database it will be replaced.
+    logger.info("Data of repo '{0}' preprocessed in {1:.2f}s ({2} backend)".format(
+        dataset.repo_name, time.perf_counter() - start, PREPROCESSING_BACKEND)
+    )
+
+    return res
+
+
+class PreprocessedRepo:
+    """
+    Tables of single repository preprocessed from raw data (in the
+    'in_memory' mode), ready to be loaded to the database. Preprocessing
+    doesn't use the database, so it can be done in a separate process
+    (see 'load_data_all_repos').
+    """
+
+    def __init__(
+            self,
+            repo_name: str,
+            extraction_state: Optional[dict],
+            tables: Dict[str, pd.DataFrame],
+            merges_info: Optional[pd.DataFrame] = None,
+            nearest_merges: Optional[pd.DataFrame] = None
+    ):
+        """
+        Create an instance of the class
+
+        :param repo_name: repo name which will be set as tables prefix
+        :param extraction_state: state of the extraction (see
+            ETL.watermarks.read_extraction_state), None if it's unknown
+        :param tables: preprocessed tables with keys the same as in the
+            DB_TABLES_NAMES dictionary. In case of incremental extraction
+            they contain new commits only (without the authors summary,
+            which is recalculated in the database) and are empty if
+            there are no new commits
+        :param merges_info: table containing all merges of the repository,
+            used to update already loaded commits in case of incremental
+            extraction
+        :param nearest_merges: nearest merges of all commits found using
+            ancestry of commits, used the same way as 'merges_info'
+        """
+        self.repo_name = repo_name
+        self.extraction_state = extraction_state
+        self.incremental = extraction_state is not None and extraction_state.get("incremental")
+        self.tables = tables
+        self.merges_info = merges_info
+        self.nearest_merges = nearest_merges
+
+
+def preprocess_raw_data_single_repo(
+        raw_data_path: str,
+        repo_name: str = None,
+        memory_budget_mb: float = PREPROCESSING_MEMORY_BUDGET_MB,
+        duckdb_threads: Optional[int] = DUCKDB_THREADS
+) -> PreprocessedRepo:
+    """
+    Read and preprocess raw data of single repository, without loading it
+    to the database.
 
     :param raw_data_path: path to directory where raw data is stored
-    :param db_engine: db engine created by 'create_engine' method
     :param repo_name: repo name which will be set as tables prefix. Name
         of raw files directory if None
+    :param memory_budget_mb: memory limit of the 'duckdb' backend in megabytes
+    :param duckdb_threads: number of threads used by the 'duckdb' backend,
+        None - number of CPU cores
+    :return: preprocessed tables
     """
 
     if repo_name is None:
         repo_name = os.path.basename(raw_data_path)
 
-    general_info_tab = GeneralTableProvider(raw_data_path).get_general_info_table()
-    authors_stats_tab = AuthorsSummaryTableProvider(raw_data_path).get_authors_summary_table()
-    commits_messages_stats_tabs = CommitMessagesStatsProvider(raw_data_path).get_output_tables()
+    extraction_state = read_extraction_state(raw_data_path)
+    incremental = extraction_state is not None and extraction_state.get("incremental")
+
+    # Raw tables are read once and shared by all the providers
+    dataset = RepoRawDataset(raw_data_path)
+    if not incremental:
+        return PreprocessedRepo(
+            repo_name, extraction_state,
+            preprocess_single_repo(raw_data_path, dataset, memory_budget_mb=memory_budget_mb, duckdb_threads=duckdb_threads)
+        )
+
+    new_commits_number = len(dataset.get_table("commits_hashes"))
+    logger.info("Found {0} new commits, repo: '{1}'".format(new_commits_number, repo_name))
+    tables = preprocess_single_repo(
+        raw_data_path, dataset, authors_summary=False,
+        memory_budget_mb=memory_budget_mb, duckdb_threads=duckdb_threads
+    ) if new_commits_number > 0 else {}
+
+    res = PreprocessedRepo(
+        repo_name, extraction_state, tables, dataset.get_table("merges_info"), dataset.get_nearest_merges()
+    )
+
+    return res
+
+
+def _swap_repo_tables(repo_name: str, table_types: List[str], conn: Connection) -> None:
+    """
+    Create constraints and indexes of staging tables of single repository
+    and swap them with the target ones (or attach them as partitions, creating
+    partitioned tables when the first repository is loaded).
+
+    :param repo_name: name of the repository
+    :param table_types: types of the tables loaded into staging tables
+    :param conn: database connection with transaction already started
+    """
+
+    tables_names = [get_table_name(table_type, repo_name) for table_type in table_types]
+    for table_type, table_name in zip(table_types, tables_names):
+        create_constraints_and_indexes(conn, get_staging_table_name(table_name), table_type)
+
+    parent_names = None
+    if is_partitioned():
+        parent_names = [get_parent_table_name(table_type) for table_type in table_types]
+        for table_type, table_name, parent_name in zip(table_types, tables_names, parent_names):
+            create_partitioned_table(conn, parent_name, get_staging_table_name(table_name), table_type)
+
+    swap_staging_tables(tables_names, conn, repo_name, parent_names)
+
+
+def _load_data_single_repo_full(preprocessed: PreprocessedRepo, conn: Connection) -> None:
+    """
+    Load all tables for single repository from raw data containing full
+    history. Tables are loaded into staging tables, which replace existing
+    ones at once when the transaction is committed.
+
+    :param preprocessed: tables preprocessed from raw data
+    :param conn: database connection with transaction already started
+    """
+
+    for table_type, tab in preprocessed.tables.items():
+        logger.info("Loading {0} table to db, repo: '{1}'".format(table_type, preprocessed.repo_name))
+        load_single_table_to_db(tab, preprocessed.repo_name, table_type, conn, staging=True)
+
+    _swap_repo_tables(preprocessed.repo_name, list(preprocessed.tables), conn)
+
+
+def update_pending_merges_info(
+        merges_info: pd.DataFrame,
+        repo_name: str,
+        conn: Connection,
+        nearest_merges: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Update nearest merge info of already loaded commits which had no
+    merge after them during the previous run.
+
+    :param merges_info: table containing all merges of the repository
+        (merges info file contains all of them in case of incremental extraction)
+    :param repo_name: name of the repository
+    :param conn: database connection
+    :param nearest_merges: nearest merges of all commits found using ancestry
+        of commits (see RepoRawDataset.get_nearest_merges), required by the
+        'ancestry' method
+    :return: commits which got the nearest merge, with commit_unix_time and
+        merge_unix_time columns (used to update the commits_days_to_merge
+        rollup table)
+    """
+
+    table_name = get_table_name("general_info", repo_name)
+    pending_commits = pd.read_sql_query(
+        'SELECT commit_hash, commit_unix_time FROM "{0}" WHERE merge_hash IS NULL'.format(table_name),
+        conn
+    )
+
+    if pending_commits.empty or merges_info.empty:
+        return pd.DataFrame(columns=["commit_unix_time", "merge_unix_time"])
+
+    merged_commits = GeneralTableProvider.append_merges_info(
+        pending_commits, merges_info, nearest_merges
+    ).dropna(subset=["merge_hash"])
+
+    logger.info("Updating merge info of {0} commits, repo: '{1}'".format(len(merged_commits), repo_name))
+    if not merged_commits.empty:
+        conn.execute(
+            text(
+                'UPDATE "{0}" SET merge_hash = :merge_hash, merge_unix_time = :merge_unix_time '
+                'WHERE commit_hash = :commit_hash'.format(table_name)
+            ),
+            merged_commits[["commit_hash", "merge_hash", "merge_unix_time"]].to_dict("records")
+        )
+
+    return merged_commits[["commit_unix_time", "merge_unix_time"]]
+
+
+def recalculate_authors_summary(repo_name: str, conn: Connection) -> pd.DataFrame:
+    """
+    Recalculate authors summary table using general info table stored in
+    the database. Aggregations are calculated by the database, so we don't
+    need to read the whole history to get exact number of days of activity
+    of authors who contributed again.
+
+    :param repo_name: name of the repository
+    :param conn: database connection
+    :return: authors summary table as pandas DataFrame
+    """
+
+    table_name = get_table_name("general_info", repo_name)
+    sql_query = """
+        SELECT
+            author_email,
+            author_name,
+            CAST(SUM(insertions) AS BIGINT) AS number_of_insertions,
+            CAST(SUM(deletions) AS BIGINT) AS number_of_deletions,
+            COUNT(commit_hash) AS number_of_commits,
+            MIN(commit_unix_time) AS min_unix_time,
+            MAX(commit_unix_time) AS max_unix_time
+        FROM "{0}"
+        WHERE author_email IS NOT NULL AND author_name IS NOT NULL
+        GROUP BY author_email, author_name
+        ORDER BY author_email, author_name
+    """.format(table_name)
+
+    summary = pd.read_sql_query(sql_query, conn)
+    summary["min_date"] = to_local_datetime(summary.min_unix_time)
+    summary["max_date"] = to_local_datetime(summary.max_unix_time)
+    summary = summary.drop(columns=["min_unix_time", "max_unix_time"])
+
+    res = AuthorsSummaryTableProvider.finalize_authors_summary(summary)
+
+    return res
+
+
+def merge_words_frequencies(
+        new_words_count: pd.DataFrame,
+        table_type: str,
+        word_col_name: str,
+        freq_col_name: str,
+        repo_name: str,
+        conn: Connection
+) -> pd.DataFrame:
+    """
+    Add frequencies of words from new commits to the frequencies
+    stored in the database.
+
+    :param new_words_count: words frequency table calculated for new commits
+    :param table_type: type of the table
+    :param word_col_name: name of column containing words
+    :param freq_col_name: name of column containing frequencies
+    :param repo_name: name of the repository
+    :param conn: database connection
+    :return: merged words frequency table
+    """
+
+    table_name = get_table_name(table_type, repo_name)
+    stored_words_count = pd.read_sql_query(
+        'SELECT {0}, {1} FROM "{2}"'.format(word_col_name, freq_col_name, table_name),
+        conn
+    )
 
-    logger.info("Loading general info table to db, repo: '{0}'".format(repo_name))
-    load_single_table_to_db(general_info_tab, repo_name, "general_info", db_engine)
+    res = CommitMessagesStatsProvider.merge_words_counts(
+        [stored_words_count, new_words_count], word_col_name, freq_col_name
+    )
 
-    logger.info("Loading author stats table to db, repo: '{0}'".format(repo_name))
-    load_single_table_to_db(authors_stats_tab, repo_name, "authors_stats", db_engine)
+    return res
+
+
+def merge_rollups(
+        new_rollups: Optional[Dict[str, pd.DataFrame]],
+        merged_commits: pd.DataFrame,
+        repo_name: str,
+        conn: Connection
+) -> Dict[str, pd.DataFrame]:
+    """
+    Add rollups of new commits and of already loaded commits which got
+    the nearest merge to the rollups stored in the database.
 
-    logger.info("Loading messages_all_words table to db, repo: '{0}'".format(repo_name))
+    :param new_rollups: rollup tables calculated for new commits (see
+        ETL.rollups.get_rollup_tables), None if there are no new commits
+    :param merged_commits: already loaded commits which got the nearest
+        merge (see 'update_pending_merges_info')
+    :param repo_name: name of the repository
+    :param conn: database connection
+    :return: dictionary containing merged rollup tables
+    """
+
+    stored_rollups = {
+        table_type: pd.read_sql_query(
+            'SELECT {0} FROM "{1}"'.format(", ".join(keys + [COUNT_COLUMN]), get_table_name(table_type, repo_name)),
+            conn
+        )
+        for table_type, keys in ROLLUP_KEYS.items()
+    }
+    rollups = [stored_rollups, {"commits_days_to_merge": get_days_to_merge_rollup(merged_commits)}]
+    if new_rollups is not None:
+        rollups.append(new_rollups)
+
+    res = merge_all_rollup_tables(rollups)
+
+    return res
+
+
+def update_days_to_merge_rollup(merged_commits: pd.DataFrame, repo_name: str, conn: Connection) -> None:
+    """
+    Update the commits_days_to_merge rollup table when there are no new
+    commits, but already loaded ones got the nearest merge.
+
+    :param merged_commits: already loaded commits which got the nearest
+        merge (see 'update_pending_merges_info')
+    :param repo_name: name of the repository
+    :param conn: database connection with transaction already started
+    """
+
+    if merged_commits.empty:
+        return
+
+    logger.info("Updating commits_days_to_merge table, repo: '{0}'".format(repo_name))
+    rollups = merge_rollups(None, merged_commits, repo_name, conn)
     load_single_table_to_db(
-        commits_messages_stats_tabs.get("all_words_tab"),
-        repo_name,
-        "messages_all_words",
-        db_engine
+        rollups.get("commits_days_to_merge"), repo_name, "commits_days_to_merge", conn, staging=True
     )
+    _swap_repo_tables(repo_name, ["commits_days_to_merge"], conn)
 
-    logger.info("Loading messages_raw_words_freq table to db, repo: '{0}'".format(repo_name))
+
+def _load_data_single_repo_incremental(preprocessed: PreprocessedRepo, conn: Connection) -> None:
+    """
+    Append data of new commits to the tables of single repository. Row-level
+    tables (general info, all words) are appended, aggregated tables
+    (authors stats, words frequencies, rollups) are recalculated and replaced
+    with staging tables. All the changes are done using single connection, so
+    together with the watermark they are committed in one transaction.
+
+    :param preprocessed: tables preprocessed from raw data of new commits
+    :param conn: database connection with transaction already started
+    """
+
+    repo_name = preprocessed.repo_name
+    tables = preprocessed.tables
+
+    # Commits are updated before appending new ones - new commits already
+    # have nearest merges assigned
+    merged_commits = update_pending_merges_info(
+        preprocessed.merges_info, repo_name, conn, preprocessed.nearest_merges
+    )
+
+    if not tables:
+        update_days_to_merge_rollup(merged_commits, repo_name, conn)
+        return
+
+    logger.info("Appending new commits to general info table, repo: '{0}'".format(repo_name))
+    load_single_table_to_db(tables.get("general_info"), repo_name, "general_info", conn, if_exists="append")
+
+    logger.info("Recalculating author stats table, repo: '{0}'".format(repo_name))
+    authors_stats_tab = recalculate_authors_summary(repo_name, conn)
+    load_single_table_to_db(authors_stats_tab, repo_name, "authors_stats", conn, staging=True)
+
+    logger.info("Appending new words to messages_all_words table, repo: '{0}'".format(repo_name))
     load_single_table_to_db(
-        commits_messages_stats_tabs.get("raw_words_count"),
+        tables.get("messages_all_words"),
         repo_name,
-        "messages_raw_words_freq",
-        db_engine
+        "messages_all_words",
+        conn,
+        if_exists="append"
     )
 
-    logger.info("Loading messages_stemmed_words_freq table to db, repo: '{0}'".format(repo_name))
-    load_single_table_to_db(
-        commits_messages_stats_tabs.get("stemmed_words_count"),
+    logger.info("Updating messages_raw_words_freq table, repo: '{0}'".format(repo_name))
+    raw_words_count = merge_words_frequencies(
+        tables.get("messages_raw_words_freq"),
+        "messages_raw_words_freq", "raw_word", "raw_word_freq",
+        repo_name, conn
+    )
+    load_single_table_to_db(raw_words_count, repo_name, "messages_raw_words_freq", conn, staging=True)
+
+    logger.info("Updating messages_stemmed_words_freq table, repo: '{0}'".format(repo_name))
+    stemmed_words_count = merge_words_frequencies(
+        tables.get("messages_stemmed_words_freq"),
+        "messages_stemmed_words_freq", "stemmed_word", "stemmed_word_freq",
+        repo_name, conn
+    )
+    load_single_table_to_db(stemmed_words_count, repo_name, "messages_stemmed_words_freq", conn, staging=True)
+
+    logger.info("Updating rollup tables, repo: '{0}'".format(repo_name))
+    rollups = merge_rollups(tables, merged_commits, repo_name, conn)
+    for table_type, rollup_tab in rollups.items():
+        load_single_table_to_db(rollup_tab, repo_name, table_type, conn, staging=True)
+
+    _swap_repo_tables(
         repo_name,
-        "messages_stemmed_words_freq",
-        db_engine
+        ["authors_stats", "messages_raw_words_freq", "messages_stemmed_words_freq"] + list(rollups),
+        conn
     )
 
 
+def _load_chunks(
+        chunks: Iterator[Dict[str, pd.DataFrame]],
+        merges_info: pd.DataFrame,
+        nearest_merges: pd.DataFrame,
+        repo_name: str,
+        begin_chunk: Callable[[], ContextManager[Connection]],
+        staging: bool,
+        memory_budget: MemoryBudget
+) -> Tuple[int, Dict[str, object]]:
+    """
+    Preprocess chunks of single repository, load their row-level tables
+    (general info, all words) and accumulate aggregated tables in memory.
+
+    :param chunks: iterator of raw data tables (see 'load_chunks_single_repo')
+    :param merges_info: table containing all merges of the repository
+    :param nearest_merges: nearest merges of all commits of the repository
+    :param repo_name: repo name which will be set as tables prefix
+    :param begin_chunk: function returning context manager of the connection
+        used to load single chunk
+    :param staging: whether row-level tables are loaded into staging tables
+        (replaced by the first chunk), otherwise they are appended to the
+        target tables
+    :param memory_budget: memory budget of the repository
+    :return: number of loaded commits and dictionary containing accumulated
+        'authors_summary', 'raw_words_count', 'stemmed_words_count' and
+        'rollups' (None if there were no commits)
+    """
+
+    authors_summary = None
+    raw_words_count = None
+    stemmed_words_count = None
+    rollups = None
+    commits_number = 0
+
+    for raw_tables in chunks:
+        # Merges of the whole repository are counted once, as a resident table
+        chunk_tables = list(raw_tables.values())
+        raw_tables["merges_info"] = merges_info
+        dataset = RepoRawDataset(repo_name, raw_tables, nearest_merges)
+        if_exists = "replace" if commits_number == 0 and staging else "append"
+
+        general_info_tab = GeneralTableProvider(repo_name, dataset).get_general_info_table()
+        general_info_tab.index += commits_number
+        commits_messages_stats_tabs = CommitMessagesStatsProvider(repo_name, dataset).get_output_tables()
+        with begin_chunk() as conn:
+            load_single_table_to_db(
+                general_info_tab, repo_name, "general_info", conn, if_exists=if_exists, staging=staging
+            )
+            load_single_table_to_db(
+                commits_messages_stats_tabs.get("all_words_tab"),
+                repo_name,
+                "messages_all_words",
+                conn,
+                if_exists=if_exists,
+                staging=staging
+            )
+
+        partial_summaries = [AuthorsSummaryTableProvider(repo_name, dataset).get_partial_authors_summary()]
+        raw_words_counts = [commits_messages_stats_tabs.get("raw_words_count")]
+        stemmed_words_counts = [commits_messages_stats_tabs.get("stemmed_words_count")]
+        partial_rollups = [get_rollup_tables(general_info_tab)]
+        if commits_number > 0:
+            partial_summaries.append(authors_summary)
+            raw_words_counts.append(raw_words_count)
+            stemmed_words_counts.append(stemmed_words_count)
+            partial_rollups.append(rollups)
+
+        authors_summary = AuthorsSummaryTableProvider.merge_partial_authors_summaries(partial_summaries)
+        raw_words_count = CommitMessagesStatsProvider.merge_words_counts(
+            raw_words_counts, "raw_word", "raw_word_freq"
+        )
+        stemmed_words_count = CommitMessagesStatsProvider.merge_words_counts(
+            stemmed_words_counts, "stemmed_word", "stemmed_word_freq"
+        )
+        rollups = merge_all_rollup_tables(partial_rollups)
+
+        chunk_rows = len(raw_tables.get("commits_hashes"))
+        commits_number += chunk_rows
+        memory_budget.update(
+            chunk_rows,
+            get_tables_memory(chunk_tables + [general_info_tab, commits_messages_stats_tabs.get("all_words_tab")]),
+            get_tables_memory([authors_summary, raw_words_count, stemmed_words_count] + list(rollups.values()))
+        )
+        logger.info("Loaded {0} commits so far (next chunk size: {1}), repo: '{2}'".format(
+            commits_number, memory_budget.get_chunk_size(), repo_name)
+        )
+
+    aggregates = {
+        "authors_summary": authors_summary,
+        "raw_words_count": raw_words_count,
+        "stemmed_words_count": stemmed_words_count,
+        "rollups": rollups
+    }
+
+    return commits_number, aggregates
+
+
+def _finish_chunks_loading(
+        aggregates: Dict[str, object],
+        commits_number: int,
+        merged_commits: Optional[pd.DataFrame],
+        repo_name: str,
+        conn: Connection,
+        incremental: bool
+) -> None:
+    """
+    Load aggregated tables accumulated from chunks (merged with the stored
+    ones in the incremental mode) and swap staging tables.
+
+    :param aggregates: aggregated tables returned by '_load_chunks'
+    :param commits_number: number of loaded commits
+    :param merged_commits: already loaded commits which got the nearest
+        merge (see 'update_pending_merges_info'), None in the full rebuild
+    :param repo_name: repo name which will be set as tables prefix
+    :param conn: database connection with transaction already started
+    :param incremental: whether new commits were appended to existing tables
+    """
+
+    if commits_number == 0:
+        logger.info("No commits to load, repo: '{0}'".format(repo_name))
+        if incremental:
+            update_days_to_merge_rollup(merged_commits, repo_name, conn)
+        return
+
+    raw_words_count = aggregates.get("raw_words_count")
+    stemmed_words_count = aggregates.get("stemmed_words_count")
+    rollups = aggregates.get("rollups")
+    if incremental:
+        logger.info("Recalculating author stats table, repo: '{0}'".format(repo_name))
+        authors_stats_tab = recalculate_authors_summary(repo_name, conn)
+        raw_words_count = merge_words_frequencies(
+            raw_words_count, "messages_raw_words_freq", "raw_word", "raw_word_freq", repo_name, conn
+        )
+        stemmed_words_count = merge_words_frequencies(
+            stemmed_words_count, "messages_stemmed_words_freq", "stemmed_word", "stemmed_word_freq", repo_name, conn
+        )
+        rollups = merge_rollups(rollups, merged_commits, repo_name, conn)
+    else:
+        authors_stats_tab = AuthorsSummaryTableProvider.finalize_authors_summary(aggregates.get("authors_summary"))
+
+    logger.info("Loading aggregated tables to db, repo: '{0}'".format(repo_name))
+    load_single_table_to_db(authors_stats_tab, repo_name, "authors_stats", conn, staging=True)
+    load_single_table_to_db(raw_words_count, repo_name, "messages_raw_words_freq", conn, staging=True)
+    load_single_table_to_db(stemmed_words_count, repo_name, "messages_stemmed_words_freq", conn, staging=True)
+    for table_type, rollup_tab in rollups.items():
+        load_single_table_to_db(rollup_tab, repo_name, table_type, conn, staging=True)
+
+    swapped_tables = ["authors_stats", "messages_raw_words_freq", "messages_stemmed_words_freq"] + list(rollups)
+    if not incremental:
+        swapped_tables += ["general_info", "messages_all_words"]
+    _swap_repo_tables(repo_name, swapped_tables, conn)
+
+
+def load_chunks_single_repo(
+        chunks: Iterator[Dict[str, pd.DataFrame]],
+        merges_info: pd.DataFrame,
+        commits_parents: pd.DataFrame,
+        repo_name: str,
+        db_engine: Engine,
+        incremental: bool,
+        memory_budget: MemoryBudget,
+        ref_tips: Optional[List[str]] = None
+) -> int:
+    """
+    Preprocess and load data of single repository chunk by chunk. Row-level
+    tables (general info, all words) are loaded chunk by chunk, while
+    aggregated tables (authors stats, words frequencies, rollups) are
+    accumulated in memory - their size depends on the number of authors,
+    unique words and days, not on the number of commits. Memory used by
+    each chunk is reported to the memory budget, which determines size of
+    the next chunk. Replaced tables are loaded into staging tables and
+    swapped at the end, together with saving the watermark.
+
+    Postgres loads all the chunks in a single transaction. SQLite allows
+    single writer, which locks the whole database for the whole transaction,
+    so chunks are loaded into staging tables in separate short transactions
+    (also new commits in the incremental mode) - producing the next chunk
+    (e.g. 'git log' traversal in the streaming mode) doesn't block loading
+    of other repositories. New commits are appended to the target tables,
+    aggregated tables are swapped and watermark is saved in the final
+    transaction.
+
+    :param chunks: iterator of raw data tables (with keys the same as in the
+        OUTPUT_FILES dictionary, except 'merges_info' and 'commits_parents'),
+        which takes size of the next chunk from 'memory_budget'
+    :param merges_info: table containing all merges of the repository
+    :param commits_parents: table containing parents of all commits of
+        the repository
+    :param repo_name: repo name which will be set as tables prefix
+    :param db_engine: db engine created by 'create_engine' method
+    :param incremental: whether chunks contain only new commits. In such
+        case they are appended to existing tables and aggregated tables
+        are updated, otherwise all tables are replaced
+    :param memory_budget: memory budget of the repository
+    :param ref_tips: watermark of the repository saved together with the
+        loaded tables, not saved if None
+    :return: number of loaded commits
+    """
+
+    # Nearest merges depend on the whole graph of commits, so they are found
+    # once for all the chunks
+    nearest_merges = RepoRawDataset(
+        repo_name, {"merges_info": merges_info, "commits_parents": commits_parents}
+    ).get_nearest_merges()
+    memory_budget.set_resident_tables([merges_info, commits_parents, nearest_merges])
+
+    if db_engine.dialect.name != "sqlite":
+        with db_engine.begin() as conn:
+            # Commits are updated before appending new ones - new commits
+            # already have nearest merges assigned
+            merged_commits = update_pending_merges_info(
+                merges_info, repo_name, conn, nearest_merges
+            ) if incremental else None
+            commits_number, aggregates = _load_chunks(
+                chunks, merges_info, nearest_merges, repo_name,
+                lambda: nullcontext(conn), not incremental, memory_budget
+            )
+            _finish_chunks_loading(aggregates, commits_number, merged_commits, repo_name, conn, incremental)
+            if ref_tips is not None:
+                save_watermark(conn, repo_name, ref_tips)
+
+        return commits_number
+
+    commits_number, aggregates = _load_chunks(
+        chunks, merges_info, nearest_merges, repo_name, db_engine.begin, True, memory_budget
+    )
+    with db_engine.begin() as conn:
+        merged_commits = None
+        if incremental:
+            merged_commits = update_pending_merges_info(merges_info, repo_name, conn, nearest_merges)
+            if commits_number > 0:
+                logger.info("Appending new commits to row-level tables, repo: '{0}'".format(repo_name))
+                for table_type in ["general_info", "messages_all_words"]:
+                    append_staging_table(get_table_name(table_type, repo_name), conn)
+        _finish_chunks_loading(aggregates, commits_number, merged_commits, repo_name, conn, incremental)
+        if ref_tips is not None:
+            save_watermark(conn, repo_name, ref_tips)
+
+    return commits_number
+
+
+def load_preprocessed_single_repo(preprocessed: PreprocessedRepo, db_engine: Engine) -> None:
+    """
+    Load preprocessed tables of single repository. If they contain full
+    history, tables are replaced. If they contain only commits added since
+    the previous run (incremental extraction), they are appended to the
+    existing tables. Afterwards the watermark of the repository is saved.
+
+    :param preprocessed: tables preprocessed from raw data
+    :param db_engine: db engine created by 'create_engine' method
+    """
+
+    repo_name = preprocessed.repo_name
+    extraction_state = preprocessed.extraction_state
+
+    if preprocessed.incremental:
+        logger.info("Loading new commits incrementally, repo: '{0}'".format(repo_name))
+        with db_engine.begin() as conn:
+            _load_data_single_repo_incremental(preprocessed, conn)
+            save_watermark(conn, repo_name, extraction_state.get("ref_tips"))
+    else:
+        with db_engine.begin() as conn:
+            _load_data_single_repo_full(preprocessed, conn)
+            if extraction_state is not None:
+                save_watermark(conn, repo_name, extraction_state.get("ref_tips"))
+
+
+def load_data_single_repo(
+        raw_data_path: str,
+        db_engine: Engine,
+        repo_name: str = None,
+        memory_budget_mb: float = PREPROCESSING_MEMORY_BUDGET_MB
+) -> None:
+    """
+    Load all tables for single repository. Please note that tables names
+    are in format {repo_name}_table_suffix. As default the directory name
+    is treat as repo name - to change this behaviour please set 'repo_name'
+    argument.
+
+    If raw data contains full history, tables are replaced. If it contains
+    only commits added since the previous run (incremental extraction), they
+    are appended to the existing tables. Afterwards the watermark of the
+    repository is saved.
+
+    In the 'chunked' preprocessing mode (see PREPROCESSING_MODE in config)
+    raw files are read and processed in chunks fitting into the memory budget.
+
+    :param raw_data_path: path to directory where raw data is stored
+    :param db_engine: db engine created by 'create_engine' method
+    :param repo_name: repo name which will be set as tables prefix. Name
+        of raw files directory if None
+    :param memory_budget_mb: memory budget of preprocessing in megabytes
+        (in the 'chunked' mode or with the 'duckdb' backend)
+    """
+
+    if repo_name is None:
+        repo_name = os.path.basename(raw_data_path)
+
+    if PREPROCESSING_MODE == "chunked":
+        extraction_state = read_extraction_state(raw_data_path)
+        incremental = extraction_state is not None and extraction_state.get("incremental")
+
+        logger.info("Loading data in chunks, repo: '{0}'".format(repo_name))
+        dataset = RepoRawDataset(raw_data_path)
+        memory_budget = MemoryBudget(memory_budget_mb, STREAMING_CHUNK_SIZE)
+        load_chunks_single_repo(
+            dataset.iter_chunks(memory_budget.get_chunk_size),
+            dataset.get_table("merges_info"),
+            dataset.get_table("commits_parents"),
+            repo_name,
+            db_engine,
+            incremental,
+            memory_budget,
+            extraction_state.get("ref_tips") if extraction_state is not None else None
+        )
+        logger.info("Estimated peak memory of preprocessing: {0:.1f} MB, repo: '{1}'".format(
+            memory_budget.peak_bytes / 1024 ** 2, repo_name)
+        )
+    elif PREPROCESSING_MODE != "in_memory":
+        raise ValueError("Unknown preprocessing mode: '{0}'".format(PREPROCESSING_MODE))
+    else:
+        load_preprocessed_single_repo(
+            preprocess_raw_data_single_repo(raw_data_path, repo_name, memory_budget_mb), db_engine
+        )
+
+
+def _preprocess_in_worker(
+        raw_data_path: str,
+        db_url: URL,
+        memory_budget_mb: float,
+        duckdb_threads: int
+) -> Tuple[Optional[PreprocessedRepo], Dict[str, str], float]:
+    """
+    Preprocess raw data of single repository in the worker process. In the
+    'chunked' mode preprocessing and loading are interleaved, so the
+    repository is also loaded by the worker, using its own engine (shared
+    by all the repositories loaded by the worker).
+
+    :param raw_data_path: path to directory where raw data is stored
+    :param db_url: URL of the database, used only in the 'chunked' mode
+    :param memory_budget_mb: memory budget of preprocessing in megabytes
+        (in the 'chunked' mode or with the 'duckdb' backend)
+    :param duckdb_threads: number of threads used by the 'duckdb' backend
+    :return: tuple containing preprocessed tables (None if they were
+        already loaded), stems computed by the worker and time of
+        preprocessing in seconds
+    """
+
+    start = time.perf_counter()
+    if PREPROCESSING_MODE == "chunked":
+        load_data_single_repo(raw_data_path, get_engine_for_url(db_url), memory_budget_mb=memory_budget_mb)
+        preprocessed = None
+    else:
+        preprocessed = preprocess_raw_data_single_repo(
+            raw_data_path, memory_budget_mb=memory_budget_mb, duckdb_threads=duckdb_threads
+        )
+
+    return preprocessed, get_stem_cache().pop_new_stems(), time.perf_counter() - start
+
+
+def _load_in_thread(preprocessed: PreprocessedRepo, db_engine: Engine) -> float:
+    """
+    Load preprocessed tables of single repository and measure time of it.
+
+    :param preprocessed: tables preprocessed from raw data
+    :param db_engine: db engine created by 'create_engine' method
+    :return: time of loading in seconds
+    """
+
+    start = time.perf_counter()
+    load_preprocessed_single_repo(preprocessed, db_engine)
+
+    return time.perf_counter() - start
+
+
+def load_data_all_repos_parallel(
+        raw_data_paths: List[str],
+        db_engine: Engine,
+        preprocessing_workers: int = PREPROCESSING_WORKERS,
+        loading_workers: int = DB_LOADING_WORKERS
+) -> Dict[str, Dict[str, float]]:
+    """
+    Load data of many repositories, preprocessing them in the pool of
+    processes and loading them to the database in the pool of threads at
+    the same time - each repository is loaded as soon as it's preprocessed.
+    Number of repositories kept in memory (being preprocessed or waiting for
+    loading) is limited to the total number of workers. Failure of single
+    repository doesn't stop processing of the remaining ones.
+
+    :param raw_data_paths: paths to directories where raw data is stored
+    :param db_engine: db engine created by 'create_engine' method
+    :param preprocessing_workers: number of processes preprocessing raw data
+    :param loading_workers: maximum number of repositories loaded at the
+        same time (number of database connections used for loading)
+    :return: dictionary containing times of preprocessing and loading (in
+        seconds, loading time is missing in the 'chunked' mode) of
+        successfully loaded repositories
+    """
+
+    start = time.perf_counter()
+    pending_paths = list(raw_data_paths)
+
+    # Memory budget and CPU cores are split between the processes
+    memory_budget_mb = PREPROCESSING_MEMORY_BUDGET_MB / preprocessing_workers
+    cpu_count = os.cpu_count() or 1
+    duckdb_threads = min(DUCKDB_THREADS or cpu_count, max(1, cpu_count // preprocessing_workers))
+    preprocessing = {}
+    loading = {}
+    timings = {}
+    failures = {}
+
+    # Processes are spawned, not forked - the ETL runs inside the threaded
+    # Flask app and forking it could copy locks held by other threads
+    with ProcessPoolExecutor(preprocessing_workers, mp_context=multiprocessing.get_context("spawn")) as processes, \
+            ThreadPoolExecutor(loading_workers) as threads:
+        while pending_paths or preprocessing or loading:
+            while pending_paths and len(preprocessing) + len(loading) < preprocessing_workers + loading_workers:
+                raw_data_path = pending_paths.pop(0)
+                future = processes.submit(
+                    _preprocess_in_worker,
+                    raw_data_path,
+                    db_engine.url,
+                    memory_budget_mb,
+                    duckdb_threads
+                )
+                preprocessing[future] = os.path.basename(raw_data_path)
+
+            done, _ = wait(list(preprocessing) + list(loading), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in preprocessing:
+                    repo_name = preprocessing.pop(future)
+                    try:
+                        preprocessed, new_stems, preprocessing_time = future.result()
+                    except Exception as e:
+                        logger.error("Preprocessing data of repo '{0}' failed: {1}".format(repo_name, str(e)))
+                        failures[repo_name] = str(e)
+                        continue
+
+                    get_stem_cache().add_stems(new_stems)
+                    timings[repo_name] = {"preprocessing": preprocessing_time}
+                    if preprocessed is not None:
+                        loading[threads.submit(_load_in_thread, preprocessed, db_engine)] = repo_name
+                else:
+                    repo_name = loading.pop(future)
+                    try:
+                        timings[repo_name]["loading"] = future.result()
+                    except Exception as e:
+                        logger.error("Loading data of repo '{0}' failed: {1}".format(repo_name, str(e)))
+                        failures[repo_name] = str(e)
+                        del timings[repo_name]
+
+    for repo_name, repo_timings in timings.items():
+        logger.info("Repo '{0}' preprocessed in {1:.2f}s{2}".format(
+            repo_name, repo_timings.get("preprocessing"),
+            ", loaded in {0:.2f}s".format(repo_timings.get("loading")) if "loading" in repo_timings else ""
+        ))
+    logger.info("Loaded {0} of {1} repos in {2:.2f}s using {3} processes and {4} loading threads".format(
+        len(timings), len(raw_data_paths), time.perf_counter() - start, preprocessing_workers, loading_workers
+    ))
+
+    # Stems computed for successfully loaded repositories are kept anyway
+    get_stem_cache().save()
+
+    if failures:
+        raise DBLoadingError(
+            "Loading data failed for following repos: {0}".format(
+                "; ".join(
+                    "'{0}': {1}".format(repo_name, error_msg)
+                    for repo_name, error_msg in failures.items()
+                )
+            )
+        )
+
+    return timings
+
+
 def load_data_all_repos(raw_data_dir: str) -> None:
     """
-    Load data for all analyzed repositories to the db
+    Load data for all analyzed repositories to the db. If PREPROCESSING_WORKERS
+    is greater than 1, repositories are preprocessed in parallel (see
+    'load_data_all_repos_parallel'), otherwise one by one.
 
     :param raw_data_dir: directory where raw data is stored
     """
@@ -119,10 +1023,19 @@ def load_data_all_repos(raw_data_dir: str) -> None:
         ]
 
         logger.info("Found following directories with data: {0}".format(raw_data_paths))
+    except Exception as e:
+        raise DBLoadingError(str(e))
 
+    if PREPROCESSING_WORKERS > 1:
+        load_data_all_repos_parallel(raw_data_paths, engine)
+        return
+
+    try:
         for single_path in raw_data_paths:
             load_data_single_repo(
                 single_path, db_engine=engine
             )
+
+        get_stem_cache().save()
     except Exception as e:
         raise DBLoadingError(str(e))
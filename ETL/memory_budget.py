@@ -0,0 +1,126 @@
+"""
+Tools allowing to keep memory usage of chunked preprocessing (streaming
+and chunked modes) within the configured budget. Size of the next chunk is
+derived from the memory used by the previous one, so chunks of repositories
+with long messages or many authors are automatically smaller. Aggregated
+tables (authors summary, words frequencies) and tables describing the
+whole graph of commits (merges, parents and nearest merges of all commits),
+which are kept in memory during the whole processing, can't be split into
+chunks - if they alone exceed the budget, processing is stopped with an
+error.
+"""
+
+import os
+
+import pandas as pd
+import logging.config
+
+from typing import Iterable
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+# Number of commits in the first chunk, used to estimate memory usage
+# of a single commit
+_INITIAL_CHUNK_SIZE = 1000
+
+# Minimal reasonable chunk size - if even such chunk doesn't fit into
+# the budget, processing is stopped
+_MIN_CHUNK_SIZE = 100
+
+# Ratio of the peak memory used during processing of the chunk (joins,
+# explode, conversions made by 'to_sql') to the size of its output tables
+_OVERHEAD_FACTOR = 4
+
+
+class MemoryBudgetExceededError(Exception):
+    """
+    Exception raised in case when data can't be processed within
+    the memory budget.
+    """
+    pass
+
+
+def get_tables_memory(tables: Iterable[pd.DataFrame]) -> int:
+    """
+    Get memory used by provided tables, including content of strings.
+
+    :param tables: tables as pandas DataFrames
+    :return: memory in bytes
+    """
+    return int(sum(tab.memory_usage(deep=True).sum() for tab in tables))
+
+
+class MemoryBudget:
+    """
+    Class controlling size of chunks processed by the single repository
+    ETL process.
+    """
+
+    def __init__(self, budget_mb: float, max_chunk_size: int):
+        """
+        Create an instance of the class
+
+        :param budget_mb: memory budget in megabytes
+        :param max_chunk_size: maximum number of commits in a single chunk
+        """
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self.max_chunk_size = max_chunk_size
+        self.chunk_size = min(max_chunk_size, _INITIAL_CHUNK_SIZE)
+        self.peak_bytes = 0
+        self.resident_bytes = 0
+
+    def set_resident_tables(self, tables: Iterable[pd.DataFrame]) -> None:
+        """
+        Set tables kept in memory during processing of all the chunks
+        (e.g. merges of the whole repository). They are counted once,
+        together with the aggregated tables.
+
+        :param tables: tables as pandas DataFrames
+        """
+
+        self.resident_bytes = get_tables_memory(tables)
+        self.peak_bytes = max(self.peak_bytes, self.resident_bytes)
+
+        if self.resident_bytes >= self.budget_bytes:
+            raise MemoryBudgetExceededError(
+                "Memory budget of {0:.0f} MB exceeded: tables of the whole repository use {1:.1f} MB".format(
+                    self.budget_bytes / 1024 ** 2, self.resident_bytes / 1024 ** 2
+                )
+            )
+
+    def get_chunk_size(self) -> int:
+        """
+        Get number of commits which should be processed in the next chunk.
+
+        :return: chunk size
+        """
+        return self.chunk_size
+
+    def update(self, chunk_rows: int, chunk_bytes: int, aggregates_bytes: int) -> None:
+        """
+        Update chunk size based on the memory used by the last chunk and
+        by the aggregated tables accumulated so far (together with the
+        resident tables, see 'set_resident_tables').
+
+        :param chunk_rows: number of commits in the last chunk
+        :param chunk_bytes: memory used by tables of the last chunk
+        :param aggregates_bytes: memory used by the aggregated tables
+        """
+
+        aggregates_bytes += self.resident_bytes
+        self.peak_bytes = max(self.peak_bytes, chunk_bytes * _OVERHEAD_FACTOR + aggregates_bytes)
+
+        available_bytes = self.budget_bytes - aggregates_bytes
+        bytes_per_commit = chunk_bytes * _OVERHEAD_FACTOR / max(chunk_rows, 1)
+        chunk_size = int(available_bytes / bytes_per_commit) if bytes_per_commit > 0 else self.max_chunk_size
+
+        if chunk_size < _MIN_CHUNK_SIZE:
+            raise MemoryBudgetExceededError(
+                "Memory budget of {0:.0f} MB exceeded: aggregated and resident tables use {1:.1f} MB, "
+                "single commit needs {2:.1f} kB".format(
+                    self.budget_bytes / 1024 ** 2, aggregates_bytes / 1024 ** 2, bytes_per_commit / 1024
+                )
+            )
+
+        self.chunk_size = min(self.max_chunk_size, chunk_size)
@@ -0,0 +1,91 @@
+"""
+Nearest merge of each commit found using the graph of commits. The nearest
+merge is the earliest (in terms of merge timestamp) merge commit which has
+given commit as an ancestor - the first merge which actually brought the
+commit in, regardless of merges made on other branches in the meantime.
+
+Merges are processed in ascending order of timestamps. Each of them walks
+its ancestors, stopping at commits which were already visited - they are
+contained in an earlier merge, and so are all their ancestors. Each commit
+is visited only once, so time is linear in the size of the graph, without
+checking reachability of each pair of commit and merge.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import List, Tuple
+from config.config import HEADERS
+
+
+def _get_parents_graph(commits_parents: pd.DataFrame) -> Tuple[pd.Index, List[int], List[int], np.ndarray]:
+    """
+    Transform parents lists into the compressed adjacency list - parents of
+    i-th commit are stored in 'parents[offsets[i]:offsets[i + 1]]' as
+    positions of commits in the table.
+
+    :param commits_parents: table containing commit_hash and parent_hashes
+        (hashes separated with space) columns
+    :return: tuple containing index of commits hashes, offsets and parents
+        as lists of ints (parents missing in the table, e.g. in shallow
+        clones, are marked as -1) and array of numbers of parents
+    """
+
+    commits_index = pd.Index(commits_parents.commit_hash.astype(object))
+    parents_lists = commits_parents.parent_hashes.fillna("").astype(object).str.split()
+
+    parents_numbers = parents_lists.str.len().to_numpy()
+    offsets = np.concatenate([[0], np.cumsum(parents_numbers)])
+    parents = commits_index.get_indexer(
+        pd.Index([parent for parents_list in parents_lists for parent in parents_list], dtype=object)
+    )
+
+    return commits_index, offsets.tolist(), parents.tolist(), parents_numbers
+
+
+def find_nearest_merges(commits_parents: pd.DataFrame, merges_info: pd.DataFrame) -> pd.DataFrame:
+    """
+    Find nearest merge of all commits (except merges) contained in any merge.
+
+    :param commits_parents: table containing all commits of the repository
+        (including merges) with their parents
+    :param merges_info: table containing hashes and timestamps of merges
+    :return: DataFrame containing commit_hash and columns of merges info
+        table (merge_hash and merge_unix_time). Commits which are not
+        contained in any merge are skipped
+    """
+
+    merges_cols = HEADERS.get("merges_info")
+    commits_index, offsets, parents, parents_numbers = _get_parents_graph(commits_parents)
+
+    # Ties are resolved by hashes, so results don't depend on the order of input
+    merges_sorted = merges_info[merges_cols].astype({"merge_hash": object}).sort_values(
+        ["merge_unix_time", "merge_hash"]
+    ).reset_index(drop=True)
+    merges_positions = commits_index.get_indexer(merges_sorted.merge_hash).tolist()
+
+    nearest_merge = [-1] * len(commits_index)
+    visited = bytearray(len(commits_index))
+    for merge_number, merge_position in enumerate(merges_positions):
+        if merge_position < 0 or visited[merge_position]:
+            # Merge is missing or it's contained in an earlier merge together
+            # with all its ancestors
+            continue
+
+        visited[merge_position] = 1
+        stack = [merge_position]
+        while stack:
+            position = stack.pop()
+            for parent in parents[offsets[position]:offsets[position + 1]]:
+                if parent >= 0 and not visited[parent]:
+                    visited[parent] = 1
+                    nearest_merge[parent] = merge_number
+                    stack.append(parent)
+
+    nearest_merge = np.array(nearest_merge, dtype=np.int64)
+    found = (nearest_merge >= 0) & (parents_numbers <= 1)
+
+    res = merges_sorted.iloc[nearest_merge[found]].reset_index(drop=True)
+    res.insert(0, "commit_hash", commits_index[found])
+
+    return res
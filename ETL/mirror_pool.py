@@ -0,0 +1,372 @@
+"""
+Pool of local bare mirrors of analyzed repositories. Instead of cloning
+each repository as a submodule and deleting it after the raw data is
+generated, mirrors are kept between runs and only updated with 'git fetch'.
+When the total size of mirrors exceeds the disk budget, the least recently
+used ones are evicted.
+
+After each update commit-graph file is written for the mirror, so the
+history walks done during raw data retrieval don't need to parse commit
+objects one by one.
+
+Mirrors can be cloned as partial clones (see CLONE_STRATEGY in config) - if
+we don't need diff stats, commits metadata is all we need, so trees and
+blobs don't have to be downloaded at all.
+"""
+
+import os
+import time
+import shutil
+import subprocess
+
+import logging.config
+
+from typing import List, Optional
+
+from config.config import MIRRORS_DIR, MIRRORS_DISK_BUDGET_GB, CLONE_STRATEGY, EXTRACT_DIFF_STATS, \
+    WRITE_COMMIT_GRAPH
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+# Name of the file, stored inside each mirror, containing the UNIX timestamp
+# of the last run in which given mirror was used
+_LAST_USED_FILE = "commits_analyzer_last_used"
+
+# Values of the '--filter' option for each clone strategy
+_CLONE_FILTERS = {
+    "full": None,
+    "blobless": "blob:none",
+    "treeless": "tree:0"
+}
+
+# Upload-pack command used for local ('file://') remotes. Filtering has to be
+# allowed by the serving side, which in this case is just a local process, so
+# we enable it explicitly
+_LOCAL_UPLOAD_PACK = "git -c uploadpack.allowFilter=true -c uploadpack.allowAnySHA1InWant=true upload-pack"
+
+
+class MirrorPoolError(Exception):
+    """
+    Exception raised in case when process of updating mirrors
+    is broken.
+    """
+    pass
+
+
+class MirrorPool:
+
+    """
+    This class manages bare mirrors of repositories stored in the
+    mirrors directory. Mirrors are named after the repositories (basename
+    of url), the same way as submodules, so raw data retrieval can be run
+    directly against them.
+    """
+
+    def __init__(
+            self,
+            mirrors_dir: str = MIRRORS_DIR,
+            disk_budget_gb: float = MIRRORS_DISK_BUDGET_GB,
+            clone_strategy: str = CLONE_STRATEGY
+    ):
+        """
+        Initialize an instance of the class
+
+        :param mirrors_dir: directory in which mirrors are stored
+        :param disk_budget_gb: maximum total size of mirrors in gigabytes
+        :param clone_strategy: one of 'full', 'blobless', 'treeless' or 'auto'
+        """
+        self.mirrors_dir = mirrors_dir
+        self.disk_budget_bytes = int(disk_budget_gb * 1024 ** 3)
+        self.clone_filter = self._get_clone_filter(clone_strategy)
+
+        # Statistics of the current run
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+
+    @staticmethod
+    def _get_clone_filter(clone_strategy: str) -> Optional[str]:
+        """
+        Translate clone strategy to the value of '--filter' option. In the
+        'auto' mode mirrors are treeless if diff stats are not extracted
+        (only commits are needed then) and full otherwise - computing diff
+        stats in a partial clone makes git fetch missing objects commit by
+        commit, which is much slower than downloading them at once.
+
+        :param clone_strategy: one of 'full', 'blobless', 'treeless' or 'auto'
+        :return: filter specification or None for full clones
+        """
+
+        if clone_strategy == "auto":
+            clone_strategy = "full" if EXTRACT_DIFF_STATS else "treeless"
+
+        if clone_strategy not in _CLONE_FILTERS:
+            raise ValueError("Unknown clone strategy: '{0}'".format(clone_strategy))
+
+        return _CLONE_FILTERS.get(clone_strategy)
+
+    @staticmethod
+    def _get_clone_url(repo_url: str) -> str:
+        """
+        Get url used to clone the repository. Local paths are turned into
+        'file://' urls - otherwise git copies the objects directly, ignoring
+        the filter.
+
+        :param repo_url: url or local path to the repository
+        :return: url to clone
+        """
+
+        if os.path.isdir(repo_url):
+            return "file://" + os.path.abspath(repo_url)
+
+        return repo_url
+
+    @staticmethod
+    def _get_mirror_filter(mirror_path: str) -> Optional[str]:
+        """
+        Get filter which was used to clone given mirror.
+
+        :param mirror_path: path to the mirror
+        :return: filter specification or None for full clones
+        """
+
+        proc = subprocess.run(
+            ["git", "-C", mirror_path, "config", "--get", "remote.origin.partialclonefilter"],
+            stdout=subprocess.PIPE, text=True
+        )
+        res = proc.stdout.strip() if proc.returncode == 0 else None
+
+        return res
+
+    @staticmethod
+    def _get_dir_size(path: str) -> int:
+        """
+        Get total size of all files stored in given directory.
+
+        :param path: path to the directory
+        :return: size in bytes
+        """
+
+        res = 0
+        for dir_path, _, files_names in os.walk(path):
+            for file_name in files_names:
+                file_path = os.path.join(dir_path, file_name)
+                if not os.path.islink(file_path):
+                    res += os.path.getsize(file_path)
+
+        return res
+
+    @staticmethod
+    def _is_valid_mirror(mirror_path: str) -> bool:
+        """
+        Check whether given directory contains a bare git repository.
+
+        :param mirror_path: path to the mirror
+        :return: True if mirror can be updated with 'git fetch'
+        """
+
+        proc = subprocess.run(
+            ["git", "-C", mirror_path, "rev-parse", "--is-bare-repository"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        res = proc.returncode == 0 and proc.stdout.strip() == "true"
+
+        return res
+
+    @staticmethod
+    def _get_last_used(mirror_path: str) -> float:
+        """
+        Get the time when given mirror was used for the last time.
+
+        :param mirror_path: path to the mirror
+        :return: UNIX timestamp, 0 if mirror was never marked as used
+        """
+
+        try:
+            with open(os.path.join(mirror_path, _LAST_USED_FILE), 'r') as f:
+                res = float(f.read().strip())
+        except (OSError, ValueError):
+            res = 0.0
+
+        return res
+
+    @staticmethod
+    def _mark_as_used(mirror_path: str) -> None:
+        """
+        Save current time as the time of last usage of given mirror.
+
+        :param mirror_path: path to the mirror
+        """
+
+        with open(os.path.join(mirror_path, _LAST_USED_FILE), 'w') as f:
+            f.write(str(time.time()))
+
+    def _clone_mirror(self, repo_url: str, mirror_path: str) -> None:
+        """
+        Clone the repository as a bare mirror. We fetch only branches and
+        tags - the same refs we would get cloning a submodule - not all refs
+        of the remote (e.g. GitHub pull requests refs).
+
+        :param repo_url: url to the repository
+        :param mirror_path: path to the mirror
+        """
+
+        clone_url = self._get_clone_url(repo_url)
+        command = ["git", "clone", "--bare"]
+        if self.clone_filter is not None:
+            command.append("--filter={0}".format(self.clone_filter))
+        if clone_url.startswith("file://"):
+            command.extend(["--upload-pack", _LOCAL_UPLOAD_PACK])
+
+        subprocess.run(command + [clone_url, mirror_path], check=True)
+        subprocess.run(
+            ["git", "-C", mirror_path, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"],
+            check=True
+        )
+        if clone_url.startswith("file://"):
+            # Used by subsequent fetches, including lazy fetches of missing objects
+            subprocess.run(
+                ["git", "-C", mirror_path, "config", "remote.origin.uploadpack", _LOCAL_UPLOAD_PACK],
+                check=True
+            )
+
+    def _fetch_mirror(self, repo_url: str, mirror_path: str) -> None:
+        """
+        Update existing mirror. Branches deleted on the remote are pruned,
+        so mirror reflects the current state of the repository. Partial
+        clones keep using the filter they were cloned with.
+
+        :param repo_url: url to the repository
+        :param mirror_path: path to the mirror
+        """
+
+        clone_url = self._get_clone_url(repo_url)
+        subprocess.run(["git", "-C", mirror_path, "remote", "set-url", "origin", clone_url], check=True)
+        subprocess.run(["git", "-C", mirror_path, "fetch", "--prune", "--tags", "origin"], check=True)
+
+    def _write_commit_graph(self, mirror_path: str) -> None:
+        """
+        Write commit-graph file of the mirror. It stores commits, their parents
+        and generation numbers in a compact form, which speeds up history
+        traversals and reachability checks. Graph is written incrementally
+        ('--split'), so after fetch only new commits are processed.
+
+        Changed-paths Bloom filters (speeding up path-limited queries) require
+        trees, so they are not computed for treeless mirrors - it would make git
+        download all of them.
+
+        :param mirror_path: path to the mirror
+        """
+
+        command = ["git", "-C", mirror_path, "commit-graph", "write", "--reachable", "--split"]
+        if self.clone_filter != _CLONE_FILTERS.get("treeless"):
+            command.append("--changed-paths")
+
+        start = time.perf_counter()
+        subprocess.run(command, check=True)
+        logger.info(
+            "Commit-graph of mirror '{0}' written in {1:.2f}s".format(mirror_path, time.perf_counter() - start)
+        )
+
+    def get_mirror(self, repo_url: str) -> str:
+        """
+        Get path to the up-to-date mirror of given repository, cloning it
+        if it's not stored in the pool yet.
+
+        :param repo_url: url to the repository
+        :return: path to the mirror
+        """
+
+        mirror_path = os.path.join(self.mirrors_dir, os.path.basename(repo_url))
+
+        is_valid_mirror = os.path.isdir(mirror_path) and self._is_valid_mirror(mirror_path)
+        if is_valid_mirror and self._get_mirror_filter(mirror_path) != self.clone_filter:
+            # E.g. treeless mirror can't be used efficiently when diff
+            # stats are needed, so we need to clone it again
+            logger.info("Clone strategy of repo '{0}' changed, mirror will be cloned again".format(repo_url))
+            is_valid_mirror = False
+
+        if is_valid_mirror:
+            logger.info("Updating mirror of repo '{0}'".format(repo_url))
+            size_before = self._get_dir_size(mirror_path)
+            self._fetch_mirror(repo_url, mirror_path)
+            self.hits += 1
+        else:
+            logger.info("Cloning mirror of repo '{0}'".format(repo_url))
+            # Remove leftovers of broken mirror, if there are any
+            shutil.rmtree(mirror_path, ignore_errors=True)
+            size_before = 0
+            self._clone_mirror(repo_url, mirror_path)
+            self.misses += 1
+
+        self.bytes_fetched += max(self._get_dir_size(mirror_path) - size_before, 0)
+        self._mark_as_used(mirror_path)
+
+        if WRITE_COMMIT_GRAPH:
+            self._write_commit_graph(mirror_path)
+
+        return mirror_path
+
+    def evict(self, paths_to_keep: List[str]) -> None:
+        """
+        Remove least recently used mirrors until their total size fits
+        in the disk budget. Mirrors used in the current run are never
+        removed, even if they exceed the budget on their own.
+
+        :param paths_to_keep: paths to mirrors used in the current run
+        """
+
+        mirrors_paths = [f.path for f in os.scandir(self.mirrors_dir) if f.is_dir()]
+        mirrors_sizes = {path: self._get_dir_size(path) for path in mirrors_paths}
+        total_size = sum(mirrors_sizes.values())
+
+        keep = {os.path.abspath(path) for path in paths_to_keep}
+        candidates = sorted(
+            [path for path in mirrors_paths if os.path.abspath(path) not in keep],
+            key=self._get_last_used
+        )
+
+        for path in candidates:
+            if total_size <= self.disk_budget_bytes:
+                break
+            logger.info("Evicting mirror '{0}' ({1} bytes)".format(path, mirrors_sizes[path]))
+            shutil.rmtree(path)
+            total_size -= mirrors_sizes[path]
+
+        if total_size > self.disk_budget_bytes:
+            logger.warning(
+                "Mirrors used in the current run take {0} bytes, which exceeds the disk budget".format(total_size)
+            )
+
+    def get_mirrors(self, repos_list: List[str]) -> List[str]:
+        """
+        Get up-to-date mirrors of all listed repositories and evict
+        mirrors which don't fit in the disk budget.
+
+        :param repos_list: List of HTTPS urls to the repositories we want
+            to analyze
+        :return: list of paths to the mirrors
+        """
+
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+
+        res = []
+        for repo_url in repos_list:
+            try:
+                res.append(self.get_mirror(repo_url))
+            except Exception as e:
+                raise MirrorPoolError("Repo '{0}': {1}".format(repo_url, str(e)))
+
+        try:
+            self.evict(paths_to_keep=res)
+        except Exception as e:
+            raise MirrorPoolError("Evicting mirrors failed: {0}".format(str(e)))
+
+        logger.info(
+            "Mirror pool stats - cache hits: {0}, cache misses: {1}, bytes fetched: {2}".format(
+                self.hits, self.misses, self.bytes_fetched
+            )
+        )
+
+        return res
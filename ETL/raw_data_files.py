@@ -0,0 +1,427 @@
+"""
+Writers and readers of raw data files. Raw data can be stored (see
+RAW_DATA_FORMAT in config) as:
+    - 'csv' - semicolon separated text files. Fields containing semicolons,
+        quotes or line breaks (messages, authors names) are quoted, so values
+        are read back unchanged
+    - 'parquet' - Parquet files
+    - 'arrow' - Arrow IPC files
+
+Columnar formats are typed, so nothing needs to be escaped or parsed. They
+are compressed with zstd and authors / commiters columns are dictionary
+encoded (they are read as pandas categoricals), so files are much smaller.
+They are read with memory mapping, only columns which are needed.
+
+pyarrow is required only by columnar formats.
+"""
+
+import os
+import csv
+
+import pandas as pd
+
+from types import TracebackType
+from typing import Dict, List, Optional, Tuple, Type, Union
+from config.config import OUTPUT_FILES, HEADERS, RAW_DATA_FORMAT
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Extensions of raw data files in given format, they replace extensions
+# from OUTPUT_FILES
+_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "arrow": ".arrow"
+}
+
+# Separator and quoting of .csv files - the same options have to be used
+# by readers (see ETL.data_preprocessing)
+CSV_SEPARATOR = ";"
+CSV_QUOTING = csv.QUOTE_MINIMAL
+
+# Columns with low cardinality, stored as dictionaries in columnar formats
+_DICTIONARY_COLUMNS = ["author_email", "author_name", "commiter_email", "commiter_name"]
+
+# Integer columns, all the remaining ones are strings
+_INT_COLUMNS = ["merge_unix_time", "commit_unix_time", "insertions", "deletions"]
+
+# Number of rows of single record batch in columnar formats
+_BATCH_SIZE = 50000
+
+# Compression codec of columnar formats
+_COMPRESSION = "zstd"
+
+
+class RawDataFormatError(Exception):
+    """
+    Exception raised in case when raw data format is not supported.
+    """
+    pass
+
+
+def _check_raw_data_format(raw_data_format: str) -> None:
+    """
+    Check whether given raw data format is known and can be used.
+
+    :param raw_data_format: 'csv', 'parquet' or 'arrow'
+    """
+
+    if raw_data_format not in _EXTENSIONS:
+        raise RawDataFormatError("Unknown raw data format: '{0}'".format(raw_data_format))
+
+    if raw_data_format != "csv" and pa is None:
+        raise RawDataFormatError(
+            "Raw data format '{0}' requires pyarrow package to be installed".format(raw_data_format)
+        )
+
+
+def get_raw_data_file_name(file_type: str, raw_data_format: str = RAW_DATA_FORMAT) -> str:
+    """
+    Get name of the raw data file of given type.
+
+    :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+    :param raw_data_format: 'csv', 'parquet' or 'arrow'
+    :return: file name
+    """
+
+    _check_raw_data_format(raw_data_format)
+    res = os.path.splitext(OUTPUT_FILES.get(file_type))[0] + _EXTENSIONS.get(raw_data_format)
+
+    return res
+
+
+def _get_schema(file_type: str) -> "pa.Schema":
+    """
+    Get Arrow schema of the raw data file of given type.
+
+    :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+    :return: schema of the file
+    """
+
+    fields = []
+    for col in HEADERS.get(file_type):
+        if col in _DICTIONARY_COLUMNS:
+            col_type = pa.dictionary(pa.int32(), pa.string())
+        elif col in _INT_COLUMNS:
+            col_type = pa.int64()
+        else:
+            col_type = pa.string()
+        fields.append(pa.field(col, col_type))
+
+    return pa.schema(fields)
+
+
+class CsvRawDataWriter:
+    """
+    Writer of raw data stored as semicolon separated .csv files.
+    """
+
+    def __init__(self, output_dir: str, file_types: Optional[List[str]] = None):
+        """
+        Create an instance of the class and open the files, writing
+        headers to them.
+
+        :param output_dir: directory in which files are created
+        :param file_types: types of files to create (keys from OUTPUT_FILES
+            dict), all of them if None
+        """
+        self.files = {}
+        self.writers = {}
+        for file_type in (file_types if file_types is not None else OUTPUT_FILES):
+            f = open(os.path.join(output_dir, get_raw_data_file_name(file_type, "csv")), 'w', newline="")
+            self.files[file_type] = f
+            self.writers[file_type] = csv.writer(
+                f, delimiter=CSV_SEPARATOR, quoting=CSV_QUOTING, lineterminator="\n"
+            )
+            self.writers[file_type].writerow(HEADERS.get(file_type))
+
+    def write_row(self, file_type: str, values: List[object]) -> None:
+        """
+        Write single row to the file. Values containing separator, quotes
+        or line breaks are quoted.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :param values: values of columns in the order defined by HEADERS
+        """
+        self.writers[file_type].writerow(values)
+
+    def close(self) -> None:
+        """
+        Close all the files.
+        """
+        for f in self.files.values():
+            f.close()
+
+    def __enter__(self) -> "CsvRawDataWriter":
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc_val: Optional[BaseException],
+            exc_tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+
+class ColumnarRawDataWriter:
+    """
+    Writer of raw data stored in Parquet or Arrow IPC files. Rows are
+    buffered and written as record batches. Dictionaries of dictionary
+    encoded columns only grow between batches, so in Arrow IPC files
+    they are written as deltas.
+    """
+
+    def __init__(self, output_dir: str, raw_data_format: str):
+        """
+        Create an instance of the class and open all the files.
+
+        :param output_dir: directory in which files are created
+        :param raw_data_format: 'parquet' or 'arrow'
+        """
+
+        _check_raw_data_format(raw_data_format)
+
+        self.writers = {}
+        self.schemas = {}
+        self.buffers: Dict[str, List[List[object]]] = {}
+        # Dictionaries of dictionary encoded columns - mapping of values to
+        # codes and list of values
+        self.dictionaries: Dict[Tuple[str, str], Tuple[Dict[str, int], List[str]]] = {}
+
+        for file_type in OUTPUT_FILES:
+            path = os.path.join(output_dir, get_raw_data_file_name(file_type, raw_data_format))
+            schema = _get_schema(file_type)
+            if raw_data_format == "parquet":
+                writer = pq.ParquetWriter(
+                    path, schema, compression=_COMPRESSION,
+                    use_dictionary=[col for col in HEADERS.get(file_type) if col in _DICTIONARY_COLUMNS]
+                )
+            else:
+                writer = ipc.new_file(
+                    path, schema,
+                    options=ipc.IpcWriteOptions(compression=_COMPRESSION, emit_dictionary_deltas=True)
+                )
+
+            self.writers[file_type] = writer
+            self.schemas[file_type] = schema
+            self.buffers[file_type] = [[] for _ in HEADERS.get(file_type)]
+            for col in HEADERS.get(file_type):
+                if col in _DICTIONARY_COLUMNS:
+                    self.dictionaries[(file_type, col)] = ({}, [])
+
+    def write_row(self, file_type: str, values: List[object]) -> None:
+        """
+        Buffer single row, write record batch if buffer is full. Empty
+        strings are stored as nulls, the same way as 'pd.read_csv'
+        treats empty fields.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :param values: values of columns in the order defined by HEADERS
+        """
+
+        buffer = self.buffers[file_type]
+        for col_values, v in zip(buffer, values):
+            col_values.append(None if v == "" else v)
+
+        if len(buffer[0]) >= _BATCH_SIZE:
+            self._flush(file_type)
+
+    def _get_dictionary_array(self, file_type: str, col: str, values: List[Optional[str]]) -> "pa.Array":
+        """
+        Encode values of dictionary column using dictionary shared by all
+        batches of the file.
+
+        :param file_type: type of the file
+        :param col: name of the column
+        :param values: values to encode
+        :return: dictionary array
+        """
+
+        codes, dictionary = self.dictionaries[(file_type, col)]
+        indices = []
+        for v in values:
+            if v is None:
+                indices.append(None)
+                continue
+            code = codes.get(v)
+            if code is None:
+                code = len(dictionary)
+                codes[v] = code
+                dictionary.append(v)
+            indices.append(code)
+
+        res = pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(dictionary, type=pa.string())
+        )
+
+        return res
+
+    def _flush(self, file_type: str) -> None:
+        """
+        Write buffered rows of given file as a record batch.
+
+        :param file_type: type of the file
+        """
+
+        buffer = self.buffers[file_type]
+        if not buffer[0]:
+            return
+
+        schema = self.schemas[file_type]
+        arrays = [
+            self._get_dictionary_array(file_type, field.name, col_values)
+            if field.name in _DICTIONARY_COLUMNS
+            else pa.array(col_values, type=field.type)
+            for field, col_values in zip(schema, buffer)
+        ]
+        self.writers[file_type].write_batch(pa.record_batch(arrays, schema=schema))
+        self.buffers[file_type] = [[] for _ in buffer]
+
+    def close(self) -> None:
+        """
+        Write remaining rows and close all the files.
+        """
+        for file_type, writer in self.writers.items():
+            self._flush(file_type)
+            writer.close()
+
+    def __enter__(self) -> "ColumnarRawDataWriter":
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc_val: Optional[BaseException],
+            exc_tb: Optional[TracebackType]
+    ) -> None:
+        self.close()
+
+
+def get_raw_data_writer(
+        output_dir: str,
+        raw_data_format: str = RAW_DATA_FORMAT
+) -> Union[CsvRawDataWriter, ColumnarRawDataWriter]:
+    """
+    Get writer of raw data files in given format.
+
+    :param output_dir: directory in which files are created
+    :param raw_data_format: 'csv', 'parquet' or 'arrow'
+    :return: writer object, which should be used as a context manager
+    """
+
+    _check_raw_data_format(raw_data_format)
+    if raw_data_format == "csv":
+        return CsvRawDataWriter(output_dir)
+
+    return ColumnarRawDataWriter(output_dir, raw_data_format)
+
+
+def read_arrow_table(path: str, raw_data_format: str, columns: Optional[List[str]] = None) -> "pa.Table":
+    """
+    Read raw data file stored in a columnar format as an Arrow table. File
+    is memory mapped and only requested columns are read.
+
+    :param path: path to the file
+    :param raw_data_format: 'parquet' or 'arrow'
+    :param columns: columns to read, all of them if None
+    :return: table as pyarrow Table
+    """
+
+    _check_raw_data_format(raw_data_format)
+    if raw_data_format == "parquet":
+        res = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        res = ipc.open_file(pa.memory_map(path)).read_all()
+        if columns is not None:
+            res = res.select(columns)
+
+    return res
+
+
+def read_columnar_table(path: str, raw_data_format: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read raw data file stored in a columnar format. File is memory mapped
+    and only requested columns are read.
+
+    :param path: path to the file
+    :param raw_data_format: 'parquet' or 'arrow'
+    :param columns: columns to read, all of them if None
+    :return: table as pandas DataFrame
+    """
+    return read_arrow_table(path, raw_data_format, columns).to_pandas()
+
+
+class ColumnarChunkReader:
+    """
+    Reader of raw data file stored in a columnar format, returning
+    chunks of any requested size, the same way as the reader created
+    by 'pd.read_csv' with the 'iterator' option.
+    """
+
+    def __init__(self, path: str, raw_data_format: str, columns: Optional[List[str]] = None):
+        """
+        Create an instance of the class
+
+        :param path: path to the file, which will be memory mapped
+        :param raw_data_format: 'parquet' or 'arrow'
+        :param columns: columns to read, all of them if None
+        """
+
+        _check_raw_data_format(raw_data_format)
+        if raw_data_format == "parquet":
+            parquet_file = pq.ParquetFile(path, memory_map=True)
+            columns = columns if columns is not None else parquet_file.schema_arrow.names
+            self.schema = pa.schema([parquet_file.schema_arrow.field(col) for col in columns])
+            self.batches = parquet_file.iter_batches(batch_size=_BATCH_SIZE, columns=columns)
+        else:
+            reader = ipc.open_file(pa.memory_map(path))
+            columns = columns if columns is not None else reader.schema.names
+            self.schema = pa.schema([reader.schema.field(col) for col in columns])
+            self.batches = (reader.get_batch(i).select(columns) for i in range(reader.num_record_batches))
+
+        self.pending = self.schema.empty_table()
+        self.rows_read = 0
+
+    def get_chunk(self, size: int) -> pd.DataFrame:
+        """
+        Read next chunk of the file. Rows are indexed continuously
+        between chunks.
+
+        :param size: maximum number of rows to read
+        :return: chunk as pandas DataFrame
+        """
+
+        while self.pending.num_rows < size:
+            batch = next(self.batches, None)
+            if batch is None:
+                break
+            self.pending = pa.concat_tables([self.pending, pa.Table.from_batches([batch], schema=self.schema)])
+
+        if self.pending.num_rows == 0:
+            raise StopIteration
+
+        chunk = self.pending.slice(0, size)
+        self.pending = self.pending.slice(size)
+
+        res = chunk.to_pandas()
+        res.index = pd.RangeIndex(self.rows_read, self.rows_read + len(res))
+        self.rows_read += len(res)
+
+        return res
+
+    def __enter__(self) -> "ColumnarChunkReader":
+        return self
+
+    def __exit__(
+            self,
+            exc_type: Optional[Type[BaseException]],
+            exc_val: Optional[BaseException],
+            exc_tb: Optional[TracebackType]
+    ) -> None:
+        self.pending = None
@@ -4,17 +4,77 @@ repository
 """
 
 import os
+import re
+import time
+import shlex
 import subprocess
 import logging.config
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
-from config.config import OUTPUT_FILES, GENERAL_INFO_FORMAT, HEADERS
+import numpy as np
+import pandas as pd
+
+from config.config import OUTPUT_FILES, GENERAL_INFO_FORMAT, HEADERS, INSERTIONS_DELETIONS_RETRIEVAL_MODE, \
+    RAW_DATA_EXTRACTION_MODE, RAW_DATA_WORKERS, EXTRACT_DIFF_STATS, USE_COMMIT_GRAPH, RAW_DATA_FORMAT
+from ETL.raw_data_files import get_raw_data_writer, CsvRawDataWriter, ColumnarRawDataWriter
+from ETL.watermarks import save_extraction_state
 
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
 logger = logging.getLogger("consoleLogger")
 
+# Character used to mark the beginning of each commit record in the
+# 'git log' output (ASCII record separator). It can't appear in the
+# hash or in the '--shortstat' summary line, so it is a safe marker.
+_RECORD_SEPARATOR = "\x1e"
+
+# Character separating fields of single commit record in the 'git log'
+# output (ASCII unit separator). Git doesn't escape it, so it can appear in
+# the subject of the commit message (the last field)
+_FIELD_SEPARATOR = "\x1f"
+
+# Fields retrieved for each commit in the single traversal mode:
+# - Commit full hash
+# - Parents hashes separated with space (more than one for merges)
+# - Author email
+# - Author name
+# - UNIX timestamp
+# - Committer email
+# - Committer name
+# - Subject of the commit message
+_SINGLE_TRAVERSAL_FIELDS = ["%H", "%P", "%ae", "%an", "%at", "%ce", "%cn", "%s"]
+_SINGLE_TRAVERSAL_FORMAT = _RECORD_SEPARATOR + _FIELD_SEPARATOR.join(_SINGLE_TRAVERSAL_FIELDS)
+
+# Separators removed from values of fields
+_SEPARATORS_TRANSLATION = str.maketrans("", "", _RECORD_SEPARATOR + _FIELD_SEPARATOR)
+
+# Patterns used to extract number of insertions and deletions from the
+# '--shortstat' summary line, e.g. ' 2 files changed, 5 insertions(+), 1 deletion(-)'
+_INSERTIONS_PATTERN = re.compile(r"(\d+) insertions?\(\+\)")
+_DELETIONS_PATTERN = re.compile(r"(\d+) deletions?\(-\)")
+
+# Writer of raw data files in any of supported formats
+RawDataWriter = Union[CsvRawDataWriter, ColumnarRawDataWriter]
+
+
+def _split_fields(line: str, fields_number: int) -> List[str]:
+    """
+    Split single line of the 'git log' output into fields. The last field
+    (subject of the commit message) keeps separators which appear inside
+    it, so they are removed from values afterwards.
+
+    :param line: line containing fields separated by the unit separator
+    :param fields_number: number of fields in the line
+    :return: list of fields
+    """
+
+    return [
+        field.translate(_SEPARATORS_TRANSLATION)
+        for field in line.split(_FIELD_SEPARATOR, maxsplit=fields_number - 1)
+    ]
+
 
 class RawDataGenerationError(Exception):
     """
@@ -38,30 +98,55 @@ class RawDataRetriever:
         - commits_messages.csv - list of all commits messages
         - insetions_deletions.csv - number of insertions and deletions for each commit
         - merges_info.csv - hashes and time of merges, we will use it in the analysis
+        - commits_parents.csv - parents of all commits (including merges), used to
+            find the nearest merge of each commit
     """
 
-    # Format of output file for commits general info, which includes:
-    # - Commit full hash
-    # - Author email
-    # - Author name
-    # - UNIX timestamp
-    # - Committer email
-    # - Committer name
-    #
-    # More info about git log formatting: https://git-scm.com/docs/pretty-formats
-
-    def __init__(self, repo_path: str, output_dir: str):
+    def __init__(self, repo_path: str, output_dir: str, watermark: Optional[List[str]] = None):
         """
         Initialize an instance of the class
 
         :param repo_path: path to the repository
         :param output_dir: directory in which results will be kept
+        :param watermark: list of ref tips hashes stored during the previous
+            run. If provided, only commits which are not reachable from
+            them will be extracted
         """
         self.repo_path = repo_path
+        self.watermark = watermark
         self.repo_name = os.path.basename(repo_path)
         # We need an absolute path of the output directory
         self.output_dir = os.path.join(os.path.abspath(output_dir), self.repo_name)
 
+    def _git_command(self, *args: str) -> List[str]:
+        """
+        Build git command executed in the repository directory. We pass
+        the directory with the '-C' option instead of changing the working
+        directory of the whole process, so data for many repositories can
+        be generated at the same time.
+
+        :param args: git subcommand and its arguments
+        :return: command as a list of arguments, ready to pass to subprocess
+        """
+        return [
+            "git", "-C", self.repo_path,
+            "-c", "core.commitGraph={0}".format(str(USE_COMMIT_GRAPH).lower())
+        ] + list(args)
+
+    def _git_shell_command(self, command: str) -> str:
+        """
+        Build git command executed in the repository directory which will
+        be run in the shell (for example because its output is piped
+        to another tool).
+
+        :param command: git subcommand and its arguments, without the
+            leading 'git' keyword
+        :return: command string
+        """
+        return "git -C {0} -c core.commitGraph={1} {2}".format(
+            shlex.quote(self.repo_path), str(USE_COMMIT_GRAPH).lower(), command
+        )
+
 
     def _generate_headers(self, file_type: str) -> str:
         """
@@ -89,7 +174,9 @@ class RawDataRetriever:
         with open(output_file, 'w') as f:
             f.write(headers)
 
-        command = "git log --no-merges --all --pretty=format:'%H' >> {0}".format(output_file)
+        command = self._git_shell_command(
+            "log --no-merges --all --pretty=format:'%H' >> {0}".format(shlex.quote(output_file))
+        )
         subprocess.run(command, shell=True)
 
     def _get_merges_info(self) -> None:
@@ -110,9 +197,66 @@ class RawDataRetriever:
         with open(output_file, 'w') as f:
             f.write(headers)
 
-        command = "git log --merges --all --pretty=format:'%H;%at' >> {0}".format(output_file)
+        command = self._git_shell_command(
+            "log --merges --all --pretty=format:'%H;%at' >> {0}".format(shlex.quote(output_file))
+        )
         subprocess.run(command, shell=True)
 
+    def _get_commits_parents(self) -> None:
+        """
+        Get a list of hashes of all commits (including merges)
+        and their parents
+
+        File will contain 2 columns:
+            - Full commit hash
+            - Full hashes of parents separated with space
+        """
+
+        output_file = os.path.join(
+            self.output_dir, OUTPUT_FILES.get("commits_parents")
+        )
+
+        headers = self._generate_headers("commits_parents")
+        with open(output_file, 'w') as f:
+            f.write(headers)
+
+        command = self._git_shell_command(
+            "log --all --pretty=format:'%H;%P' >> {0}".format(shlex.quote(output_file))
+        )
+        subprocess.run(command, shell=True)
+
+    def _write_commits_fields(self, file_type: str, fields: List[str]) -> None:
+        """
+        Write fields of all commits except merges to the .csv file. Fields
+        are separated in the 'git log' output with the unit separator (see
+        '_split_fields') and written with the raw data writer, so values
+        containing semicolons are quoted instead of being broken.
+
+        :param file_type: type of the file (one of keys from OUTPUT_FILES dict)
+        :param fields: git pretty format placeholders of the columns, in the
+            order defined by HEADERS
+        """
+
+        command = self._git_command(
+            "log", "--no-merges", "--all", "--pretty=format:{0}".format(_FIELD_SEPARATOR.join(fields))
+        )
+
+        # Output is read in binary mode - text mode would treat carriage
+        # returns inside messages as line breaks
+        with subprocess.Popen(command, stdout=subprocess.PIPE) as proc, \
+                CsvRawDataWriter(self.output_dir, [file_type]) as writer:
+            for raw_line in proc.stdout:
+                line = raw_line.decode("utf-8", errors="replace").rstrip("\n")
+                if line:
+                    writer.write_row(file_type, _split_fields(line, len(fields)))
+
+        if proc.returncode != 0:
+            raise RawDataGenerationError(
+                "Command '{0}' failed with exit code {1}, repository: {2}".format(
+                    " ".join(command), proc.returncode, self.repo_name
+                )
+            )
+
     def _get_commits_general_info(self) -> None:
         """
         Get general info about commit and save it to the .csv
@@ -125,52 +269,25 @@ class RawDataRetriever:
         - Committer name
         """
 
-        output_file = os.path.join(
-            self.output_dir, OUTPUT_FILES.get("commits_info")
-        )
-
-        headers = self._generate_headers("commits_info")
-        with open(output_file, 'w') as f:
-            f.write(headers)
-
-        command = "git log --no-merges --all --pretty=format:{0} >> {1}".format(
-            GENERAL_INFO_FORMAT, output_file
-        )
-
-        subprocess.run(command, shell=True)
+        self._write_commits_fields("commits_info", GENERAL_INFO_FORMAT)
 
     def _get_commits_messages(self) -> None:
         """
         Get commits messages.
 
-        Retrieval of commits messages can be quite challenging due to the
-        fact that they can contain special characters, including column separators,
-        such as comma or semicolon. In order to avoid parsing issues we will
-        retrieve messages to a separate file, including only commits hashes as
-        a form of primary key. We will use 'sed' command to delete all extra
-        semicolon except the first one, separating hash from the message.
+        Commits messages can contain special characters, including column
+        separators, such as comma or semicolon. Messages are retrieved to a
+        separate file, including only commits hashes as a form of primary key,
+        and quoted if needed, so they are read back unchanged.
 
         Structure of the file:
             - Commit full hash
             - message
         """
 
-        output_file = os.path.join(
-            self.output_dir, OUTPUT_FILES.get("commits_messages")
-        )
+        self._write_commits_fields("commits_messages", ["%H", "%s"])
 
-        headers = self._generate_headers("commits_messages")
-        with open(output_file, 'w') as f:
-            f.write(headers)
-
-        # sed 's/;//2g' - replace all semicolons except the first one in each line with blank char
-        command = "git log --no-merges --all --pretty=format:'%H;%s' | sed 's/;//2g' >> {0}".format(
-            output_file
-        )
-        subprocess.run(command, shell=True)
-
-    @staticmethod
-    def _extract_number_of_insertions_and_deletions(commit_hash: str) -> Dict[str, int]:
+    def _extract_number_of_insertions_and_deletions(self, commit_hash: str) -> Dict[str, int]:
         """
         Helper function to '_get_insertions_deletions_info'. It
         uses awk tool to extract information about number of insertions
@@ -182,8 +299,7 @@ class RawDataRetriever:
             given commit
         """
 
-        command = """
-        git show --shortstat {0} | awk '{{
+        command = self._git_shell_command("""show --shortstat {0} | awk '{{
             # Keep track of the last line
             lastLine = $0
         }}
@@ -200,7 +316,7 @@ class RawDataRetriever:
             }} else {{
                 print "0,0" # Return zeros separated by comma in all other cases
             }}
-        }}'""".format(commit_hash)
+        }}'""".format(commit_hash))
         proc = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
         output = proc.stdout.read().decode().strip().split(",")
         res = {
@@ -214,7 +330,7 @@ class RawDataRetriever:
         """
         Get a line containing info about insertions and deletions of single
         commit which is ready to append to the output file. Helper to the
-        '_get_number_of_insertions_and_deletions_for_all_commits' function.
+        '_get_number_of_insertions_and_deletions_per_commit' function.
 
         :param commit_hash: hash of the commit we want to get info about
         :return: line separated with semicolons ready to append to the output
@@ -237,12 +353,12 @@ class RawDataRetriever:
 
         return output_line
 
-    def _get_number_of_insertions_and_deletions_for_all_commits(self) -> None:
+    def _get_number_of_insertions_and_deletions_per_commit(self) -> None:
         """
-        Get number of insertion and deletions for all commits. According to git
-        documentation there is no such possibility to retrieve this information
-        by log formatting, then we need to use 'git diff --stat' option and
-        extract data with regexp.
+        Get number of insertion and deletions for all commits running separate
+        'git show' command for each commit hash stored in the commits hashes file.
+        It is very slow for big repositories, because it requires to spawn a few
+        processes per commit - use the 'single_pass' mode instead.
 
         Structure of the output file:
             - Full hash of commit
@@ -279,6 +395,480 @@ class RawDataRetriever:
         with open(output_file, 'w') as f:
             f.writelines(results)
 
+    @staticmethod
+    def _parse_shortstat_line(shortstat_line: str) -> Tuple[int, int]:
+        """
+        Extract number of insertions and deletions from the summary line
+        produced by the '--shortstat' option. Git omits the part related
+        to insertions or deletions if given number is equal to zero, so
+        both of them are optional.
+
+        :param shortstat_line: line in format ' 2 files changed, 5 insertions(+), 1 deletion(-)'
+        :return: tuple containing number of insertions and number of deletions
+        """
+
+        insertions_match = _INSERTIONS_PATTERN.search(shortstat_line)
+        deletions_match = _DELETIONS_PATTERN.search(shortstat_line)
+
+        insertions = int(insertions_match.group(1)) if insertions_match else 0
+        deletions = int(deletions_match.group(1)) if deletions_match else 0
+
+        return insertions, deletions
+
+    def _get_number_of_insertions_and_deletions_single_pass(self) -> None:
+        """
+        Get number of insertion and deletions for all commits using single
+        'git log --shortstat' traversal. Output of the command is parsed
+        line by line while git is still walking the history, so we never
+        keep the whole log in memory. Each record starts with the record
+        separator followed by the commit hash; it is followed by the optional
+        summary line (git doesn't print it for commits without changes, in
+        such case we assume zero insertions and deletions).
+
+        Commits are listed in the same order as in the commits hashes file,
+        because both of them come from 'git log --no-merges --all'.
+
+        Structure of the output file:
+            - Full hash of commit
+            - Number of insertions per commit
+            - Number of deletions per commit
+        """
+
+        output_file = os.path.join(
+            self.output_dir, OUTPUT_FILES.get("insertions_deletions")
+        )
+
+        command = self._git_command(
+            "log", "--no-merges", "--all", "--shortstat",
+            "--pretty=format:{0}%H".format(_RECORD_SEPARATOR)
+        )
+
+        with open(output_file, 'w') as f:
+            f.write(self._generate_headers("insertions_deletions"))
+
+            with subprocess.Popen(
+                    command, stdout=subprocess.PIPE, text=True, errors="replace"
+            ) as proc:
+                commit_hash = None
+                insertions, deletions = 0, 0
+
+                for line in proc.stdout:
+                    if line.startswith(_RECORD_SEPARATOR):
+                        # Beginning of the next record - flush the previous one
+                        if commit_hash is not None:
+                            f.write("{0};{1};{2}\n".format(commit_hash, insertions, deletions))
+                        commit_hash = line[len(_RECORD_SEPARATOR):].strip()
+                        insertions, deletions = 0, 0
+                    elif line.strip():
+                        insertions, deletions = self._parse_shortstat_line(line)
+
+                if commit_hash is not None:
+                    f.write("{0};{1};{2}\n".format(commit_hash, insertions, deletions))
+
+        if proc.returncode != 0:
+            raise RawDataGenerationError(
+                "Command '{0}' failed with exit code {1}, repository: {2}".format(
+                    " ".join(command), proc.returncode, self.repo_name
+                )
+            )
+
+    def _get_number_of_insertions_and_deletions_for_all_commits(self) -> None:
+        """
+        Get number of insertion and deletions for all commits. According to git
+        documentation there is no such possibility to retrieve this information
+        by log formatting, then we need to use '--shortstat' option and
+        extract data with regexp.
+
+        Depending on the INSERTIONS_DELETIONS_RETRIEVAL_MODE setting data is
+        retrieved either in single 'git log' traversal ('single_pass') or running
+        'git show' for each commit separately ('per_commit').
+        """
+
+        if INSERTIONS_DELETIONS_RETRIEVAL_MODE == "single_pass":
+            self._get_number_of_insertions_and_deletions_single_pass()
+        elif INSERTIONS_DELETIONS_RETRIEVAL_MODE == "per_commit":
+            self._get_number_of_insertions_and_deletions_per_commit()
+        else:
+            raise ValueError(
+                "Unknown insertions and deletions retrieval mode: '{0}'".format(
+                    INSERTIONS_DELETIONS_RETRIEVAL_MODE
+                )
+            )
+
+    def _write_commit_record(
+            self,
+            writer: RawDataWriter,
+            record: List[str],
+            insertions: int,
+            deletions: int,
+            write_graph: bool = True
+    ) -> None:
+        """
+        Split single commit record retrieved in the single traversal mode
+        into rows of the output files. Merges are stored only in the merges
+        info and commits parents files, all other commits go to the remaining
+        files.
+
+        :param writer: writer of raw data files (see ETL.raw_data_files)
+        :param record: list of commit fields in the order defined by
+            _SINGLE_TRAVERSAL_FORMAT
+        :param insertions: number of insertions of the commit
+        :param deletions: number of deletions of the commit
+        :param write_graph: whether to write merges info and commits parents
+            files (tables describing the whole graph of commits)
+        """
+
+        commit_hash, parents, author_email, author_name, \
+            unix_time, commiter_email, commiter_name, message = record
+
+        if write_graph:
+            writer.write_row("commits_parents", [commit_hash, parents])
+
+        if len(parents.split()) > 1:
+            if write_graph:
+                writer.write_row("merges_info", [commit_hash, int(unix_time)])
+            return
+
+        writer.write_row("commits_hashes", [commit_hash])
+        writer.write_row(
+            "commits_info",
+            [commit_hash, author_email, author_name, int(unix_time), commiter_email, commiter_name]
+        )
+        writer.write_row("commits_messages", [commit_hash, message])
+        if EXTRACT_DIFF_STATS:
+            writer.write_row("insertions_deletions", [commit_hash, insertions, deletions])
+
+    def _iter_commit_records(self, exclude_tips: Optional[List[str]] = None) -> Iterator[Tuple[List[str], int, int]]:
+        """
+        Iterate over commits of the repository using single 'git log --all --shortstat'
+        traversal over its history. Each commit is printed as a record starting with
+        the record separator, with fields separated by the unit separator, followed
+        by the optional '--shortstat' summary line (git doesn't print it for merges
+        and commits without changes).
+
+        Output is parsed line by line while git is still walking the history,
+        so the whole log is never kept in memory. Separators inside the subject
+        of the message are removed (see '_split_fields'), so we don't need to
+        post-process messages with 'sed'.
+
+        If 'exclude_tips' are provided, only commits which are not reachable
+        from them are returned (they are passed to git through the standard
+        input as negated revisions, so their number is not limited by the
+        maximum length of command line).
+
+        :param exclude_tips: list of hashes of commits whose history should
+            be skipped
+        :return: generator of tuples containing list of commit fields (in the
+            order defined by _SINGLE_TRAVERSAL_FORMAT), number of insertions
+            and number of deletions
+        """
+
+        command = self._git_command(
+            "log", "--all",
+            "--pretty=format:{0}".format(_SINGLE_TRAVERSAL_FORMAT)
+        )
+        if EXTRACT_DIFF_STATS:
+            # Without diff stats git needs only commits objects, so the
+            # traversal works in treeless partial clones
+            command.append("--shortstat")
+        if exclude_tips:
+            command.append("--stdin")
+
+        # Output is read in binary mode and decoded line by line - text mode
+        # would treat carriage returns inside messages as line breaks
+        with subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE) as proc:
+            if exclude_tips:
+                proc.stdin.write("".join("^{0}\n".format(tip) for tip in exclude_tips).encode())
+            proc.stdin.close()
+
+            record = None
+            insertions, deletions = 0, 0
+
+            for raw_line in proc.stdout:
+                line = raw_line.decode("utf-8", errors="replace")
+                if line.startswith(_RECORD_SEPARATOR):
+                    # Beginning of the next record - return the previous one
+                    if record is not None:
+                        yield record, insertions, deletions
+                    record = _split_fields(line[len(_RECORD_SEPARATOR):].rstrip("\n"), len(_SINGLE_TRAVERSAL_FIELDS))
+                    insertions, deletions = 0, 0
+                elif line.strip():
+                    insertions, deletions = self._parse_shortstat_line(line)
+
+            if record is not None:
+                yield record, insertions, deletions
+
+        if proc.returncode != 0:
+            raise RawDataGenerationError(
+                "Command '{0}' failed with exit code {1}, repository: {2}".format(
+                    " ".join(command), proc.returncode, self.repo_name
+                )
+            )
+
+    def _extract_all_raw_data_single_traversal(self, exclude_tips: Optional[List[str]] = None) -> None:
+        """
+        Generate all raw data files using single traversal over repository
+        history (see '_iter_commit_records'). Each record is immediately split
+        into the output files, written in the RAW_DATA_FORMAT format. In case
+        of .csv files their structure is the same as in case of the 'per_file'
+        mode.
+
+        If 'exclude_tips' are provided, only commits which are not reachable
+        from them are extracted. Merges info and commits parents files contain
+        the whole graph in such case, because new commits can be merged by
+        merges which were already there and nearest merges of old commits
+        can change.
+
+        :param exclude_tips: list of hashes of commits whose history should
+            be skipped
+        """
+
+        with get_raw_data_writer(self.output_dir, RAW_DATA_FORMAT) as writer:
+            for record, insertions, deletions in self._iter_commit_records(exclude_tips):
+                self._write_commit_record(
+                    writer, record, insertions, deletions, write_graph=not exclude_tips
+                )
+
+            if exclude_tips:
+                for merge_hash, merge_unix_time in self.get_merges_info_table().itertuples(index=False):
+                    writer.write_row("merges_info", [merge_hash, merge_unix_time])
+                for commit_hash, parent_hashes in self.get_commits_parents_table().itertuples(index=False):
+                    writer.write_row("commits_parents", [commit_hash, parent_hashes])
+
+    def _records_to_tables(self, records: List[Tuple[List[str], int, int]], first_row: int) -> Dict[str, pd.DataFrame]:
+        """
+        Transform list of commits records (merges excluded) into tables of the
+        same structure as raw .csv files. Empty text fields are replaced with
+        NaN, the same way as 'pd.read_csv' does.
+
+        :param records: list of tuples returned by '_iter_commit_records'
+        :param first_row: index of the first record in the whole history, so
+            rows of subsequent chunks have unique indices
+        :return: dictionary containing tables, with keys the same as in
+            the OUTPUT_FILES dictionary (except 'merges_info')
+        """
+
+        index = pd.RangeIndex(first_row, first_row + len(records))
+        commits = pd.DataFrame(
+            [record for record, _, _ in records],
+            columns=["commit_hash", "parents", "author_email", "author_name",
+                     "commit_unix_time", "commiter_email", "commiter_name", "commit_message"],
+            index=index
+        ).replace("", np.nan)
+        commits["commit_unix_time"] = commits.commit_unix_time.astype(np.int64)
+
+        if EXTRACT_DIFF_STATS:
+            insertions_deletions = pd.DataFrame(
+                [(record[0], insertions, deletions) for record, insertions, deletions in records],
+                columns=HEADERS.get("insertions_deletions"),
+                index=index
+            )
+        else:
+            insertions_deletions = pd.DataFrame(columns=HEADERS.get("insertions_deletions"))
+
+        res = {
+            "commits_hashes": commits[HEADERS.get("commits_hashes")],
+            "commits_info": commits[HEADERS.get("commits_info")],
+            "commits_messages": commits[HEADERS.get("commits_messages")],
+            "insertions_deletions": insertions_deletions
+        }
+
+        return res
+
+    def iter_raw_data_chunks(
+            self,
+            chunk_size: Union[int, Callable[[], int]],
+            exclude_tips: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Stream raw data of the repository in chunks, without writing any
+        files. Each chunk contains tables of the same structure as raw .csv
+        files (except merges info, see 'get_merges_info_table') for at most
+        'chunk_size' commits, so memory usage doesn't depend on the size of
+        the history.
+
+        :param chunk_size: maximum number of commits in a single chunk or
+            function returning size of the next chunk (it can change between
+            chunks, e.g. to fit into the memory budget)
+        :param exclude_tips: list of hashes of commits whose history should
+            be skipped
+        :return: generator of dictionaries containing tables, with keys the
+            same as in the OUTPUT_FILES dictionary
+        """
+
+        records = []
+        first_row = 0
+
+        for record, insertions, deletions in self._iter_commit_records(exclude_tips):
+            if len(record[1].split()) > 1:
+                continue  # Merges are retrieved separately
+
+            records.append((record, insertions, deletions))
+            if len(records) >= (chunk_size() if callable(chunk_size) else chunk_size):
+                yield self._records_to_tables(records, first_row)
+                first_row += len(records)
+                records = []
+
+        if records:
+            yield self._records_to_tables(records, first_row)
+
+    def get_merges_info_table(self) -> pd.DataFrame:
+        """
+        Get hashes and timestamps of all merges of the repository. They are
+        needed to find nearest merge of each commit, so in the streaming mode
+        they are retrieved in a separate (cheap - without diff stats) traversal
+        before the commits. Number of merges is usually much smaller than
+        number of commits, so they can be kept in memory.
+
+        :return: merges info table as pandas DataFrame
+        """
+
+        proc = subprocess.run(
+            self._git_command(
+                "log", "--merges", "--all",
+                "--pretty=format:%H{0}%at".format(_FIELD_SEPARATOR)
+            ),
+            stdout=subprocess.PIPE, check=True, text=True
+        )
+        res = pd.DataFrame(
+            [line.split(_FIELD_SEPARATOR) for line in proc.stdout.splitlines() if line],
+            columns=HEADERS.get("merges_info")
+        )
+        res["merge_unix_time"] = res.merge_unix_time.astype(np.int64)
+
+        return res
+
+    def get_commits_parents_table(self) -> pd.DataFrame:
+        """
+        Get hashes of all commits of the repository (including merges) and
+        their parents. They are needed to find nearest merge of each commit,
+        so in the streaming mode they are retrieved in a separate traversal
+        (cheap - it reads only commit-graph, if available) before the commits.
+
+        :return: commits parents table as pandas DataFrame
+        """
+
+        proc = subprocess.run(
+            self._git_command(
+                "log", "--all",
+                "--pretty=format:%H{0}%P".format(_FIELD_SEPARATOR)
+            ),
+            stdout=subprocess.PIPE, check=True, text=True
+        )
+        res = pd.DataFrame(
+            [line.split(_FIELD_SEPARATOR) for line in proc.stdout.splitlines() if line],
+            columns=HEADERS.get("commits_parents")
+        )
+
+        return res
+
+    def _extract_all_raw_data_per_file(self) -> None:
+        """
+        Generate all raw data files running separate 'git log' command
+        for each of them.
+        """
+
+        logger.info("Generating commits hashes for repo '{0}'".format(self.repo_name))
+        self._get_commit_hashes_no_merges()
+        logger.info("Generating merges info for repo '{0}'".format(self.repo_name))
+        self._get_merges_info()
+        logger.info("Generating commits parents for repo '{0}'".format(self.repo_name))
+        self._get_commits_parents()
+        logger.info("Generating commits general info for repo '{0}'".format(self.repo_name))
+        self._get_commits_general_info()
+        logger.info("Generating commits messages for repo '{0}'".format(self.repo_name))
+        self._get_commits_messages()
+        if EXTRACT_DIFF_STATS:
+            logger.info("Generating information about insertions and deletions for repo '{0}'".format(self.repo_name))
+            self._get_number_of_insertions_and_deletions_for_all_commits()
+        else:
+            output_file = os.path.join(self.output_dir, OUTPUT_FILES.get("insertions_deletions"))
+            with open(output_file, 'w') as f:
+                f.write(self._generate_headers("insertions_deletions"))
+
+    def _get_ref_tips(self) -> List[str]:
+        """
+        Get hashes of commits pointed by all refs of the repository (branches,
+        remote branches, tags and HEAD). They are stored as a watermark after
+        successful load.
+
+        :return: sorted list of unique hashes
+        """
+
+        proc = subprocess.run(
+            self._git_command("rev-list", "--no-walk", "--all"),
+            stdout=subprocess.PIPE, check=True, text=True
+        )
+        res = sorted(set(proc.stdout.split()))
+
+        return res
+
+    def _is_watermark_valid(self) -> bool:
+        """
+        Check whether all commits from the watermark still exist and are
+        reachable from current refs. If any of them is not, history was
+        rewritten since the previous run (e.g. by force-push or deleting a
+        branch) and commits stored in the database might not be a part
+        of the history anymore.
+
+        :return: True if incremental extraction is possible
+        """
+
+        proc = subprocess.run(
+            self._git_command("rev-list", "--stdin", "--not", "--all"),
+            input="".join(tip + "\n" for tip in self.watermark),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        res = proc.returncode == 0 and not proc.stdout.strip()
+
+        return res
+
+    def _is_incremental_extraction_possible(self, streaming: bool = False) -> bool:
+        """
+        Decide whether only new commits can be extracted.
+
+        :param streaming: whether raw data is streamed (it's always
+            extracted in the single traversal in such case)
+        :return: True if watermark was provided and it is valid
+        """
+
+        if not self.watermark:
+            return False
+
+        if not streaming and RAW_DATA_EXTRACTION_MODE != "single_traversal":
+            logger.info(
+                "Incremental extraction is available only in the 'single_traversal' mode, "
+                "extracting full history of repo '{0}'".format(self.repo_name)
+            )
+            return False
+
+        if not self._is_watermark_valid():
+            logger.info(
+                "History of repo '{0}' was rewritten since the previous run, "
+                "falling back to full rebuild".format(self.repo_name)
+            )
+            return False
+
+        return True
+
+    def get_extraction_plan(self, streaming: bool = False) -> Tuple[List[str], bool]:
+        """
+        Get current ref tips of the repository and decide whether only new
+        commits can be extracted. Tips are retrieved before extraction - in
+        case refs are updated in the meantime, new commits will be picked up
+        during the next run.
+
+        :param streaming: whether raw data is streamed instead of being
+            written to .csv files
+        :return: tuple containing sorted list of ref tips hashes and flag
+            indicating whether extraction is incremental
+        """
+
+        ref_tips = self._get_ref_tips()
+        incremental = self._is_incremental_extraction_possible(streaming)
+
+        return ref_tips, incremental
+
     def generate_raw_data(self):
         """
         Generate all files containing raw commits data for given repository.
@@ -286,51 +876,106 @@ class RawDataRetriever:
         repo_name = os.path.basename(self.repo_path)
         logger.info("Process of generating raw commits data for repo '{0}' started".format(repo_name))
 
-        # Get current working directory
-        initial_dir = os.getcwd()
-
         # Create output directory
         logger.info("Creating output directory to store raw data for repo '{0}'".format(repo_name))
         Path(self.output_dir).mkdir(parents=True, exist_ok=True)
 
-        try:
-            # Go to the repo dir and generate data
-            logger.info("Changing dir to repository dir")
-            os.chdir(self.repo_path)
-            logger.info("Generating commits hashes for repo '{0}'".format(repo_name))
-            self._get_commit_hashes_no_merges()
-            logger.info("Generating merges info for repo '{0}'".format(repo_name))
-            self._get_merges_info()
-            logger.info("Generating commits general info for repo '{0}'".format(repo_name))
-            self._get_commits_general_info()
-            logger.info("Generating commits messages for repo '{0}'".format(repo_name))
-            self._get_commits_messages()
-            logger.info("Generating information about insertions and deletions for repo '{0}'".format(repo_name))
-            self._get_number_of_insertions_and_deletions_for_all_commits()
-        finally:
-            # Go back to the initial directory
-            os.chdir(initial_dir)
+        start = time.perf_counter()
+        ref_tips, incremental = self.get_extraction_plan()
+
+        if incremental:
+            logger.info("Generating raw data files for new commits of repo '{0}'".format(repo_name))
+            self._extract_all_raw_data_single_traversal(exclude_tips=self.watermark)
+        elif RAW_DATA_EXTRACTION_MODE == "single_traversal":
+            logger.info("Generating all raw data files in single traversal for repo '{0}'".format(repo_name))
+            self._extract_all_raw_data_single_traversal()
+        elif RAW_DATA_EXTRACTION_MODE == "per_file":
+            if RAW_DATA_FORMAT != "csv":
+                raise ValueError(
+                    "Raw data format '{0}' is available only in the 'single_traversal' mode".format(RAW_DATA_FORMAT)
+                )
+            self._extract_all_raw_data_per_file()
+        else:
+            raise ValueError(
+                "Unknown raw data extraction mode: '{0}'".format(RAW_DATA_EXTRACTION_MODE)
+            )
+
+        save_extraction_state(self.output_dir, incremental, ref_tips)
 
+        logger.info(
+            "Raw data for repo '{0}' generated in {1:.2f}s (commit-graph usage: {2})".format(
+                repo_name, time.perf_counter() - start, "on" if USE_COMMIT_GRAPH else "off"
+            )
+        )
 
-def generate_raw_data_for_all_repos(repos_dir: str, output_dir: str) -> None:
+
+def generate_raw_data_for_all_repos(
+        repos_dir: str,
+        output_dir: str,
+        workers: int = RAW_DATA_WORKERS,
+        watermarks: Optional[Dict[str, List[str]]] = None,
+        repos_paths: Optional[List[str]] = None
+) -> None:
     """
     Generates raw data files for all repositories stored in provided
-    directory.
+    directory. Repositories are processed concurrently by the pool of
+    'workers' threads - most of the work is done by git subprocesses,
+    so threads are sufficient to keep many cores busy.
+
+    Failure of single repository doesn't stop processing of the remaining
+    ones. After all repositories are processed, an exception listing all
+    failed repositories along with their errors is raised.
 
     :param repos_dir: directory where repos are stored
     :param output_dir: where to store the output raw files
+    :param workers: number of repositories processed at the same time
+    :param watermarks: dictionary containing watermarks of repositories
+        (see ETL.watermarks), which allow to extract only new commits.
+        Full history is extracted for repos without watermark
+    :param repos_paths: paths to the repositories to process. If None - as
+        default - all repositories stored in 'repos_dir' are processed
     """
 
-    try:
-        # Get paths to all repos in given dir
-        repos_paths = [
-            f.path
-            for f in os.scandir(repos_dir) if f.is_dir()
-        ]
+    if watermarks is None:
+        watermarks = {}
 
-        for single_path in repos_paths:
-            RawDataRetriever(
-                repo_path=single_path, output_dir=output_dir
-            ).generate_raw_data()
-    except Exception as e:
-        raise RawDataGenerationError(str(e))
+    if repos_paths is None:
+        try:
+            # Get paths to all repos in given dir
+            repos_paths = [
+                f.path
+                for f in os.scandir(repos_dir) if f.is_dir()
+            ]
+        except Exception as e:
+            raise RawDataGenerationError(str(e))
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                RawDataRetriever(
+                    repo_path=single_path,
+                    output_dir=output_dir,
+                    watermark=watermarks.get(os.path.basename(single_path))
+                ).generate_raw_data
+            ): os.path.basename(single_path)
+            for single_path in repos_paths
+        }
+
+        for future in as_completed(futures):
+            repo_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Generating raw data for repo '{0}' failed: {1}".format(repo_name, str(e)))
+                failures[repo_name] = str(e)
+
+    if failures:
+        raise RawDataGenerationError(
+            "Generating raw data failed for following repos: {0}".format(
+                "; ".join(
+                    "'{0}': {1}".format(repo_name, error_msg)
+                    for repo_name, error_msg in failures.items()
+                )
+            )
+        )
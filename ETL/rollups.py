@@ -0,0 +1,146 @@
+"""
+Rollup tables - aggregates of the general info table built at load time,
+so the dashboard and analysis read thousands of pre-aggregated rows instead
+of aggregating millions of commits on each request:
+    - commits_daily - number of commits per day (timeline, heatmap,
+        commits per day of week)
+    - commits_author_daily - number of commits per author and day (heatmap
+        of single author, list of authors)
+    - commits_hour_weekday - number of commits per day of week and hour
+    - changes_histogram - number of commits per number of inserted and
+        deleted lines. Bins have width of a single line, so statistics
+        calculated from the histogram (mean, quartiles) are exact
+    - commits_days_to_merge - number of merged commits per number of days
+        to the nearest merge
+
+All rollups contain counts of commits, so rollups calculated for separate
+parts of the history (chunks in the streaming mode, or stored and new
+commits in the incremental mode) are merged by summing counts of the
+same keys.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List
+from common.time_features import to_local_datetime
+from database.rollups import COUNT_COLUMN
+
+# Key columns of the rollup tables
+ROLLUP_KEYS = {
+    "commits_daily": ["date_str"],
+    "commits_author_daily": ["author_name", "date_str"],
+    "commits_hour_weekday": ["commit_week_day", "commit_hour"],
+    "changes_histogram": ["change_type", "lines"],
+    "commits_days_to_merge": ["days_to_merge"]
+}
+
+
+def _count_commits(tab: pd.DataFrame, table_type: str) -> pd.DataFrame:
+    """
+    Count rows of the table per key of the rollup.
+
+    :param tab: table containing key columns of the rollup
+    :param table_type: type of the rollup table
+    :return: rollup table
+    """
+
+    res = tab.groupby(ROLLUP_KEYS.get(table_type), observed=True).size().rename(
+        COUNT_COLUMN
+    ).reset_index()
+
+    return res
+
+
+def get_days_to_merge_rollup(commits: pd.DataFrame) -> pd.DataFrame:
+    """
+    Count merged commits per number of days to the nearest merge. Commits
+    without merge are skipped - they are counted when the merge appears
+    (see ETL.load_data_to_db.update_pending_merges_info).
+
+    :param commits: table containing commit_unix_time and merge_unix_time
+        columns
+    :return: commits_days_to_merge rollup table
+    """
+
+    merged_commits = commits.dropna(subset=["merge_unix_time"])
+    days_to_merge = (
+        to_local_datetime(merged_commits.merge_unix_time.astype(np.int64))
+        - to_local_datetime(merged_commits.commit_unix_time.astype(np.int64))
+    ).dt.days
+
+    res = _count_commits(pd.DataFrame({"days_to_merge": days_to_merge}), "commits_days_to_merge")
+
+    return res
+
+
+def get_rollup_tables(general_info_tab: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Calculate all the rollup tables from the general info table.
+
+    :param general_info_tab: general info table (or its part)
+    :return: dictionary containing rollup tables with keys the same as
+        in the ROLLUP_KEYS dictionary
+    """
+
+    changes_tab = pd.concat(
+        [
+            pd.DataFrame({"change_type": change_type, "lines": general_info_tab[change_type]})
+            for change_type in ["insertions", "deletions"]
+        ],
+        ignore_index=True
+    ).dropna()
+    changes_tab["lines"] = changes_tab.lines.astype(np.int64)
+
+    res = {
+        "commits_daily": _count_commits(general_info_tab, "commits_daily"),
+        "commits_author_daily": _count_commits(general_info_tab, "commits_author_daily"),
+        "commits_hour_weekday": _count_commits(general_info_tab, "commits_hour_weekday"),
+        "changes_histogram": _count_commits(changes_tab, "changes_histogram"),
+        "commits_days_to_merge": get_days_to_merge_rollup(general_info_tab)
+    }
+
+    return res
+
+
+def merge_rollup_tables(rollups: List[pd.DataFrame], table_type: str) -> pd.DataFrame:
+    """
+    Merge rollup tables calculated for separate parts of the history. Dates
+    are normalized to strings, as rollups read from the database contain
+    date objects instead.
+
+    :param rollups: list of rollup tables of the same type
+    :param table_type: type of the rollup tables
+    :return: merged rollup table
+    """
+
+    keys = ROLLUP_KEYS.get(table_type)
+    rollups = [rollup[keys + [COUNT_COLUMN]] for rollup in rollups]
+    if "date_str" in keys:
+        # Dates (and datetimes at midnight) are rendered in the DATE_FORMAT format
+        rollups = [rollup.assign(date_str=rollup.date_str.astype(str)) for rollup in rollups]
+
+    res = pd.concat(rollups, ignore_index=True).groupby(keys, observed=True).agg(
+        **{COUNT_COLUMN: (COUNT_COLUMN, "sum")}
+    ).reset_index()
+
+    return res
+
+
+def merge_all_rollup_tables(rollups: List[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """
+    Merge dictionaries of rollup tables (see 'get_rollup_tables').
+
+    :param rollups: list of dictionaries of rollup tables (dictionary
+        may contain only some of the rollups)
+    :return: dictionary containing merged rollup tables
+    """
+
+    res = {
+        table_type: merge_rollup_tables(
+            [tabs.get(table_type) for tabs in rollups if table_type in tabs], table_type
+        )
+        for table_type in ROLLUP_KEYS
+    }
+
+    return res
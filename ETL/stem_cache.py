@@ -0,0 +1,177 @@
+"""
+Cache of words stems. Vocabulary of commit messages is small and highly
+repetitive, so each distinct word is stemmed only once and the result is
+reused for all its occurrences - in all repositories and, as the cache is
+persisted in the STEM_CACHE_DIR directory, in all subsequent runs.
+
+Stems depend on the stemmer and its implementation, so the cache file is
+versioned by the stemmer mode and the NLTK version - after upgrading NLTK
+a new cache is built from scratch.
+"""
+
+import os
+import json
+import threading
+
+import nltk
+import logging.config
+
+from typing import Dict, Iterable, Optional
+from nltk.stem import PorterStemmer
+from config.config import STEM_CACHE_DIR
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+
+class StemCache:
+    """
+    Thread-safe cache mapping words to their stems produced by the
+    PorterStemmer.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = STEM_CACHE_DIR):
+        """
+        Create an instance of the class
+
+        :param cache_dir: directory in which cache file is stored. If None,
+            cache is kept only in memory
+        """
+        self.stemmer = PorterStemmer()
+        self.cache_path = os.path.join(
+            cache_dir, "porter_{0}_nltk_{1}.json".format(self.stemmer.mode, nltk.__version__)
+        ) if cache_dir is not None else None
+        self.stems = None
+        self.new_stems = {}
+        self.hits = 0
+        self.misses = 0
+        self._modified = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        """
+        Load persisted cache. Missing or corrupted file results in
+        an empty cache.
+        """
+
+        self.stems = {}
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path, 'r') as f:
+                self.stems = json.load(f)
+        except Exception as e:
+            logger.warning("Stem cache '{0}' couldn't be read, starting from scratch: {1}".format(
+                self.cache_path, str(e))
+            )
+        else:
+            logger.info("Loaded {0} stems from '{1}'".format(len(self.stems), self.cache_path))
+
+    def get_stems(self, words: Iterable[str]) -> Dict[str, str]:
+        """
+        Get stems of provided words. Only words which are not in the
+        cache yet are stemmed.
+
+        :param words: distinct words to stem
+        :return: dictionary containing words as keys and stems as values
+        """
+
+        with self._lock:
+            if self.stems is None:
+                self._load()
+
+            res = {}
+            hits = 0
+            for w in words:
+                stem = self.stems.get(w)
+                if stem is None:
+                    stem = self.stemmer.stem(w)
+                    self.stems[w] = stem
+                    self.new_stems[w] = stem
+                    self._modified = True
+                else:
+                    hits += 1
+                res[w] = stem
+
+            self.hits += hits
+            self.misses += len(res) - hits
+
+        logger.info("Stemmed {0} distinct words, cache hit rate: {1:.1%}".format(
+            len(res), hits / len(res) if res else 1.0)
+        )
+
+        return res
+
+    def pop_new_stems(self) -> Dict[str, str]:
+        """
+        Get stems computed since the previous call, so they can be passed to
+        the cache of another process (see 'add_stems').
+
+        :return: dictionary containing words as keys and stems as values
+        """
+
+        with self._lock:
+            res = self.new_stems
+            self.new_stems = {}
+
+        return res
+
+    def add_stems(self, stems: Dict[str, str]) -> None:
+        """
+        Add stems computed by another process (e.g. a worker preprocessing
+        single repository), so they are persisted by 'save'.
+
+        :param stems: dictionary containing words as keys and stems as values
+        """
+
+        if not stems:
+            return
+
+        with self._lock:
+            if self.stems is None:
+                self._load()
+
+            self.stems.update(stems)
+            self._modified = True
+
+    def save(self) -> None:
+        """
+        Persist cache if it was modified. File is replaced atomically, so
+        interrupted save doesn't corrupt the cache. Failure is only logged -
+        cache is an optimisation, it shouldn't break the ETL process.
+        """
+
+        with self._lock:
+            if self.cache_path is None or not self._modified:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                tmp_path = self.cache_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.stems, f)
+                os.replace(tmp_path, self.cache_path)
+            except Exception as e:
+                logger.warning("Stem cache couldn't be saved: {0}".format(str(e)))
+            else:
+                self._modified = False
+                logger.info(
+                    "Saved {0} stems to '{1}', overall hit rate: {2:.1%}".format(
+                        len(self.stems), self.cache_path,
+                        self.hits / (self.hits + self.misses) if self.hits + self.misses else 1.0
+                    )
+                )
+
+
+_stem_cache = StemCache()
+
+
+def get_stem_cache() -> StemCache:
+    """
+    Get stem cache shared by all repositories processed by the
+    current process.
+
+    :return: StemCache object
+    """
+    return _stem_cache
@@ -0,0 +1,159 @@
+"""
+Streaming version of the ETL process. Instead of writing raw .csv files,
+reading them back and loading the results to the database, git output is
+parsed into chunks of commits, which are preprocessed and loaded one by one
+(see 'load_chunks_single_repo'), so memory usage doesn't depend on the length
+of the history. Values of commits (messages, authors names) are the same as
+loaded from raw .csv files, which quote them instead of removing separators.
+
+All tables of given repository, together with its watermark, become visible
+in a single transaction, so dashboard never sees partially loaded data (in
+case of SQLite chunks are loaded into staging tables in separate short
+transactions, see ETL.load_data_to_db.load_chunks_single_repo).
+"""
+
+import os
+import time
+
+import logging.config
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from sqlalchemy import Engine
+from config.config import STREAMING_CHUNK_SIZE, RAW_DATA_WORKERS, PREPROCESSING_MEMORY_BUDGET_MB
+from database.get_db_engine import get_db_engine
+from ETL.raw_data_retriever import RawDataRetriever
+from ETL.load_data_to_db import load_chunks_single_repo
+from ETL.memory_budget import MemoryBudget
+from ETL.stem_cache import get_stem_cache
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+
+class StreamingETLError(Exception):
+    """
+    Exception raised in case when process of streaming data
+    from repositories to the DB is broken.
+    """
+    pass
+
+
+def stream_data_single_repo(
+        repo_path: str,
+        db_engine: Engine,
+        watermark: Optional[List[str]] = None,
+        chunk_size: int = STREAMING_CHUNK_SIZE,
+        memory_budget_mb: float = PREPROCESSING_MEMORY_BUDGET_MB
+) -> None:
+    """
+    Extract, preprocess and load data of single repository without
+    writing raw .csv files. Watermark of the repository is saved in the
+    same transaction.
+
+    :param repo_path: path to the repository
+    :param db_engine: db engine created by 'create_engine' method
+    :param watermark: list of ref tips hashes stored during the previous
+        run. If provided and valid, only new commits are loaded
+    :param chunk_size: maximum number of commits processed at once
+    :param memory_budget_mb: memory budget of preprocessing in megabytes
+    """
+
+    # Output directory is not used - no files are written
+    retriever = RawDataRetriever(repo_path, output_dir="", watermark=watermark)
+    repo_name = retriever.repo_name
+    logger.info("Streaming data of repo '{0}' to db".format(repo_name))
+
+    start = time.perf_counter()
+    ref_tips, incremental = retriever.get_extraction_plan(streaming=True)
+
+    memory_budget = MemoryBudget(memory_budget_mb, chunk_size)
+    commits_number = load_chunks_single_repo(
+        retriever.iter_raw_data_chunks(
+            memory_budget.get_chunk_size, exclude_tips=retriever.watermark if incremental else None
+        ),
+        retriever.get_merges_info_table(),
+        retriever.get_commits_parents_table(),
+        repo_name,
+        db_engine,
+        incremental,
+        memory_budget,
+        ref_tips
+    )
+
+    logger.info(
+        "Streamed {0} commits of repo '{1}' in {2:.2f}s ({3}), estimated peak memory: {4:.1f} MB".format(
+            commits_number, repo_name, time.perf_counter() - start,
+            "incremental" if incremental else "full rebuild", memory_budget.peak_bytes / 1024 ** 2
+        )
+    )
+
+
+def stream_data_all_repos(
+        repos_dir: str,
+        workers: int = RAW_DATA_WORKERS,
+        watermarks: Optional[Dict[str, List[str]]] = None,
+        repos_paths: Optional[List[str]] = None
+) -> None:
+    """
+    Stream data of all repositories to the database. Repositories are
+    processed concurrently by the pool of 'workers' threads, failure of
+    single repository doesn't stop processing of the remaining ones. Memory
+    budget is split equally between the workers.
+
+    :param repos_dir: directory where repos are stored
+    :param workers: number of repositories processed at the same time
+    :param watermarks: dictionary containing watermarks of repositories
+        (see ETL.watermarks). Full history is loaded for repos without watermark
+    :param repos_paths: paths to the repositories to process. If None - as
+        default - all repositories stored in 'repos_dir' are processed
+    """
+
+    if watermarks is None:
+        watermarks = {}
+
+    try:
+        engine = get_db_engine(inside_compose_network=True)
+
+        if repos_paths is None:
+            repos_paths = [
+                f.path
+                for f in os.scandir(repos_dir) if f.is_dir()
+            ]
+    except Exception as e:
+        raise StreamingETLError(str(e))
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                stream_data_single_repo,
+                single_path,
+                engine,
+                watermarks.get(os.path.basename(single_path)),
+                STREAMING_CHUNK_SIZE,
+                PREPROCESSING_MEMORY_BUDGET_MB / workers
+            ): os.path.basename(single_path)
+            for single_path in repos_paths
+        }
+
+        for future in as_completed(futures):
+            repo_name = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("Streaming data of repo '{0}' failed: {1}".format(repo_name, str(e)))
+                failures[repo_name] = str(e)
+
+    # Stems computed for successfully loaded repositories are kept anyway
+    get_stem_cache().save()
+
+    if failures:
+        raise StreamingETLError(
+            "Streaming data failed for following repos: {0}".format(
+                "; ".join(
+                    "'{0}': {1}".format(repo_name, error_msg)
+                    for repo_name, error_msg in failures.items()
+                )
+            )
+        )
@@ -0,0 +1,272 @@
+"""
+Tools allowing to reload tables without downtime. Tables which are
+replaced are loaded into staging tables first (unlogged in case of postgres,
+see DB_UNLOGGED_STAGING in config), analyzed there and then swapped with
+the tables read by the dashboard and analysis - by dropping the old table
+and renaming the staging one inside a single transaction. Queries never see
+missing or half-filled tables, they can only wait for the swap itself.
+In the partitioned layout (see database.tables_layout) the staging table is
+attached to the parent table as partition of given repository instead.
+"""
+
+import os
+import time
+
+import pandas as pd
+import logging.config
+
+from typing import Dict, List, Optional
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.types import TypeEngine
+from config.config import DB_UNLOGGED_STAGING, DB_SWAP_LOCK_TIMEOUT_MS, DB_SWAP_RETRIES
+from database.tables_layout import REPO_COLUMN, quote_literal
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+# Postgres error code raised when lock couldn't be acquired within the
+# lock_timeout
+_LOCK_NOT_AVAILABLE = "55P03"
+
+
+class TableSwapError(Exception):
+    """
+    Exception raised in case when staging tables can't be swapped
+    with the target ones.
+    """
+    pass
+
+
+def get_staging_table_name(table_name: str) -> str:
+    """
+    Get name of the staging table of given table.
+
+    :param table_name: name of the target table
+    :return: name of the staging table
+    """
+
+    return "{0}__staging".format(table_name)
+
+
+def _quote(conn: Connection, name: str) -> str:
+    """
+    Quote name of the table or index.
+
+    :param conn: database connection
+    :param name: name to quote
+    :return: quoted name
+    """
+
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def create_staging_table(
+        tab_to_load: pd.DataFrame,
+        table_name: str,
+        conn: Connection,
+        sql_types: Dict[str, TypeEngine]
+) -> None:
+    """
+    Create empty staging table with the schema of given table, replacing
+    staging table left by the failed load if it exists. In case of postgres
+    it's created as unlogged, so loading rows doesn't write WAL.
+
+    :param tab_to_load: table which will be loaded as pandas DataFrame
+    :param table_name: name of the target table
+    :param conn: database connection
+    :param sql_types: SQL types of the columns
+    """
+
+    staging_name = get_staging_table_name(table_name)
+    tab_to_load.iloc[:0].to_sql(staging_name, conn, if_exists="replace", dtype=sql_types)
+
+    if DB_UNLOGGED_STAGING and conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE {0} SET UNLOGGED".format(_quote(conn, staging_name))))
+
+
+def append_staging_table(table_name: str, conn: Connection) -> None:
+    """
+    Append rows of the staging table to the target table and drop the
+    staging table (used when new rows were loaded in separate transactions,
+    see ETL.load_data_to_db.load_chunks_single_repo).
+
+    :param table_name: name of the target table
+    :param conn: database connection with transaction already started
+    """
+
+    staging_name = get_staging_table_name(table_name)
+    columns = ", ".join(_quote(conn, col.get("name")) for col in inspect(conn).get_columns(staging_name))
+
+    conn.execute(text("INSERT INTO {0} ({1}) SELECT {1} FROM {2}".format(
+        _quote(conn, table_name), columns, _quote(conn, staging_name)
+    )))
+    conn.execute(text("DROP TABLE {0}".format(_quote(conn, staging_name))))
+
+
+def _get_partition_check_name(staging_name: str) -> str:
+    """
+    Get name of the constraint checking that all rows of the staging table
+    belong to the partition.
+
+    :param staging_name: name of the staging table
+    :return: name of the constraint
+    """
+
+    return "{0}_partition_check".format(staging_name)
+
+
+def _prepare_staging_table(conn: Connection, staging_name: str, partition_value: Optional[str] = None) -> None:
+    """
+    Make staging table durable and collect its statistics, so queries
+    have proper plans right after the swap. If it will be attached as a
+    partition, its rows are checked to belong to it - otherwise they would
+    be scanned while the parent table is locked.
+
+    :param conn: database connection
+    :param staging_name: name of the staging table
+    :param partition_value: value of the partition key, None if table isn't
+        attached as a partition
+    """
+
+    if conn.dialect.name == "postgresql" and DB_UNLOGGED_STAGING:
+        conn.execute(text("ALTER TABLE {0} SET LOGGED".format(_quote(conn, staging_name))))
+    if partition_value is not None:
+        conn.execute(text("ALTER TABLE {0} ADD CONSTRAINT {1} CHECK ({2} = {3})".format(
+            _quote(conn, staging_name),
+            _quote(conn, _get_partition_check_name(staging_name)),
+            _quote(conn, REPO_COLUMN),
+            quote_literal(partition_value)
+        )))
+    conn.execute(text("ANALYZE {0}".format(_quote(conn, staging_name))))
+
+
+def _attach_partition(conn: Connection, staging_name: str, table_name: str, parent_name: str, partition_value: str) -> None:
+    """
+    Attach renamed staging table to the parent table. Indexes matching the
+    ones of the parent table are attached as well, instead of being rebuilt.
+
+    :param conn: database connection
+    :param staging_name: former name of the staging table
+    :param table_name: name of the partition
+    :param parent_name: name of the parent table
+    :param partition_value: value of the partition key
+    """
+
+    conn.execute(text("ALTER TABLE {0} ATTACH PARTITION {1} FOR VALUES IN ({2})".format(
+        _quote(conn, parent_name), _quote(conn, table_name), quote_literal(partition_value)
+    )))
+    conn.execute(text("ALTER TABLE {0} DROP CONSTRAINT {1}".format(
+        _quote(conn, table_name), _quote(conn, _get_partition_check_name(staging_name))
+    )))
+
+
+def _rename_table(conn: Connection, staging_name: str, table_name: str) -> None:
+    """
+    Replace target table with the staging one, renaming its indexes and
+    primary key as well (names of indexes are unique in the whole schema,
+    so the next staging table couldn't be indexed otherwise).
+
+    :param conn: database connection
+    :param staging_name: name of the staging table
+    :param table_name: name of the target table
+    """
+
+    inspector = inspect(conn)
+    indexes = [idx for idx in inspector.get_indexes(staging_name) if not idx.get("duplicates_constraint")]
+    primary_key_name = inspector.get_pk_constraint(staging_name).get("name")
+
+    conn.execute(text("DROP TABLE IF EXISTS {0}".format(_quote(conn, table_name))))
+    conn.execute(text("ALTER TABLE {0} RENAME TO {1}".format(_quote(conn, staging_name), _quote(conn, table_name))))
+
+    # Index of the primary key is renamed together with the constraint
+    if primary_key_name is not None and staging_name in primary_key_name:
+        conn.execute(text("ALTER TABLE {0} RENAME CONSTRAINT {1} TO {2}".format(
+            _quote(conn, table_name),
+            _quote(conn, primary_key_name),
+            _quote(conn, primary_key_name.replace(staging_name, table_name))
+        )))
+
+    for idx in indexes:
+        new_name = idx.get("name").replace(staging_name, table_name)
+        if new_name == idx.get("name"):
+            continue
+
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ALTER INDEX {0} RENAME TO {1}".format(_quote(conn, idx.get("name")), _quote(conn, new_name))))
+        else:
+            # SQLite doesn't support renaming of indexes - index is recreated
+            # from its definition (keeping e.g. WHERE clause of partial index)
+            index_sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :name"),
+                {"name": idx.get("name")}
+            ).scalar()
+            conn.execute(text("DROP INDEX {0}".format(_quote(conn, idx.get("name")))))
+            conn.execute(text(index_sql.replace(staging_name, table_name)))
+
+
+def swap_staging_tables(
+        table_names: List[str],
+        conn: Connection,
+        repo_name: Optional[str] = None,
+        parent_names: Optional[List[str]] = None
+) -> None:
+    """
+    Swap staging tables with the target ones. All the tables are swapped
+    in the transaction of given connection, so they become visible at once
+    when it's committed. In case of postgres the swap waits for locks at
+    most DB_SWAP_LOCK_TIMEOUT_MS (so long dashboard queries don't make
+    other queries wait behind it) and is retried up to DB_SWAP_RETRIES times.
+
+    :param table_names: names of the target tables
+    :param conn: database connection with transaction already started
+    :param repo_name: name of the repository, used in logs and as the
+        value of the partition key
+    :param parent_names: names of the parent tables (in the same order
+        as target tables), if target tables are their partitions
+    """
+
+    if not table_names:
+        return
+
+    if parent_names is not None and conn.dialect.name != "postgresql":
+        raise TableSwapError("Partitioned tables layout requires postgres database")
+
+    start = time.perf_counter()
+    for table_name in table_names:
+        _prepare_staging_table(
+            conn, get_staging_table_name(table_name), repo_name if parent_names is not None else None
+        )
+
+    for attempt in range(1, DB_SWAP_RETRIES + 1):
+        if conn.dialect.name != "postgresql":
+            for table_name in table_names:
+                _rename_table(conn, get_staging_table_name(table_name), table_name)
+            break
+
+        try:
+            with conn.begin_nested():
+                conn.execute(text("SET LOCAL lock_timeout = {0}".format(int(DB_SWAP_LOCK_TIMEOUT_MS))))
+                for i, table_name in enumerate(table_names):
+                    # Old partition is dropped directly, without detaching it
+                    _rename_table(conn, get_staging_table_name(table_name), table_name)
+                    if parent_names is not None:
+                        _attach_partition(
+                            conn, get_staging_table_name(table_name), table_name, parent_names[i], repo_name
+                        )
+                conn.execute(text("SET LOCAL lock_timeout TO DEFAULT"))
+            break
+        except OperationalError as e:
+            if getattr(e.orig, "pgcode", None) != _LOCK_NOT_AVAILABLE:
+                raise
+            logger.warning("Tables are locked by other queries, swap attempt {0} of {1}, repo: '{2}'".format(
+                attempt, DB_SWAP_RETRIES, repo_name)
+            )
+    else:
+        raise TableSwapError("Couldn't swap staging tables of repo '{0}' within {1} attempts".format(
+            repo_name, DB_SWAP_RETRIES)
+        )
+
+    logger.info("Swapped {0} staging tables in {1:.2f}s, repo: '{2}'".format(
+        len(table_names), time.perf_counter() - start, repo_name)
+    )
@@ -0,0 +1,238 @@
+"""
+Declared schema of the tables loaded to the database - types of columns
+which shouldn't be derived from pandas types (dates, small integers, and
+numeric columns which pandas types depend on data - narrowed integers
+or floats with missing values), primary keys and indexes. Indexes are chosen for queries run by the
+dashboard and the incremental ETL:
+    - general info: commits waiting for the nearest merge (partial index)
+        and updates of merges info (primary key on commit_hash). The
+        dashboard doesn't query it - it reads rollup tables instead
+    - aggregated tables: primary keys on authors and words
+    - rollup tables (see ETL.rollups): primary keys on keys of rollups -
+        dates range (date_str), heatmap of single author and list of
+        authors (author_name, date_str - index-only scans)
+Constraints and indexes are created on staging tables after rows are
+loaded, right before they are swapped with the target ones (see
+ETL.table_swap). In the partitioned layout the same indexes are declared
+on parent tables, so they are reused when staging table is attached as
+a partition, and primary keys contain the repo_name column.
+"""
+
+import pandas as pd
+
+from typing import Dict, List
+from sqlalchemy import Connection, MetaData, Table, Index, BigInteger, Date, Float, Integer, SmallInteger, inspect, text
+from sqlalchemy.types import TypeEngine
+from common.time_features import DATE_FORMAT
+from database.tables_layout import REPO_COLUMN, is_partitioned
+
+TABLES_SCHEMA = {
+    "general_info": {
+        "column_types": {
+            "date_str": Date(),
+            "commit_year": SmallInteger(),
+            "commit_month": SmallInteger(),
+            "commit_month_day": SmallInteger(),
+            "commit_week_day": SmallInteger(),
+            "commit_hour": SmallInteger(),
+            "commit_unix_time": BigInteger(),
+            "insertions": BigInteger(),
+            "deletions": BigInteger(),
+            "merge_unix_time": BigInteger()
+        },
+        "primary_key": ["commit_hash"],
+        "indexes": [
+            # Rows are loaded in the 'git log' order, so time of commits is
+            # correlated with their physical location
+            {"columns": ["commit_unix_time"], "postgresql_using": "brin"},
+            {"columns": ["commit_hash"], "where": "merge_hash IS NULL", "name_suffix": "pending_merge"}
+        ]
+    },
+    "authors_stats": {
+        "column_types": {
+            "number_of_insertions": BigInteger(),
+            "number_of_deletions": BigInteger(),
+            "number_of_commits": BigInteger(),
+            "min_date": Date(),
+            "max_date": Date(),
+            "insertions_deletions_ratio": Float(precision=53),
+            "days_of_activity": BigInteger()
+        },
+        "primary_key": ["author_email", "author_name"],
+        "indexes": []
+    },
+    "messages_all_words": {
+        "column_types": {},
+        "primary_key": [],
+        "indexes": []
+    },
+    "messages_raw_words_freq": {
+        "column_types": {"raw_word_freq": BigInteger()},
+        "primary_key": ["raw_word"],
+        "indexes": []
+    },
+    "messages_stemmed_words_freq": {
+        "column_types": {"stemmed_word_freq": BigInteger()},
+        "primary_key": ["stemmed_word"],
+        "indexes": []
+    },
+    "commits_daily": {
+        "column_types": {"date_str": Date(), "commits_num": BigInteger()},
+        "primary_key": ["date_str"],
+        "indexes": []
+    },
+    "commits_author_daily": {
+        "column_types": {"date_str": Date(), "commits_num": BigInteger()},
+        "primary_key": ["author_name", "date_str"],
+        "indexes": []
+    },
+    "commits_hour_weekday": {
+        "column_types": {
+            "commit_week_day": SmallInteger(),
+            "commit_hour": SmallInteger(),
+            "commits_num": BigInteger()
+        },
+        "primary_key": ["commit_week_day", "commit_hour"],
+        "indexes": []
+    },
+    "changes_histogram": {
+        "column_types": {"lines": BigInteger(), "commits_num": BigInteger()},
+        "primary_key": ["change_type", "lines"],
+        "indexes": []
+    },
+    "commits_days_to_merge": {
+        "column_types": {"days_to_merge": BigInteger(), "commits_num": BigInteger()},
+        "primary_key": ["days_to_merge"],
+        "indexes": []
+    }
+}
+
+
+def get_column_types(tab: pd.DataFrame, table_type: str) -> Dict[str, TypeEngine]:
+    """
+    Get declared SQL types of the columns of given table.
+
+    :param tab: table to load as pandas DataFrame
+    :param table_type: type of the table
+    :return: dictionary containing names of the columns as keys and
+        SQLAlchemy types as values
+    """
+
+    column_types = TABLES_SCHEMA.get(table_type).get("column_types")
+    res = {
+        col_name: col_type
+        for col_name, col_type in column_types.items()
+        if col_name in tab.columns
+    }
+
+    return res
+
+
+def convert_columns(tab: pd.DataFrame, table_type: str) -> pd.DataFrame:
+    """
+    Convert values of columns to their declared types - dates from strings
+    in the DATE_FORMAT format to datetimes (accepted by all database drivers)
+    and integers containing missing values from floats to nullable integers.
+
+    :param tab: table to load as pandas DataFrame
+    :param table_type: type of the table
+    :return: table with converted columns
+    """
+
+    converted_columns = {}
+    for col_name, col_type in get_column_types(tab, table_type).items():
+        col = tab[col_name]
+        if isinstance(col_type, Date) and not pd.api.types.is_datetime64_any_dtype(col):
+            converted_columns[col_name] = pd.to_datetime(col, format=DATE_FORMAT)
+        elif isinstance(col_type, (SmallInteger, Integer, BigInteger)) and pd.api.types.is_float_dtype(col):
+            converted_columns[col_name] = col.astype("Int64")
+
+    if not converted_columns:
+        return tab
+
+    res = tab.assign(**converted_columns)
+
+    return res
+
+
+def get_index_name(table_name: str, columns: List[str], suffix: str = None) -> str:
+    """
+    Get name of the index. It contains name of the table, so it can be
+    renamed when staging table is swapped with the target one.
+
+    :param table_name: name of the table
+    :param columns: indexed columns
+    :param suffix: suffix used instead of names of columns
+    :return: name of the index
+    """
+
+    return "ix_{0}_{1}".format(table_name, suffix if suffix is not None else "_".join(columns))
+
+
+def create_constraints_and_indexes(conn: Connection, table_name: str, table_type: str) -> None:
+    """
+    Create primary key and indexes declared for given type of the table.
+    Databases which don't support adding primary keys to existing tables
+    (SQLite) get unique index instead.
+
+    :param conn: database connection
+    :param table_name: name of the table (staging or partitioned parent one)
+    :param table_type: type of the table
+    """
+
+    schema = TABLES_SCHEMA.get(table_type)
+    table = Table(table_name, MetaData(), autoload_with=conn)
+    preparer = conn.dialect.identifier_preparer
+
+    primary_key = schema.get("primary_key")
+    if primary_key and is_partitioned():
+        primary_key = [REPO_COLUMN] + primary_key
+    if primary_key and conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE {0} ADD CONSTRAINT {1} PRIMARY KEY ({2})".format(
+            preparer.quote(table_name),
+            preparer.quote("pk_{0}".format(table_name)),
+            ", ".join(preparer.quote(col) for col in primary_key)
+        )))
+    elif primary_key:
+        Index("pk_{0}".format(table_name), *[table.c[col] for col in primary_key], unique=True).create(conn)
+
+    for index_spec in schema.get("indexes"):
+        columns = index_spec.get("columns")
+        options = {}
+        if "postgresql_using" in index_spec:
+            options["postgresql_using"] = index_spec.get("postgresql_using")
+        if "where" in index_spec:
+            # Partial index - supported by postgres and SQLite
+            options["postgresql_where"] = text(index_spec.get("where"))
+            options["sqlite_where"] = text(index_spec.get("where"))
+
+        Index(
+            get_index_name(table_name, columns, index_spec.get("name_suffix")),
+            *[table.c[col] for col in columns],
+            **options
+        ).create(conn)
+
+
+def create_partitioned_table(conn: Connection, table_name: str, staging_name: str, table_type: str) -> None:
+    """
+    Create parent table of the partitioned layout, list-partitioned by
+    repository, with columns of the staging table (if it doesn't exist yet).
+
+    :param conn: database connection
+    :param table_name: name of the parent table
+    :param staging_name: name of the staging table of the first loaded
+        repository
+    :param table_type: type of the table
+    """
+
+    if conn.dialect.name != "postgresql":
+        raise ValueError("Partitioned tables layout requires postgres database")
+
+    if inspect(conn).has_table(table_name):
+        return
+
+    preparer = conn.dialect.identifier_preparer
+    conn.execute(text("CREATE TABLE {0} (LIKE {1}) PARTITION BY LIST ({2})".format(
+        preparer.quote(table_name), preparer.quote(staging_name), preparer.quote(REPO_COLUMN)
+    )))
+    create_constraints_and_indexes(conn, table_name, table_type)
@@ -0,0 +1,142 @@
+"""
+Tools allowing to run ETL process incrementally. After each successful
+load we store a watermark for given repository - the set of commits pointed
+by all the refs (branches, tags) at the moment of raw data extraction. During
+the next run only commits which are not reachable from these tips are
+extracted, preprocessed and appended to the database.
+"""
+
+import os
+import json
+
+import logging.config
+
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+from sqlalchemy import Engine, Connection, MetaData, Table, Column, Text, DateTime, inspect, delete, insert, select
+from config.config import DB_TABLES_NAMES, WATERMARKS_TABLE_NAME, EXTRACTION_STATE_FILE
+from database.tables_layout import get_table_name
+
+logging.config.fileConfig(os.path.join("config", "logging.conf"))
+logger = logging.getLogger("consoleLogger")
+
+_WATERMARKS_TABLE = Table(
+    WATERMARKS_TABLE_NAME,
+    MetaData(),
+    Column("repo_name", Text, primary_key=True),
+    Column("ref_tips", Text),  # Hashes of ref tips separated with spaces
+    Column("updated_at", DateTime)
+)
+
+
+class WatermarksError(Exception):
+    """
+    Exception raised in case when process of reading watermarks
+    is broken.
+    """
+    pass
+
+
+def get_watermarks(db_engine: Engine) -> Dict[str, List[str]]:
+    """
+    Get watermarks of all repositories loaded to the database. Watermark
+    is returned only if all tables of given repository exist - otherwise
+    the repository needs to be fully rebuilt anyway.
+
+    :param db_engine: db engine created by 'create_engine' method
+    :return: dictionary containing repos names as keys and lists of ref
+        tips hashes as values
+    """
+
+    try:
+        inspector = inspect(db_engine)
+        if not inspector.has_table(WATERMARKS_TABLE_NAME):
+            return {}
+
+        with db_engine.connect() as conn:
+            rows = conn.execute(
+                select(_WATERMARKS_TABLE.c.repo_name, _WATERMARKS_TABLE.c.ref_tips)
+            ).all()
+
+        res = {
+            repo_name: ref_tips.split()
+            for repo_name, ref_tips in rows
+            if all(
+                inspector.has_table(get_table_name(table_type, repo_name))
+                for table_type in DB_TABLES_NAMES
+            )
+        }
+    except Exception as e:
+        raise WatermarksError(str(e))
+
+    return res
+
+
+def save_watermark(db_engine: Union[Engine, Connection], repo_name: str, ref_tips: List[str]) -> None:
+    """
+    Save watermark of given repository, replacing the previous one.
+
+    :param db_engine: db engine created by 'create_engine' method or
+        connection, if watermark should be saved as a part of bigger
+        transaction
+    :param repo_name: name of the repository
+    :param ref_tips: list of hashes of commits pointed by refs at the
+        moment of raw data extraction
+    """
+
+    def _save(conn: Connection) -> None:
+        _WATERMARKS_TABLE.create(conn, checkfirst=True)
+        conn.execute(
+            delete(_WATERMARKS_TABLE).where(_WATERMARKS_TABLE.c.repo_name == repo_name)
+        )
+        conn.execute(
+            insert(_WATERMARKS_TABLE).values(
+                repo_name=repo_name,
+                ref_tips=" ".join(ref_tips),
+                updated_at=datetime.now()
+            )
+        )
+
+    if isinstance(db_engine, Connection):
+        _save(db_engine)
+    else:
+        with db_engine.begin() as conn:
+            _save(conn)
+
+    logger.info("Watermark saved for repo '{0}'".format(repo_name))
+
+
+def save_extraction_state(output_dir: str, incremental: bool, ref_tips: List[str]) -> None:
+    """
+    Save information about raw data extraction next to the raw data
+    files, so loading process knows whether it deals with the full history
+    or only with new commits, and which watermark to store afterwards.
+
+    :param output_dir: directory where raw data of given repository is stored
+    :param incremental: whether only new commits were extracted
+    :param ref_tips: list of hashes of commits pointed by refs at the
+        moment of extraction
+    """
+
+    with open(os.path.join(output_dir, EXTRACTION_STATE_FILE), 'w') as f:
+        json.dump({"incremental": incremental, "ref_tips": ref_tips}, f)
+
+
+def read_extraction_state(raw_data_path: str) -> Optional[Dict[str, object]]:
+    """
+    Read information about raw data extraction saved by the
+    'save_extraction_state' function.
+
+    :param raw_data_path: directory where raw data of given repository is stored
+    :return: dictionary with 'incremental' and 'ref_tips' keys or None
+        if the file doesn't exist
+    """
+
+    file_path = os.path.join(raw_data_path, EXTRACTION_STATE_FILE)
+    if not os.path.exists(file_path):
+        return None
+
+    with open(file_path, 'r') as f:
+        res = json.load(f)
+
+    return res
@@ -2,10 +2,11 @@ import requests
 import os
 import importlib
 
-from flask import Flask
+from flask import Flask, jsonify
 from config import config
 
 from analysis.report_generator import ReportsGenerator
+from database.get_db_engine import get_pool_metrics
 
 import logging.config
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
@@ -50,5 +51,17 @@ def run_analysis() -> requests.Response:
     return res
 
 
+@app.route("/db_pool_metrics")
+def db_pool_metrics() -> requests.Response:
+    """
+    Get statistics of database connections checkouts of the analysis process
+    (see database.get_db_engine.get_pool_metrics).
+
+    :return: HTTP response
+    """
+
+    return jsonify(get_pool_metrics())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0")
@@ -14,13 +14,26 @@ from typing import Dict
 from sqlalchemy import Engine
 from typing import List
 from wordcloud import WordCloud
-from datetime import datetime
+from common.compact_schema import compact_table
+from database.rollups import COUNT_COLUMN, describe_histogram
+from database.tables_layout import read_repo_table
 
 import matplotlib.pyplot as plt
 
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
 logger = logging.getLogger("consoleLogger")
 
+# Types of tables (see DB_TABLES_NAMES) read for the analysis
+_REQUIRED_TABLES = [
+    "authors_stats",
+    "messages_raw_words_freq",
+    "messages_stemmed_words_freq",
+    "commits_daily",
+    "commits_hour_weekday",
+    "changes_histogram",
+    "commits_days_to_merge"
+]
+
 
 class PlotsAndTablesGenerator:
 
@@ -47,7 +60,10 @@ class PlotsAndTablesGenerator:
     @staticmethod
     def _get_required_tables(table_prefix: str, db_engine: Engine) -> Dict[str, pd.DataFrame]:
         """
-        Get all tables required for the analysis
+        Get all tables required for the analysis. Commits are aggregated in
+        rollup tables (see ETL.rollups), so row-level tables (general info,
+        all words) aren't read. Tables are kept in the compact representation
+        (see common.compact_schema).
 
         :param table_prefix: prefix of the table, usually name of the repository
         :param db_engine: database Engine object
@@ -55,10 +71,8 @@ class PlotsAndTablesGenerator:
         """
 
         res = {
-            key: pd.read_sql_table(
-                table_name.format(table_prefix), db_engine
-            )
-            for key, table_name in DB_TABLES_NAMES.items()
+            key: compact_table(read_repo_table(key, table_prefix, db_engine))
+            for key in _REQUIRED_TABLES
         }
 
         return res
@@ -121,9 +135,9 @@ class PlotsAndTablesGenerator:
         )
 
         commits_time_of_day_table = self.all_tabs.get(
-            "general_info"
+            "commits_hour_weekday"
         ).groupby("commit_hour").agg(
-            number_of_commits=("commit_hour", "count")
+            number_of_commits=(COUNT_COLUMN, "sum")
         ).reset_index().sort_values(
             "commit_hour", ascending=True
         )
@@ -145,11 +159,13 @@ class PlotsAndTablesGenerator:
             self.output_path, "commits_day_of_week_plot.png"
         )
 
-        commits_day_of_week_table = self.all_tabs.get(
-            "general_info"
-        ).groupby(["date_str", "commit_week_day"]).agg(
-            number_of_commits=("commit_hash", "count")
-        ).reset_index().sort_values(
+        commits_daily_tab = self.all_tabs.get("commits_daily")
+        commits_day_of_week_table = pd.DataFrame(
+            {
+                "commit_week_day": pd.to_datetime(commits_daily_tab.date_str.astype(str)).dt.isocalendar().day,
+                "number_of_commits": commits_daily_tab[COUNT_COLUMN]
+            }
+        ).sort_values(
             "commit_week_day", ascending=True
         )
 
@@ -318,7 +334,7 @@ class PlotsAndTablesGenerator:
         merge in days and number of commits.
         """
 
-        general_info_tab = self.all_tabs.get("general_info").dropna()
+        days_to_merge_tab = self.all_tabs.get("commits_days_to_merge")
         output_path_tab = os.path.join(
             self.output_path, "time_to_merge_table.png"
         )
@@ -326,20 +342,9 @@ class PlotsAndTablesGenerator:
             self.output_path, "time_to_merge_plot.png"
         )
 
-        commit_merge_time = pd.DataFrame(
-            {
-                "commit_time": general_info_tab.commit_unix_time.apply(lambda x: datetime.fromtimestamp(x)),
-                "merge_time": general_info_tab.merge_unix_time.apply(lambda x: datetime.fromtimestamp(x))
-            }
-        )
-
-        output_tab = commit_merge_time.assign(
-            days_to_merge=(commit_merge_time.merge_time - commit_merge_time.commit_time).dt.days
-        ).groupby(
-            "days_to_merge"
-        ).agg(
-            commits_number=("days_to_merge", "count")
-        ).reset_index().sort_values(
+        output_tab = days_to_merge_tab[["days_to_merge", COUNT_COLUMN]].rename(
+            columns={COUNT_COLUMN: "commits_number"}
+        ).sort_values(
             "days_to_merge", ascending=True
         ).head(TOP_N_DAYS_TIME_TO_MERGE)
 
@@ -351,27 +356,30 @@ class PlotsAndTablesGenerator:
         plt.savefig(output_path_plot)
 
     @staticmethod
-    def _generate_histogram(input_df: pd.DataFrame, col_name: str) -> None:
+    def _generate_histogram(input_df: pd.DataFrame, col_name: str, stats: pd.Series) -> None:
         """
         Generate histogram with mean and median value attached to it as
         black and orange lines respectively.
 
-        :param input_df: data frame containing input data
+        :param input_df: data frame containing values of variable and
+            numbers of commits
         :param col_name: name of column storing variable to plot
+        :param stats: statistics of variable (see
+            database.rollups.describe_histogram)
         """
 
         # Set upper x lim to make the plot readable. It is calculated
         # as mean value of variable + x*standard deviation of variable
         # where 'x' comes from configuration file (SD_OUTLIERS_BORDER)
-        mean_val = input_df[col_name].mean()
-        std_val = input_df[col_name].std()
-        median_val = input_df[col_name].median()
+        mean_val = stats["mean"]
+        std_val = stats["std"]
+        median_val = stats["50%"]
         max_val = mean_val + (SD_OUTLIERS_BORDER*std_val)
         input_df_filtered = input_df[input_df[col_name] < max_val]
 
         sns.displot(
-            data=input_df_filtered, x=col_name, facet_kws=dict(sharey=False, sharex=False),
-            bins=HISTOGRAM_BINS_NUM
+            data=input_df_filtered, x=col_name, weights=COUNT_COLUMN,
+            facet_kws=dict(sharey=False, sharex=False), bins=HISTOGRAM_BINS_NUM
         )
 
         plt.axvline(mean_val, c="k", ls='-', lw=2.5)
@@ -383,7 +391,13 @@ class PlotsAndTablesGenerator:
         with mean and median value shown on it.
         """
 
-        general_info_tab = self.all_tabs.get("general_info")
+        changes_histogram_tab = self.all_tabs.get("changes_histogram")
+        insertions_tab = changes_histogram_tab[
+            changes_histogram_tab.change_type == "insertions"
+        ].rename(columns={"lines": "insertions"})
+        deletions_tab = changes_histogram_tab[
+            changes_histogram_tab.change_type == "deletions"
+        ].rename(columns={"lines": "deletions"})
         output_path_insertions_hist = os.path.join(
             self.output_path, "insertions_histogram.png"
         )
@@ -397,9 +411,11 @@ class PlotsAndTablesGenerator:
             self.output_path, "deletions_stats.png"
         )
 
-        insertions_summary = general_info_tab.insertions.describe().to_frame(
+        insertions_stats = describe_histogram(insertions_tab, "insertions", "insertions")
+        deletions_stats = describe_histogram(deletions_tab, "deletions", "deletions")
+        insertions_summary = insertions_stats.to_frame(
         ).reset_index().rename(columns={"index": "measure"}).round(2)
-        deletions_summary = general_info_tab.deletions.describe().to_frame(
+        deletions_summary = deletions_stats.to_frame(
         ).reset_index().rename(columns={"index": "measure"}).round(2)
 
         fig, ax = self._render_pandas_table(insertions_summary, header_columns=0, col_width=4.0)
@@ -408,10 +424,10 @@ class PlotsAndTablesGenerator:
         fig, ax = self._render_pandas_table(deletions_summary, header_columns=0, col_width=4.0)
         fig.savefig(output_path_deletions_tab)
 
-        self._generate_histogram(general_info_tab, "insertions")
+        self._generate_histogram(insertions_tab, "insertions", insertions_stats)
         plt.savefig(output_path_insertions_hist)
 
-        self._generate_histogram(general_info_tab, "deletions")
+        self._generate_histogram(deletions_tab, "deletions", deletions_stats)
         plt.savefig(output_path_deletions_hist)
 
     def generate_all_plots_and_tables_for_given_report(self) -> None:
@@ -29,7 +29,7 @@ class ReportsGenerator:
         """
 
         self.repos_names = self._get_repos_names() if repos_names is None else repos_names
-        self.db_engine = get_db_engine(inside_compose_network=True)
+        self.db_engine = get_db_engine(inside_compose_network=True, service="analysis")
 
     @staticmethod
     def _get_repos_names() -> List[str]:
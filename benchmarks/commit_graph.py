@@ -0,0 +1,73 @@
+"""
+Benchmark comparing timings of history traversals done during raw data
+retrieval with and without commit-graph file (including changed-paths
+Bloom filters). Repository is cloned as a bare repository to a temporary
+directory, so the original one is not modified.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.commit_graph path/to/repo
+"""
+
+import os
+import sys
+import time
+import subprocess
+import tempfile
+
+from typing import Dict, List
+
+# Commands repeated by the ETL process - full traversal of metadata, full
+# traversal with diff stats and reachability check done for watermarks
+_COMMANDS = {
+    "log --all (metadata)": ["log", "--all", "--pretty=format:%H%x1f%P%x1f%ae%x1f%an%x1f%at%x1f%s"],
+    "log --all --shortstat": ["log", "--all", "--shortstat", "--pretty=format:%H"],
+    "rev-list --all --count": ["rev-list", "--all", "--count"],
+    "log --all -- README* (path-limited)": ["log", "--all", "--pretty=format:%H", "--", "README*"]
+}
+
+
+def _time_commands(repo_path: str, use_commit_graph: bool) -> Dict[str, float]:
+    """
+    Measure execution time of all benchmarked commands.
+
+    :param repo_path: path to the repository
+    :param use_commit_graph: value of 'core.commitGraph' setting
+    :return: dictionary containing commands descriptions and times in seconds
+    """
+
+    res = {}
+    for description, args in _COMMANDS.items():
+        command: List[str] = [
+            "git", "-C", repo_path, "-c", "core.commitGraph={0}".format(str(use_commit_graph).lower())
+        ] + args
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        res[description] = time.perf_counter() - start
+
+    return res
+
+
+if __name__ == "__main__":
+    source_path = os.path.abspath(sys.argv[1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        repo_path = os.path.join(tmp_dir, "repo.git")
+        subprocess.run(["git", "clone", "--quiet", "--bare", source_path, repo_path], check=True)
+
+        times_off = _time_commands(repo_path, use_commit_graph=False)
+
+        start = time.perf_counter()
+        subprocess.run(
+            ["git", "-C", repo_path, "commit-graph", "write", "--reachable", "--changed-paths"],
+            check=True
+        )
+        write_time = time.perf_counter() - start
+
+        times_on = _time_commands(repo_path, use_commit_graph=True)
+
+    print("Commit-graph written in {0:.2f}s".format(write_time))
+    for description in _COMMANDS:
+        print("{0}: off {1:.3f}s, on {2:.3f}s, speedup {3:.1f}x".format(
+            description, times_off[description], times_on[description],
+            times_off[description] / times_on[description]
+        ))
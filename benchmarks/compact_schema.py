@@ -0,0 +1,188 @@
+"""
+Memory report comparing bytes per commit of the tables built by the
+preprocessing, in the original representation (object strings and int64
+columns) and in the compact one (see common.compact_schema). Dataset is
+random, with the shape of the numpy repository (number of commits, merges
+and authors, length of messages), which is one of the analyzed repositories.
+Tables are checked to contain identical values in both representations.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.compact_schema [scale]
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from common.compact_schema import HashKeys, compact_table, get_memory_report
+from ETL.data_preprocessing import RepoRawDataset, GeneralTableProvider, CommitMessagesStatsProvider
+
+# Approximate shape of the numpy repository
+_COMMITS_NUMBER = 25000
+_MERGES_NUMBER = 11000
+_AUTHORS_NUMBER = 1700
+_WORDS_PER_MESSAGE = 8
+_VOCABULARY_SIZE = 8000
+
+# Range of commits timestamps - from 2002-01-01 to 2024-01-01
+_MIN_UNIX_TIME = 1009843200
+_MAX_UNIX_TIME = 1704067200
+
+
+def _random_hashes(rng: np.random.Generator, number: int) -> np.ndarray:
+    """
+    Generate random commits hashes.
+
+    :param rng: random numbers generator
+    :param number: number of hashes
+    :return: array of 40 characters long hex strings
+    """
+    return np.array([bytes(row).hex() for row in rng.integers(0, 256, (number, 20), dtype=np.uint8)], dtype=object)
+
+
+def _get_commits_parents(rng: np.random.Generator, commits_info: pd.DataFrame, merges_info: pd.DataFrame) -> pd.DataFrame:
+    """
+    Generate parents of commits - all commits and merges form a single
+    line ordered by timestamps, each merge has additional parent drawn
+    from earlier commits.
+
+    :param rng: random numbers generator
+    :param commits_info: commits general info table
+    :param merges_info: merges info table
+    :return: commits parents table
+    """
+
+    commits = pd.concat(
+        [
+            commits_info[["commit_hash", "commit_unix_time"]],
+            merges_info.set_axis(["commit_hash", "commit_unix_time"], axis="columns")
+        ]
+    ).sort_values("commit_unix_time").reset_index(drop=True)
+    is_merge = commits.commit_hash.isin(merges_info.merge_hash).to_numpy()
+
+    hashes = commits.commit_hash.to_numpy()
+    parents = np.concatenate([[""], hashes[:-1]]).astype(object)
+    merges_positions = np.flatnonzero(is_merge & (np.arange(len(commits)) > 0))
+    parents[merges_positions] = parents[merges_positions] + " " + hashes[rng.integers(0, merges_positions)]
+
+    res = pd.DataFrame({"commit_hash": hashes, "parent_hashes": parents})
+    return res
+
+
+def generate_raw_tables(scale: float) -> dict:
+    """
+    Generate raw data tables of the numpy-like repository.
+
+    :param scale: multiplier of the number of commits and merges
+    :return: dictionary containing raw tables with keys the same as in
+        the OUTPUT_FILES dictionary
+    """
+
+    rng = np.random.default_rng(0)
+    commits_number = int(_COMMITS_NUMBER * scale)
+    merges_number = int(_MERGES_NUMBER * scale)
+
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulary = np.array(
+        ["".join(rng.choice(letters, rng.integers(3, 11))) for _ in range(_VOCABULARY_SIZE)], dtype=object
+    )
+    authors = np.array(
+        ["{0} {1}".format(*rng.choice(vocabulary, 2)).title() for _ in range(_AUTHORS_NUMBER)], dtype=object
+    )
+    # Activity of authors is highly skewed - a few of them make most of the commits
+    author_ids = np.minimum(rng.zipf(1.5, commits_number) - 1, _AUTHORS_NUMBER - 1)
+    commit_hashes = _random_hashes(rng, commits_number)
+
+    res = {
+        "commits_hashes": pd.DataFrame({"commit_hash": commit_hashes}),
+        "commits_info": pd.DataFrame(
+            {
+                "commit_hash": commit_hashes,
+                "author_email": [a.replace(" ", ".").lower() + "@gmail.com" for a in authors[author_ids]],
+                "author_name": authors[author_ids],
+                "commit_unix_time": rng.integers(_MIN_UNIX_TIME, _MAX_UNIX_TIME, commits_number),
+                "commiter_email": "noreply@github.com",
+                "commiter_name": "GitHub"
+            }
+        ),
+        "commits_messages": pd.DataFrame(
+            {
+                "commit_hash": commit_hashes,
+                "commit_message": [
+                    " ".join(rng.choice(vocabulary, _WORDS_PER_MESSAGE)).capitalize() for _ in range(commits_number)
+                ]
+            }
+        ),
+        "insertions_deletions": pd.DataFrame(
+            {
+                "commit_hash": commit_hashes,
+                "insertions": rng.geometric(0.02, commits_number),
+                "deletions": rng.geometric(0.05, commits_number)
+            }
+        ),
+        "merges_info": pd.DataFrame(
+            {
+                "merge_hash": _random_hashes(rng, merges_number),
+                "merge_unix_time": rng.integers(_MIN_UNIX_TIME, _MAX_UNIX_TIME, merges_number)
+            }
+        )
+    }
+    res["commits_parents"] = _get_commits_parents(rng, res.get("commits_info"), res.get("merges_info"))
+
+    return res
+
+
+def _to_original_representation(tab: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert compact table back to the original representation - object
+    strings and int64 columns.
+
+    :param tab: table in the compact representation
+    :return: table in the original representation
+    """
+
+    res = tab.copy()
+    for col in res.columns:
+        if isinstance(res[col].dtype, pd.CategoricalDtype):
+            res[col] = res[col].astype(object)
+        elif pd.api.types.is_integer_dtype(res[col].dtype):
+            res[col] = res[col].astype(np.int64)
+
+    return res
+
+
+if __name__ == "__main__":
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    dataset = RepoRawDataset("numpy", generate_raw_tables(scale))
+    compact_tables = {
+        "general_info (ETL)": GeneralTableProvider("numpy", dataset).get_general_info_table(),
+        "all_words (ETL)": CommitMessagesStatsProvider("numpy", dataset).get_output_tables().get("all_words_tab")
+    }
+    original_tables = {name: _to_original_representation(tab) for name, tab in compact_tables.items()}
+
+    # Analysis keeps surrogate keys instead of hashes
+    hash_keys = HashKeys()
+    original_tables["general_info (analysis)"] = original_tables["general_info (ETL)"]
+    compact_tables["general_info (analysis)"] = compact_table(original_tables["general_info (ETL)"], hash_keys)
+
+    report = get_memory_report(original_tables, compact_tables)
+    commits_number = len(original_tables["general_info (ETL)"])
+    report["bytes_per_commit_before"] = report.bytes_per_row_before * report.rows / commits_number
+    report["bytes_per_commit_after"] = report.bytes_per_row_after * report.rows / commits_number
+
+    pd.set_option("display.width", 200)
+    print("Commits: {0}".format(commits_number))
+    print(report.round(1).to_string(index=False))
+
+    general_info_decoded = compact_tables["general_info (analysis)"].assign(
+        commit_hash=lambda df: hash_keys.decode(df.commit_hash),
+        merge_hash=lambda df: hash_keys.decode(df.merge_hash)
+    )
+    print("Identical results: {0}".format(
+        all(
+            _to_original_representation(tab).equals(original_tables[name])
+            for name, tab in compact_tables.items() if name != "general_info (analysis)"
+        ) and _to_original_representation(general_info_decoded).equals(original_tables["general_info (ETL)"])
+    ))
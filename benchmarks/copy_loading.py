@@ -0,0 +1,66 @@
+"""
+Benchmark of loading the messages_all_words-like table (one row per word
+occurrence) to the postgres database (connection parameters are taken
+from config) - INSERT statements sent by 'DataFrame.to_sql' compared with
+streaming rows by the COPY FROM STDIN command. Both tables are checked to
+be identical and removed afterwards.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.copy_loading [number_of_rows]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import text
+from database.get_db_engine import get_db_engine
+from ETL.copy_loading import get_sql_types, copy_from_stdin
+
+
+def _generate_words_table(rows_number: int) -> pd.DataFrame:
+    """
+    Generate random table with the messages_all_words schema.
+
+    :param rows_number: number of rows
+    :return: table as pandas DataFrame
+    """
+
+    rng = np.random.default_rng(0)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulary = np.array(
+        ["".join(rng.choice(letters, rng.integers(4, 11))) for _ in range(20000)], dtype=object
+    )
+    commit_hashes = np.array(["{0:040x}".format(rng.integers(0, 2 ** 63)) for _ in range(rows_number // 10 + 1)])
+
+    return pd.DataFrame({
+        "commit_hash": rng.choice(commit_hashes, rows_number),
+        "word": rng.choice(vocabulary, rows_number),
+        "word_stemmed": rng.choice(vocabulary, rows_number)
+    })
+
+
+if __name__ == "__main__":
+    rows_number = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    tab = _generate_words_table(rows_number)
+    db_engine = get_db_engine()
+
+    timings = {}
+    for table_name, method in [("benchmark_words_insert", None), ("benchmark_words_copy", copy_from_stdin)]:
+        start = time.perf_counter()
+        with db_engine.begin() as conn:
+            tab.to_sql(table_name, conn, if_exists="replace", dtype=get_sql_types(tab), method=method)
+        timings[table_name] = time.perf_counter() - start
+
+    print("Rows: {0}".format(rows_number))
+    for table_name, elapsed in timings.items():
+        print("{0}: {1:.2f}s ({2:.0f} rows/s)".format(table_name, elapsed, rows_number / elapsed))
+
+    with db_engine.begin() as conn:
+        print("Identical results: {0}".format(
+            pd.read_sql_table("benchmark_words_insert", conn).equals(pd.read_sql_table("benchmark_words_copy", conn))
+        ))
+        for table_name in timings:
+            conn.execute(text('DROP TABLE "{0}"'.format(table_name)))
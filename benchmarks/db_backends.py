@@ -0,0 +1,128 @@
+"""
+Benchmark of the database backends (see DB_BACKEND in config) - random
+repository (see benchmarks.compact_schema) is loaded to the embedded SQLite
+database (temporary file) and to the postgres database (connection
+parameters are taken from config, skipped if the server isn't available).
+For each backend there are measured: time of loading, startup time of the
+dashboard (creating engine, connecting and running its first query) and
+median latency of the dashboard queries. Tables of the repository are
+removed from postgres afterwards.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.db_backends [scale] [repetitions]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict
+from sqlalchemy import URL, text
+from sqlalchemy.exc import OperationalError
+from config.config import DB_TABLES_NAMES
+from database.get_db_engine import get_db_url, get_engine_for_url, dispose_db_engines
+from database.tables_layout import get_table_name, select_repo_table, quote_literal
+from benchmarks.parallel_loading import _write_raw_data
+from ETL.load_data_to_db import load_data_single_repo
+
+_REPO_NAME = "db_backends_benchmark"
+
+
+def _get_dashboard_queries(author_name: str) -> Dict[str, str]:
+    """
+    Get queries run by the dashboard callbacks (see dashboard.callbacks).
+
+    :param author_name: name of the author whose heatmap is queried
+    :return: dictionary containing descriptions of queries as keys and
+        queries as values
+    """
+
+    res = {
+        "timeline": select_repo_table("commits_daily", _REPO_NAME, ["date_str", "commits_num"]),
+        "dates range": select_repo_table("commits_daily", _REPO_NAME, ["MIN(date_str)", "MAX(date_str)"]),
+        "list of authors": select_repo_table("commits_author_daily", _REPO_NAME, ["author_name"], distinct=True),
+        "heatmap of single author": select_repo_table(
+            "commits_author_daily", _REPO_NAME, ["date_str", "commits_num"],
+            "author_name = {0}".format(quote_literal(author_name))
+        ),
+        "top contributors": select_repo_table(
+            "authors_stats", _REPO_NAME, ["author_name", "number_of_insertions", "number_of_commits"]
+        ),
+        "words frequency": select_repo_table("messages_raw_words_freq", _REPO_NAME, ["*"]),
+        "insertions histogram": select_repo_table(
+            "changes_histogram", _REPO_NAME, ["lines AS insertions", "commits_num"], "change_type = 'insertions'"
+        )
+    }
+
+    return res
+
+
+def _benchmark_backend(db_url: URL, raw_data_path: str, repetitions: int) -> Dict[str, float]:
+    """
+    Load the repository to the database and measure the dashboard queries.
+
+    :param db_url: URL of the database
+    :param raw_data_path: path of the raw data of the repository
+    :param repetitions: number of runs of each query
+    :return: dictionary containing names of measurements as keys and times
+        in milliseconds as values
+    """
+
+    res = {}
+    start = time.perf_counter()
+    load_data_single_repo(raw_data_path, get_engine_for_url(db_url, "etl"))
+    res["loading"] = 1000 * (time.perf_counter() - start)
+    dispose_db_engines()
+
+    start = time.perf_counter()
+    db_engine = get_engine_for_url(db_url, "dashboard")
+    with db_engine.connect() as conn:
+        author_name = conn.execute(text(
+            select_repo_table("commits_author_daily", _REPO_NAME, ["MIN(author_name)"])
+        )).scalar()
+        queries = _get_dashboard_queries(author_name)
+        pd.read_sql_query(queries.get("dates range"), conn)
+    res["dashboard startup"] = 1000 * (time.perf_counter() - start)
+
+    for description, sql_query in queries.items():
+        timings = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            pd.read_sql_query(sql_query, db_engine)
+            timings.append(time.perf_counter() - start)
+        res["query: {0}".format(description)] = 1000 * np.median(timings)
+    dispose_db_engines()
+
+    return res
+
+
+if __name__ == "__main__":
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_data_path = os.path.join(tmp_dir, _REPO_NAME)
+        _write_raw_data(raw_data_path, scale)
+
+        sqlite_url = URL.create("sqlite", database=os.path.join(tmp_dir, "commits_analyzer.db"))
+        results["sqlite"] = _benchmark_backend(sqlite_url, raw_data_path, repetitions)
+
+        postgres_url = get_db_url(backend="postgres")
+        try:
+            results["postgres"] = _benchmark_backend(postgres_url, raw_data_path, repetitions)
+        except OperationalError as e:
+            print("Postgres database isn't available, skipped: {0}".format(e.orig))
+        else:
+            with get_engine_for_url(postgres_url).begin() as conn:
+                for table_type in DB_TABLES_NAMES:
+                    conn.execute(text('DROP TABLE IF EXISTS "{0}"'.format(get_table_name(table_type, _REPO_NAME))))
+            dispose_db_engines()
+
+    results = pd.DataFrame(results).round(2)
+    results.index.name = "time [ms]"
+    print(results.to_string())
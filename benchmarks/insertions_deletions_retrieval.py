@@ -0,0 +1,62 @@
+"""
+Benchmark comparing two ways of retrieving number of insertions and
+deletions per commit - single 'git log --shortstat' traversal and
+separate 'git show' call for each commit.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.insertions_deletions_retrieval path/to/repo
+"""
+
+import os
+import sys
+import time
+import filecmp
+import tempfile
+
+from ETL.raw_data_retriever import RawDataRetriever
+from config.config import OUTPUT_FILES
+
+
+def _time_retrieval(repo_path: str, output_dir: str, single_pass: bool) -> float:
+    """
+    Generate insertions and deletions file for given repository and
+    measure time of retrieval.
+
+    :param repo_path: path to the repository
+    :param output_dir: directory in which results will be kept
+    :param single_pass: whether to use single pass or per commit mode
+    :return: time of retrieval in seconds
+    """
+
+    retriever = RawDataRetriever(repo_path=repo_path, output_dir=output_dir)
+    os.makedirs(retriever.output_dir, exist_ok=True)
+
+    retriever._get_commit_hashes_no_merges()
+    start = time.perf_counter()
+    if single_pass:
+        retriever._get_number_of_insertions_and_deletions_single_pass()
+    else:
+        retriever._get_number_of_insertions_and_deletions_per_commit()
+    res = time.perf_counter() - start
+
+    return res
+
+
+if __name__ == "__main__":
+    repo_path = os.path.abspath(sys.argv[1])
+    repo_name = os.path.basename(repo_path)
+
+    with tempfile.TemporaryDirectory() as single_pass_dir, tempfile.TemporaryDirectory() as per_commit_dir:
+        single_pass_time = _time_retrieval(repo_path, single_pass_dir, single_pass=True)
+        per_commit_time = _time_retrieval(repo_path, per_commit_dir, single_pass=False)
+
+        output_identical = filecmp.cmp(
+            os.path.join(single_pass_dir, repo_name, OUTPUT_FILES.get("insertions_deletions")),
+            os.path.join(per_commit_dir, repo_name, OUTPUT_FILES.get("insertions_deletions")),
+            shallow=False
+        )
+
+    print("Single pass: {0:.2f}s".format(single_pass_time))
+    print("Per commit: {0:.2f}s".format(per_commit_time))
+    print("Speedup: {0:.1f}x".format(per_commit_time / single_pass_time))
+    print("Identical output: {0}".format(output_identical))
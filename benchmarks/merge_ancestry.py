@@ -0,0 +1,141 @@
+"""
+Benchmark of finding nearest merges using ancestry of commits (see
+ETL.merge_ancestry) on a random graph of commits - feature branches forked
+from the main line and merged back after a while, with timestamps growing
+along the history. Time of the 'ancestry' method is compared with the
+'timestamp' one, together with the share of commits for which they give
+different merges. Results of the 'ancestry' method are checked against a
+brute-force reachability check on a sample of commits.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.merge_ancestry [number_of_commits]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Set, Tuple
+from ETL.data_preprocessing import GeneralTableProvider
+from ETL.merge_ancestry import find_nearest_merges
+
+# Probabilities that next commit is a merge, starts a new feature branch or
+# is made directly to the main line (otherwise it continues one of feature
+# branches) and maximal number of branches developed at the same time
+_MERGE_PROBABILITY = 0.1
+_BRANCH_PROBABILITY = 0.05
+_MAIN_LINE_PROBABILITY = 0.1
+_MAX_OPEN_BRANCHES = 20
+
+# Number of commits checked with the brute-force method
+_SAMPLE_SIZE = 200
+
+
+def _generate_graph(commits_number: int) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Generate random graph of commits.
+
+    :param commits_number: number of commits (including merges)
+    :return: tuple containing commits parents, merges info and commits
+        (non-merge commits with timestamps) tables
+    """
+
+    rng = np.random.default_rng(0)
+    hashes = ["{0:040x}".format(i) for i in range(commits_number)]
+    parents: List[str] = [""]
+    main_tip = 0
+    open_branches: List[int] = []
+
+    for i in range(1, commits_number):
+        draw = rng.random()
+        if open_branches and (draw < _MERGE_PROBABILITY or len(open_branches) >= _MAX_OPEN_BRANCHES):
+            # Merge random feature branch into the main line
+            branch_tip = open_branches.pop(rng.integers(len(open_branches)))
+            parents.append("{0} {1}".format(hashes[main_tip], hashes[branch_tip]))
+            main_tip = i
+        elif draw < _MERGE_PROBABILITY + _BRANCH_PROBABILITY:
+            # Start new feature branch from the main line
+            parents.append(hashes[main_tip])
+            open_branches.append(i)
+        elif draw < _MERGE_PROBABILITY + _BRANCH_PROBABILITY + _MAIN_LINE_PROBABILITY or not open_branches:
+            # Commit directly to the main line
+            parents.append(hashes[main_tip])
+            main_tip = i
+        else:
+            # Continue random feature branch
+            position = rng.integers(len(open_branches))
+            parents.append(hashes[open_branches[position]])
+            open_branches[position] = i
+
+    # Timestamps grow along the history, with some noise
+    unix_times = 1_000_000_000 + np.arange(commits_number) * 600 + rng.integers(0, 3600, commits_number)
+    commits_parents = pd.DataFrame({"commit_hash": hashes, "parent_hashes": parents})
+    is_merge = commits_parents.parent_hashes.str.contains(" ")
+
+    merges_info = pd.DataFrame(
+        {"merge_hash": commits_parents.commit_hash[is_merge], "merge_unix_time": unix_times[is_merge.to_numpy()]}
+    ).reset_index(drop=True)
+    commits = pd.DataFrame(
+        {"commit_hash": commits_parents.commit_hash[~is_merge], "commit_unix_time": unix_times[~is_merge.to_numpy()]}
+    ).reset_index(drop=True)
+
+    return commits_parents, merges_info, commits
+
+
+def _get_ancestors(commits_parents: pd.DataFrame) -> Dict[str, Set[str]]:
+    """
+    Brute-force - get set of ancestors of each commit.
+
+    :param commits_parents: commits parents table
+    :return: dictionary containing set of ancestors of each commit
+    """
+
+    res = {}
+    # Parents are always generated before children
+    for commit_hash, parent_hashes in commits_parents.itertuples(index=False):
+        ancestors = set()
+        for parent in parent_hashes.split():
+            ancestors.add(parent)
+            ancestors |= res[parent]
+        res[commit_hash] = ancestors
+
+    return res
+
+
+if __name__ == "__main__":
+    commits_number = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    commits_parents, merges_info, commits = _generate_graph(commits_number)
+
+    start = time.perf_counter()
+    nearest_merges = find_nearest_merges(commits_parents, merges_info)
+    ancestry_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    by_timestamp = GeneralTableProvider._append_merges_info(commits, merges_info)
+    timestamp_time = time.perf_counter() - start
+
+    by_ancestry = commits.merge(nearest_merges, how="left", on="commit_hash")
+    different = (by_ancestry.merge_hash.fillna("") != by_timestamp.merge_hash.fillna("")).mean()
+
+    print("Commits: {0}, merges: {1}".format(commits_number, len(merges_info)))
+    print("Ancestry: {0:.2f}s".format(ancestry_time))
+    print("Timestamp: {0:.2f}s".format(timestamp_time))
+    print("Commits with different nearest merge: {0:.1%}".format(different))
+
+    # Brute-force check is quadratic, so it's done on a smaller graph
+    commits_parents, merges_info, commits = _generate_graph(min(commits_number, 5000))
+    ancestors = _get_ancestors(commits_parents)
+    merges_sorted = merges_info.sort_values(["merge_unix_time", "merge_hash"])
+    expected = {}
+    for commit_hash in commits.commit_hash.sample(_SAMPLE_SIZE, random_state=0):
+        containing_merges = [
+            merge_hash for merge_hash in merges_sorted.merge_hash if commit_hash in ancestors[merge_hash]
+        ]
+        expected[commit_hash] = containing_merges[0] if containing_merges else None
+
+    nearest_merges = find_nearest_merges(commits_parents, merges_info).set_index("commit_hash").merge_hash
+    print("Identical results: {0}".format(
+        all(nearest_merges.get(commit_hash) == merge_hash for commit_hash, merge_hash in expected.items())
+    ))
@@ -0,0 +1,77 @@
+"""
+Benchmark of loading many repositories (see PREPROCESSING_WORKERS in
+config) - repositories loaded one by one compared with preprocessing them
+in the pool of processes and loading them in the pool of threads. Raw data
+of each repository is random, with the shape of the numpy repository (see
+benchmarks.compact_schema) multiplied by the scale. Repositories are loaded
+to SQLite databases (single loading thread, SQLite doesn't allow concurrent
+writes), which are checked to contain identical tables.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.parallel_loading [number_of_repos] [scale] [number_of_processes]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import pandas as pd
+
+from sqlalchemy import create_engine
+from config.config import DB_TABLES_NAMES
+from benchmarks.compact_schema import generate_raw_tables
+from ETL.raw_data_files import get_raw_data_file_name
+from ETL.load_data_to_db import load_data_single_repo, load_data_all_repos_parallel
+
+
+def _write_raw_data(raw_data_path: str, scale: float) -> None:
+    """
+    Write random raw data of single repository as .csv files.
+
+    :param raw_data_path: directory in which files are created
+    :param scale: multiplier of the number of commits and merges
+    """
+
+    os.makedirs(raw_data_path)
+    for file_type, tab in generate_raw_tables(scale).items():
+        tab.to_csv(os.path.join(raw_data_path, get_raw_data_file_name(file_type, "csv")), sep=";", index=False)
+
+
+if __name__ == "__main__":
+    repos_number = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    processes_number = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_data_paths = [os.path.join(tmp_dir, "repo_{0}".format(i)) for i in range(repos_number)]
+        for raw_data_path in raw_data_paths:
+            _write_raw_data(raw_data_path, scale)
+
+        serial_engine = create_engine("sqlite:///{0}".format(os.path.join(tmp_dir, "serial.db")))
+        start = time.perf_counter()
+        for raw_data_path in raw_data_paths:
+            load_data_single_repo(raw_data_path, serial_engine)
+        serial_time = time.perf_counter() - start
+
+        parallel_engine = create_engine("sqlite:///{0}".format(os.path.join(tmp_dir, "parallel.db")))
+        start = time.perf_counter()
+        timings = load_data_all_repos_parallel(raw_data_paths, parallel_engine, processes_number, 1)
+        parallel_time = time.perf_counter() - start
+
+        print("Repos: {0}, commits per repo: {1}, CPU cores: {2}".format(
+            repos_number, int(25000 * scale), os.cpu_count())
+        )
+        print("Serial: {0:.2f}s".format(serial_time))
+        print("Parallel ({0} processes): {1:.2f}s, preprocessing {2:.2f}s, loading {3:.2f}s (sums over repos)".format(
+            processes_number, parallel_time,
+            sum(t.get("preprocessing") for t in timings.values()), sum(t.get("loading") for t in timings.values())
+        ))
+        print("Identical results: {0}".format(
+            all(
+                pd.read_sql_table(table_name.format(os.path.basename(raw_data_path)), serial_engine).equals(
+                    pd.read_sql_table(table_name.format(os.path.basename(raw_data_path)), parallel_engine)
+                )
+                for raw_data_path in raw_data_paths for table_name in DB_TABLES_NAMES.values()
+            )
+        ))
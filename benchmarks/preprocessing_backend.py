@@ -0,0 +1,85 @@
+"""
+Benchmark comparing preprocessing backends (see PREPROCESSING_BACKEND in
+config) - time of transforming raw data files into tables loaded to the
+database, with pandas and with DuckDB. Raw data is random, with the shape
+of the numpy repository (see benchmarks.compact_schema) multiplied by the
+scale, stored in .csv and Parquet files. Tables produced by both backends
+are checked to contain identical values.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.preprocessing_backend [scale]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+from benchmarks.compact_schema import generate_raw_tables
+from ETL.raw_data_files import get_raw_data_writer
+import ETL.data_preprocessing as data_preprocessing
+import ETL.duckdb_preprocessing as duckdb_preprocessing
+import ETL.load_data_to_db as load_data_to_db
+
+
+def _write_raw_data(raw_tables: dict, output_dir: str, raw_data_format: str) -> None:
+    """
+    Write raw tables using the raw data writer.
+
+    :param raw_tables: dictionary containing raw tables with keys the same
+        as in the OUTPUT_FILES dictionary
+    :param output_dir: directory in which files are created
+    :param raw_data_format: 'csv' or 'parquet'
+    """
+
+    with get_raw_data_writer(output_dir, raw_data_format) as writer:
+        for file_type, tab in raw_tables.items():
+            for row in tab.itertuples(index=False):
+                writer.write_row(file_type, list(row))
+
+
+def _preprocess(raw_data_path: str, raw_data_format: str, backend: str) -> dict:
+    """
+    Preprocess raw data of the repository using given backend.
+
+    :param raw_data_path: path to directory where raw data is stored
+    :param raw_data_format: 'csv' or 'parquet'
+    :param backend: 'pandas' or 'duckdb'
+    :return: dictionary containing output tables
+    """
+
+    data_preprocessing.RAW_DATA_FORMAT = duckdb_preprocessing.RAW_DATA_FORMAT = raw_data_format
+    load_data_to_db.PREPROCESSING_BACKEND = backend
+    dataset = data_preprocessing.RepoRawDataset(raw_data_path)
+
+    return load_data_to_db.preprocess_single_repo(raw_data_path, dataset)
+
+
+if __name__ == "__main__":
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    raw_tables = generate_raw_tables(scale)
+
+    print("Commits: {0}".format(len(raw_tables.get("commits_info"))))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for raw_data_format in ["csv", "parquet"]:
+            output_dir = os.path.join(tmp_dir, raw_data_format)
+            os.makedirs(output_dir)
+            _write_raw_data(raw_tables, output_dir, raw_data_format)
+
+            # Stems of all the words are cached before the first measurement
+            _preprocess(output_dir, raw_data_format, "pandas")
+            for backend in ["pandas", "duckdb"]:
+                start = time.perf_counter()
+                results[(raw_data_format, backend)] = _preprocess(output_dir, raw_data_format, backend)
+                print("{0}, {1}: {2:.2f}s".format(raw_data_format, backend, time.perf_counter() - start))
+
+    # DuckDB returns plain strings and int64 sums instead of categoricals
+    # and int32 columns, which doesn't change tables loaded to the database
+    expected = results[("csv", "pandas")]
+    print("Identical results: {0}".format(
+        all(
+            tab.astype(expected[table_type].dtypes).equals(expected[table_type])
+            for res in results.values() for table_type, tab in res.items()
+        )
+    ))
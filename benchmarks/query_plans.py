@@ -0,0 +1,128 @@
+"""
+Check of query plans of the dashboard and incremental ETL queries - random
+repository (see benchmarks.compact_schema) is loaded to the postgres
+database (connection parameters are taken from config) and each query is
+checked with EXPLAIN to use the index declared for it in ETL.tables_schema.
+Tables of the repository are removed afterwards. Exits with status 1 if
+any query doesn't use its index.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.query_plans [scale]
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+import pandas as pd
+
+from typing import Iterator
+from sqlalchemy import Connection, text
+from config.config import DB_TABLES_NAMES
+from database.get_db_engine import get_db_engine
+from database.tables_layout import get_table_name, select_repo_table
+from benchmarks.parallel_loading import _write_raw_data
+from ETL.load_data_to_db import load_data_single_repo
+from ETL.tables_schema import get_index_name
+
+_REPO_NAME = "query_plans_benchmark"
+
+
+def _iter_indexes_names(plan: dict) -> Iterator[str]:
+    """
+    Iterate over names of indexes used by the plan and its subplans.
+
+    :param plan: plan node from the output of EXPLAIN (FORMAT JSON)
+    :return: iterator of indexes names
+    """
+
+    if "Index Name" in plan:
+        yield plan.get("Index Name")
+    for subplan in plan.get("Plans", []):
+        yield from _iter_indexes_names(subplan)
+
+
+def _get_used_indexes(conn: Connection, sql_query: str, params: dict = None) -> list:
+    """
+    Get names of indexes used by the query.
+
+    :param conn: database connection
+    :param sql_query: query to explain
+    :param params: parameters of the query
+    :return: list of indexes names
+    """
+
+    res = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql_query), params or {}).scalar()
+    if isinstance(res, str):
+        res = json.loads(res)
+
+    return list(_iter_indexes_names(res[0].get("Plan")))
+
+
+if __name__ == "__main__":
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    db_engine = get_db_engine()
+    general_info = get_table_name("general_info", _REPO_NAME)
+    commits_daily = get_table_name("commits_daily", _REPO_NAME)
+    commits_author_daily = get_table_name("commits_author_daily", _REPO_NAME)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_data_path = os.path.join(tmp_dir, _REPO_NAME)
+        _write_raw_data(raw_data_path, scale)
+        load_data_single_repo(raw_data_path, db_engine)
+
+    try:
+        with db_engine.connect() as conn:
+            # The least active author - heatmap of single author reads few rows
+            author_name, commit_hash = conn.execute(text(
+                'SELECT author_name, MIN(commit_hash) FROM "{0}" GROUP BY author_name '
+                'ORDER BY COUNT(*) LIMIT 1'.format(general_info)
+            )).one()
+
+            checks = [
+                (
+                    "Dashboard - dates range",
+                    select_repo_table("commits_daily", _REPO_NAME, ["MIN(date_str)", "MAX(date_str)"]),
+                    {},
+                    "pk_{0}".format(commits_daily)
+                ),
+                (
+                    "Dashboard - heatmap of single author",
+                    select_repo_table(
+                        "commits_author_daily", _REPO_NAME, ["date_str", "commits_num"], "author_name = :author_name"
+                    ),
+                    {"author_name": author_name},
+                    "pk_{0}".format(commits_author_daily)
+                ),
+                (
+                    "ETL - commits waiting for the nearest merge",
+                    'SELECT commit_hash, commit_unix_time FROM "{0}" WHERE merge_hash IS NULL'.format(general_info),
+                    {},
+                    get_index_name(general_info, ["commit_hash"], "pending_merge")
+                ),
+                (
+                    "ETL - update of merge info",
+                    'SELECT merge_hash FROM "{0}" WHERE commit_hash = :commit_hash'.format(general_info),
+                    {"commit_hash": commit_hash},
+                    "pk_{0}".format(general_info)
+                )
+            ]
+
+            results = []
+            for description, sql_query, params, index_name in checks:
+                used_indexes = _get_used_indexes(conn, sql_query, params)
+                results.append({
+                    "query": description,
+                    "expected index": index_name,
+                    "used indexes": ", ".join(used_indexes),
+                    "passed": index_name in used_indexes
+                })
+    finally:
+        with db_engine.begin() as conn:
+            for table_type in DB_TABLES_NAMES:
+                conn.execute(text('DROP TABLE IF EXISTS "{0}"'.format(get_table_name(table_type, _REPO_NAME))))
+
+    results = pd.DataFrame(results)
+    print(results.to_string(index=False))
+    sys.exit(0 if results.passed.all() else 1)
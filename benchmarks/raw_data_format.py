@@ -0,0 +1,117 @@
+"""
+Benchmark comparing raw data formats (see RAW_DATA_FORMAT in config) -
+size of the files, time of writing them and time of reading them the
+same way as preprocessing does. Raw data is random, with authors and
+words drawn from limited pools, similar to real repositories. Tables read
+from all the formats are checked to be identical.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.raw_data_format [number_of_commits]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ETL.raw_data_files import get_raw_data_file_name, get_raw_data_writer
+import ETL.data_preprocessing as data_preprocessing
+
+# Number of distinct authors and words in the generated history
+_AUTHORS_NUMBER = 500
+_WORDS_NUMBER = 5000
+
+
+def _generate_commits(commits_number: int) -> pd.DataFrame:
+    """
+    Generate random commits.
+
+    :param commits_number: number of commits
+    :return: DataFrame containing columns of all raw data files
+    """
+
+    rng = np.random.default_rng(0)
+    authors = np.array(["Author {0}".format(i) for i in range(_AUTHORS_NUMBER)], dtype=object)
+    words = np.array(["word{0}".format(i) for i in range(_WORDS_NUMBER)], dtype=object)
+    author_ids = rng.integers(0, _AUTHORS_NUMBER, commits_number)
+
+    res = pd.DataFrame(
+        {
+            "commit_hash": ["{0:040x}".format(i) for i in rng.integers(0, 2 ** 62, commits_number)],
+            "author_email": [a.replace(" ", ".").lower() + "@example.com" for a in authors[author_ids]],
+            "author_name": authors[author_ids],
+            "commit_unix_time": rng.integers(946684800, 1704067200, commits_number),
+            "commiter_email": "noreply@github.com",
+            "commiter_name": "GitHub",
+            "commit_message": [" ".join(words[rng.integers(0, _WORDS_NUMBER, 8)]) for _ in range(commits_number)],
+            "insertions": rng.integers(0, 1000, commits_number),
+            "deletions": rng.integers(0, 1000, commits_number)
+        }
+    )
+
+    return res
+
+
+def _write_raw_data(commits: pd.DataFrame, output_dir: str, raw_data_format: str) -> None:
+    """
+    Write commits using the raw data writer, row by row, the same way as
+    the single traversal extraction does.
+
+    :param commits: DataFrame returned by '_generate_commits'
+    :param output_dir: directory in which files are created
+    :param raw_data_format: 'csv', 'parquet' or 'arrow'
+    """
+
+    with get_raw_data_writer(output_dir, raw_data_format) as writer:
+        for row in commits.itertuples(index=False):
+            writer.write_row("commits_hashes", [row.commit_hash])
+            writer.write_row(
+                "commits_info",
+                [row.commit_hash, row.author_email, row.author_name,
+                 row.commit_unix_time, row.commiter_email, row.commiter_name]
+            )
+            writer.write_row("commits_messages", [row.commit_hash, row.commit_message])
+            writer.write_row("insertions_deletions", [row.commit_hash, row.insertions, row.deletions])
+
+
+if __name__ == "__main__":
+    commits_number = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    commits = _generate_commits(commits_number)
+    file_types = ["commits_hashes", "commits_info", "commits_messages", "insertions_deletions"]
+
+    print("Commits: {0}".format(commits_number))
+    tables = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for raw_data_format in ["csv", "parquet", "arrow"]:
+            output_dir = os.path.join(tmp_dir, raw_data_format)
+            os.makedirs(output_dir)
+
+            start = time.perf_counter()
+            _write_raw_data(commits, output_dir, raw_data_format)
+            write_time = time.perf_counter() - start
+
+            size = sum(
+                os.path.getsize(os.path.join(output_dir, get_raw_data_file_name(file_type, raw_data_format)))
+                for file_type in file_types
+            )
+
+            data_preprocessing.RAW_DATA_FORMAT = raw_data_format
+            dataset = data_preprocessing.RepoRawDataset(output_dir)
+            start = time.perf_counter()
+            tables[raw_data_format] = {file_type: dataset.get_table(file_type) for file_type in file_types}
+            read_time = time.perf_counter() - start
+
+            print("{0}: {1:.2f} MB, written in {2:.2f}s, read in {3:.2f}s".format(
+                raw_data_format, size / 1024 ** 2, write_time, read_time)
+            )
+
+    print("Identical results: {0}".format(
+        all(
+            tables["csv"][file_type].equals(tables[raw_data_format][file_type].astype(tables["csv"][file_type].dtypes))
+            for raw_data_format in ["parquet", "arrow"]
+            for file_type in file_types
+        )
+    ))
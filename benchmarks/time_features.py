@@ -0,0 +1,70 @@
+"""
+Benchmark comparing per-row date decomposition (previous implementation,
+'datetime.fromtimestamp' and 'strftime' called inside 'DataFrame.apply')
+with vectorized one from common.time_features. Timestamps are random,
+results of both methods are checked to be identical.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.time_features [number_of_rows]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from datetime import datetime, timezone
+from typing import Dict
+from common.time_features import get_time_features
+
+# Range of random timestamps - from 2000-01-01 to 2024-01-01
+_MIN_UNIX_TIME = 946684800
+_MAX_UNIX_TIME = 1704067200
+
+
+def _get_date_details_per_row(df_row: pd.Series) -> Dict[str, object]:
+    """
+    Previous implementation of date decomposition, applied to each row
+    separately. Timestamps are interpreted as UTC, the same as in the
+    default COMMITS_TIMEZONE.
+
+    :param df_row: row of the general info DataFrame
+    :return: dictionary containing date's details
+    """
+    dt_object = datetime.fromtimestamp(df_row["commit_unix_time"], tz=timezone.utc)
+    res = {
+        "date_str": dt_object.strftime("%Y-%m-%d"),
+        "commit_year": dt_object.year,
+        "commit_month": dt_object.month,
+        "commit_month_day": dt_object.day,
+        "commit_week_day": dt_object.isoweekday(),
+        "commit_hour": dt_object.hour
+    }
+
+    return res
+
+
+if __name__ == "__main__":
+    rows_number = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    rng = np.random.default_rng(0)
+    general_info_tab = pd.DataFrame(
+        {"commit_unix_time": rng.integers(_MIN_UNIX_TIME, _MAX_UNIX_TIME, rows_number)}
+    )
+
+    start = time.perf_counter()
+    per_row_res = general_info_tab.apply(
+        _get_date_details_per_row, axis='columns', result_type='expand'
+    )
+    per_row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized_res = get_time_features(general_info_tab.commit_unix_time, timezone="UTC")
+    vectorized_time = time.perf_counter() - start
+
+    print("Rows: {0}".format(rows_number))
+    print("Per row: {0:.2f}s".format(per_row_time))
+    print("Vectorized: {0:.2f}s".format(vectorized_time))
+    print("Speedup: {0:.1f}x".format(per_row_time / vectorized_time))
+    print("Identical results: {0}".format(per_row_res.astype(vectorized_res.dtypes).equals(vectorized_res)))
@@ -0,0 +1,84 @@
+"""
+Benchmark comparing tokenization of commit messages word by word
+(previous implementation - Python list comprehensions applied to each
+message) with vectorized one used by CommitMessagesStatsProvider. Messages
+are generated randomly from a vocabulary containing mixed case words,
+numbers and special characters. Results of both methods are checked to
+be identical.
+
+Usage (run from the root directory of the project):
+    python -m benchmarks.tokenization [number_of_messages]
+"""
+
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from typing import List
+from ETL.data_preprocessing import CommitMessagesStatsProvider
+
+_VOCABULARY = [
+    "Fix", "fixed", "BUG", "in", "the", "parser", "Add", "tests", "for", "#1234", "don't", "v2.0",
+    "refactor:", "README.md", "update", "dependencies", "a", "(closes", "issue)", "Merge", "branch",
+    "'main'", "of", "github.com/org/repo", "WIP", "typo", "docs", "-", "...", "multi-line", ""
+]
+
+
+def _preprocess_words(words: List[str]) -> List[str]:
+    """
+    Previous implementation of words preprocessing, applied to the words
+    of each message separately.
+
+    :param words: list of words (effect of sentence.split(" ") operation)
+    :return: list containing preprocessed and filtered words
+    """
+
+    words_lowercase = [w.lower() for w in words]
+    special_chars_numbers_excluded = [
+        re.sub('[^a-z]', '', w)
+        for w in words_lowercase
+    ]
+
+    res = list(
+        filter(
+            lambda x: len(x) > 3,
+            special_chars_numbers_excluded
+        )
+    )
+
+    return res
+
+
+if __name__ == "__main__":
+    messages_number = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    rng = np.random.default_rng(0)
+    messages = pd.Series(
+        [
+            " ".join(rng.choice(_VOCABULARY, rng.integers(1, 15)))
+            for _ in range(messages_number)
+        ]
+    )
+    messages[::100] = np.nan  # Messages missing in the raw data
+
+    start = time.perf_counter()
+    per_message_res = messages.map(
+        lambda x: str(x).split(" ")
+    ).apply(
+        _preprocess_words
+    ).explode().dropna()
+    per_message_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized_res = CommitMessagesStatsProvider._tokenize_messages(messages)
+    vectorized_time = time.perf_counter() - start
+
+    tokens_number = len(vectorized_res)
+    print("Messages: {0}, tokens: {1}".format(messages_number, tokens_number))
+    print("Per message: {0:.2f}s ({1:,.0f} tokens/s)".format(per_message_time, tokens_number / per_message_time))
+    print("Vectorized: {0:.2f}s ({1:,.0f} tokens/s)".format(vectorized_time, tokens_number / vectorized_time))
+    print("Speedup: {0:.1f}x".format(per_message_time / vectorized_time))
+    print("Identical results: {0}".format(per_message_res.equals(vectorized_res)))
@@ -0,0 +1,192 @@
+"""
+Compact in-memory representation of commits tables, shared by the ETL
+and analysis services:
+    - identities (authors and commiters emails and names) and other
+        repetitive text columns (dates, words, merges hashes) are stored
+        as categoricals - each distinct value is kept once and rows hold
+        only integer codes
+    - integer columns are narrowed to the smallest type which can hold
+        their domain (e.g. int8 for hours)
+    - optionally, commits hashes are replaced with int32 surrogate keys
+        (see HashKeys) - analysis needs them only to count and join commits
+
+Representation affects only memory, not values - tables loaded to the
+database contain the same data as before.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, Optional
+
+# Text columns stored as categoricals
+CATEGORICAL_COLUMNS = [
+    "author_email",
+    "author_name",
+    "commiter_email",
+    "commiter_name",
+    "date_str",
+    "merge_hash",
+    "raw_word",
+    "stemmed_word"
+]
+
+# Integer columns and types they are narrowed to. Column is left unchanged
+# if it contains missing values or values out of the range of the type
+NARROW_INT_DTYPES = {
+    "commit_year": np.int16,
+    "commit_month": np.int8,
+    "commit_month_day": np.int8,
+    "commit_week_day": np.int8,
+    "commit_hour": np.int8,
+    "insertions": np.int32,
+    "deletions": np.int32,
+    "number_of_commits": np.int32,
+    "days_of_activity": np.int32,
+    "raw_word_freq": np.int32,
+    "stemmed_word_freq": np.int32
+}
+
+# Columns containing commits hashes, which can be replaced with surrogate keys
+HASH_COLUMNS = ["commit_hash", "merge_hash"]
+
+
+class HashKeys:
+    """
+    Dictionary mapping commits hashes (40 characters long strings) to
+    int32 surrogate keys. The same hash gets the same key in all the
+    tables encoded with given instance, so keys can be joined and
+    compared across tables. Missing hashes are encoded as missing
+    values of the nullable 'Int32' type.
+    """
+
+    def __init__(self):
+        """
+        Create an empty dictionary
+        """
+        self.hashes = pd.Index([], dtype=object)
+
+    def encode(self, hashes: pd.Series) -> pd.Series:
+        """
+        Replace hashes with surrogate keys, adding new hashes to the
+        dictionary.
+
+        :param hashes: series of hashes
+        :return: series of int32 keys with the same index as input series
+        """
+
+        new_hashes = pd.Index(hashes.dropna().unique()).difference(self.hashes)
+        if len(new_hashes) > 0:
+            self.hashes = self.hashes.append(new_hashes)
+
+        keys = self.hashes.get_indexer(hashes.astype(object))
+        missing = keys == -1
+        if missing.any():
+            res = pd.Series(pd.arrays.IntegerArray(keys.astype(np.int32), missing), index=hashes.index)
+        else:
+            res = pd.Series(keys.astype(np.int32), index=hashes.index)
+
+        return res
+
+    def decode(self, keys: pd.Series) -> pd.Series:
+        """
+        Replace surrogate keys with hashes.
+
+        :param keys: series of keys returned by 'encode'
+        :return: series of hashes (NaN for missing keys)
+        """
+
+        res = pd.Series(
+            self.hashes.take(keys.fillna(-1).to_numpy(dtype=np.int64), allow_fill=True, fill_value=np.nan),
+            index=keys.index, dtype=object
+        )
+
+        return res
+
+
+def _to_categorical(values: pd.Series) -> pd.Series:
+    """
+    Convert series to categorical with lexically sorted categories, so
+    grouping by it gives rows in the same order as grouping by strings.
+
+    :param values: series of strings or categorical series
+    :return: categorical series
+    """
+
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.astype("category")
+
+    categories = values.cat.categories
+    if categories.is_monotonic_increasing:
+        return values
+
+    return values.cat.reorder_categories(categories.sort_values())
+
+
+def _narrow_int(values: pd.Series, dtype: type) -> pd.Series:
+    """
+    Narrow integer series to given type, if all its values fit into it.
+
+    :param values: series to narrow
+    :param dtype: target numpy integer type
+    :return: narrowed series or input series, if it can't be narrowed
+    """
+
+    if not pd.api.types.is_integer_dtype(values.dtype) or isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+        return values
+
+    type_info = np.iinfo(dtype)
+    if len(values) > 0 and (values.min() < type_info.min or values.max() > type_info.max):
+        return values
+
+    return values.astype(dtype)
+
+
+def compact_table(tab: pd.DataFrame, hash_keys: Optional[HashKeys] = None) -> pd.DataFrame:
+    """
+    Convert table to the compact representation. Columns which are not
+    a part of the compact schema are left unchanged.
+
+    :param tab: table as pandas DataFrame
+    :param hash_keys: dictionary used to replace hashes with surrogate keys.
+        If None, hashes are kept (merges hashes are stored as categoricals)
+    :return: table in the compact representation
+    """
+
+    res = tab.copy(deep=False)
+    for col in res.columns:
+        if hash_keys is not None and col in HASH_COLUMNS:
+            res[col] = hash_keys.encode(res[col])
+        elif col in CATEGORICAL_COLUMNS:
+            res[col] = _to_categorical(res[col])
+        elif col in NARROW_INT_DTYPES:
+            res[col] = _narrow_int(res[col], NARROW_INT_DTYPES.get(col))
+
+    return res
+
+
+def get_memory_report(tables_before: Dict[str, pd.DataFrame], tables_after: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Compare memory used by tables before and after conversion to the
+    compact representation.
+
+    :param tables_before: tables in the original representation
+    :param tables_after: the same tables in the compact representation
+    :return: DataFrame containing table name, number of rows, bytes per
+        row before and after and ratio of them
+    """
+
+    res = pd.DataFrame(
+        [
+            {
+                "table": name,
+                "rows": len(tab),
+                "bytes_per_row_before": tab.memory_usage(deep=True, index=False).sum() / max(len(tab), 1),
+                "bytes_per_row_after": tables_after[name].memory_usage(deep=True, index=False).sum() / max(len(tab), 1)
+            }
+            for name, tab in tables_before.items()
+        ]
+    )
+    res["ratio"] = res.bytes_per_row_before / res.bytes_per_row_after
+
+    return res
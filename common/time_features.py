@@ -0,0 +1,124 @@
+"""
+Vectorized tools transforming UNIX timestamps of commits into date
+details (date string, year, month, day, day of week, hour). They operate
+on whole columns at once instead of calling 'datetime.fromtimestamp' for
+each row, and are shared by the ETL and analysis services.
+
+Timezone policy: timestamps are always interpreted as UTC and converted
+to the timezone set as COMMITS_TIMEZONE in config, regardless of the
+timezone of the machine (or container) running the process. All derived
+values (dates, hours, days of activity) refer to this timezone.
+"""
+
+import numpy as np
+import pandas as pd
+
+from typing import Tuple
+
+from config.config import COMMITS_TIMEZONE
+
+# Format in which date will be stored in the Postgres database
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def to_local_datetime(unix_time: pd.Series, timezone: str = COMMITS_TIMEZONE) -> pd.Series:
+    """
+    Convert UNIX timestamps to datetimes in given timezone. Timezone info
+    is dropped afterwards, so results can be compared and subtracted the
+    same way as naive datetime objects.
+
+    :param unix_time: series containing UNIX timestamps (in seconds)
+    :param timezone: name of the timezone from the IANA database, e.g. 'UTC'
+        or 'Europe/Warsaw'
+    :return: series of datetime64 type
+    """
+
+    res = pd.to_datetime(unix_time, unit="s", utc=True).dt.tz_convert(timezone).dt.tz_localize(None)
+    return res
+
+
+def _get_calendar(days: np.ndarray) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Get calendar covering all the days from the input array. Commits of
+    the repository usually span a few thousands of days, so details of each
+    day (e.g. date string) can be computed once and then gathered for each
+    timestamp by the position of its day in the calendar.
+
+    :param days: array containing numbers of days since 1970-01-01
+    :return: tuple containing calendar as DatetimeIndex and positions of
+        input days in the calendar
+    """
+
+    first_day = days.min() if len(days) > 0 else 0
+    last_day = days.max() if len(days) > 0 else -1
+    calendar = pd.DatetimeIndex(np.arange(first_day, last_day + 1).astype("datetime64[D]"))
+
+    return calendar, days - first_day
+
+
+def _to_days_and_seconds(dates: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Transform datetimes to numbers of days and seconds since 1970-01-01.
+
+    :param dates: series of datetime64 type
+    :return: tuple containing arrays of days and seconds
+    """
+
+    seconds = dates.to_numpy().astype("datetime64[s]").astype(np.int64)
+    days = np.floor_divide(seconds, 86400)
+
+    return days, seconds
+
+
+def format_dates(dates: pd.Series) -> pd.Series:
+    """
+    Transform datetimes to strings in the DATE_FORMAT format. 'strftime'
+    is called once for each day of the calendar instead of each element.
+
+    :param dates: series of datetime64 type
+    :return: series of strings
+    """
+
+    days, _ = _to_days_and_seconds(dates)
+    calendar, positions = _get_calendar(days)
+
+    res = pd.Series(
+        calendar.strftime(DATE_FORMAT).to_numpy(dtype=object)[positions],
+        index=dates.index
+    )
+
+    return res
+
+
+def get_time_features(unix_time: pd.Series, timezone: str = COMMITS_TIMEZONE) -> pd.DataFrame:
+    """
+    Retrieve all date details from UNIX timestamps, including:
+        - date_str - date in the DATE_FORMAT format
+        - commit_year
+        - commit_month
+        - commit_month_day
+        - commit_week_day - ISO day of week (Monday is 1, Sunday is 7)
+        - commit_hour
+
+    :param unix_time: series containing UNIX timestamps (in seconds)
+    :param timezone: name of the timezone from the IANA database
+    :return: DataFrame with the same index as input series, containing
+        columns listed above
+    """
+
+    days, seconds = _to_days_and_seconds(to_local_datetime(unix_time, timezone))
+    calendar, positions = _get_calendar(days)
+
+    res = pd.DataFrame(
+        {
+            "date_str": calendar.strftime(DATE_FORMAT).to_numpy(dtype=object)[positions],
+            "commit_year": calendar.year.to_numpy(dtype=np.int64)[positions],
+            "commit_month": calendar.month.to_numpy(dtype=np.int64)[positions],
+            "commit_month_day": calendar.day.to_numpy(dtype=np.int64)[positions],
+            "commit_week_day": (days + 3) % 7 + 1,  # 1970-01-01 was Thursday
+            "commit_hour": (seconds - days * 86400) // 3600
+        },
+        index=unix_time.index
+    )
+
+    return res
@@ -22,9 +22,32 @@ POSTGRES_DB = "commits_analyzer"
 POSTGRES_USER = "commits_analyzer"
 POSTGRES_PASSWORD = "gheJasl34asFD"
 
+### DATABASE BACKEND
+# Database storing tables of analyzed repositories:
+# - 'postgres' - postgres server (the 'db' service of docker compose)
+# - 'sqlite' - embedded SQLite database stored in a single file
+#   (EMBEDDED_DB_PATH), doesn't require any server. The ETL, analysis and
+#   dashboard open the same file, so they can also run outside docker.
+#   Requires the 'per_repo' tables layout
+DB_BACKEND = "postgres"
+
+# Path of the SQLite database file (directory is created if it doesn't
+# exist). It's mounted into all the docker compose services
+EMBEDDED_DB_PATH = "db_files/commits_analyzer.db"
+
+# Maximum time (in seconds) of waiting for the SQLite database locked by
+# another process or thread. Only one of them writes at a time - chunks of
+# commits are loaded in separate short transactions, so it should cover the
+# final transaction of loading single repository (appending new commits,
+# loading aggregated tables and swap), or loading of the whole repository
+# preprocessed in memory (see PREPROCESSING_MODE)
+EMBEDDED_DB_BUSY_TIMEOUT_S = 600
+
 ### CONFIGURATION OF RAW .CSV FILES
-# Format of file containing general information
-GENERAL_INFO_FORMAT = "'%H;%ae;%an;%at;%ce;%cn'"
+# Columns of file containing general information (git pretty format
+# placeholders: hash, author email and name, UNIX timestamp, commiter email
+# and name)
+GENERAL_INFO_FORMAT = ["%H", "%ae", "%an", "%at", "%ce", "%cn"]
 
 # Names of output files
 OUTPUT_FILES = {
@@ -32,7 +55,8 @@ OUTPUT_FILES = {
     "merges_info": "merges_info.csv",
     "commits_info": "commits_general_info.csv",
     "commits_messages": "commits_messages.csv",
-    "insertions_deletions": "insertions_deletions.csv"
+    "insertions_deletions": "insertions_deletions.csv",
+    "commits_parents": "commits_parents.csv"
 }
 
 # Files headers
@@ -48,9 +72,59 @@ HEADERS = {
         "commiter_name"
     ],
     "commits_messages": ["commit_hash", "commit_message"],
-    "insertions_deletions": ["commit_hash", "insertions", "deletions"]
+    "insertions_deletions": ["commit_hash", "insertions", "deletions"],
+    "commits_parents": ["commit_hash", "parent_hashes"]
 }
 
+# Whether to extract number of insertions and deletions per commit. It requires
+# diffs of all commits, so the content of files needs to be available. If set
+# as False, only commits metadata is extracted and insertions_deletions.csv
+# contains headers only (insertions and deletions are empty in the database)
+EXTRACT_DIFF_STATS = True
+
+# Way of generating raw data files:
+# - 'single_traversal' - single 'git log' call, which output is split into all
+#   the files listed in OUTPUT_FILES (recommended)
+# - 'per_file' - separate 'git log' call for each file
+RAW_DATA_EXTRACTION_MODE = "single_traversal"
+
+# Way of retrieving number of insertions and deletions per commit in the
+# 'per_file' extraction mode:
+# - 'single_pass' - single streaming 'git log --shortstat' traversal (recommended)
+# - 'per_commit' - separate 'git show --shortstat' call for each commit (slow
+#   for big repositories, kept for comparison purposes)
+INSERTIONS_DELETIONS_RETRIEVAL_MODE = "single_pass"
+
+# Format of raw data files:
+# - 'csv' - semicolon separated .csv files
+# - 'parquet' - zstd compressed Parquet files
+# - 'arrow' - zstd compressed Arrow IPC files (the fastest to read)
+# Columnar formats ('parquet', 'arrow') are typed, authors and commiters are
+# dictionary encoded and files are read with memory mapping. They require
+# the pyarrow package and are available only in the 'single_traversal' mode
+RAW_DATA_FORMAT = "csv"
+
+# Whether git should use commit-graph files during raw data retrieval (if
+# repository has them, see WRITE_COMMIT_GRAPH). Can be switched off to
+# compare timings
+USE_COMMIT_GRAPH = True
+
+# Number of repositories for which raw data is generated at the same time
+RAW_DATA_WORKERS = 4
+
+# Way of finding the nearest merge of each commit:
+# - 'ancestry' - the earliest merge which has the commit as an ancestor, found
+#   using parents of all commits (recommended)
+# - 'timestamp' - the first merge made after the commit, on any branch (cheap,
+#   but the merge doesn't have to contain the commit)
+NEAREST_MERGE_METHOD = "ancestry"
+
+# Timezone (name from the IANA database, e.g. 'UTC' or 'Europe/Warsaw') to
+# which commits timestamps are converted before dates, days of week and hours
+# are derived from them. Timezone of the machine running the process is
+# never used, so results are the same regardless of where it's deployed
+COMMITS_TIMEZONE = "UTC"
+
 ### POSTGRES TABLES NAMES
 # Names of postgres databases
 DB_TABLES_NAMES = {
@@ -58,9 +132,195 @@ DB_TABLES_NAMES = {
     "authors_stats": "{0}_authors_stats",
     "messages_all_words": "{0}_messages_all_words",
     "messages_raw_words_freq": "{0}_messages_raw_words_freq",
-    "messages_stemmed_words_freq": "{0}_messages_stemmed_words_freq"
+    "messages_stemmed_words_freq": "{0}_messages_stemmed_words_freq",
+    "commits_daily": "{0}_commits_daily",
+    "commits_author_daily": "{0}_commits_author_daily",
+    "commits_hour_weekday": "{0}_commits_hour_weekday",
+    "changes_histogram": "{0}_changes_histogram",
+    "commits_days_to_merge": "{0}_commits_days_to_merge"
+}
+
+# Layout of tables in the database:
+# - 'per_repo' - separate set of tables for each repository, named according
+#   to DB_TABLES_NAMES
+# - 'partitioned' - single set of tables named according to
+#   DB_PARTITIONED_TABLES_NAMES, with the repo_name column, list-partitioned
+#   by repository (each repository is a partition). Allows queries over
+#   all the repositories, requires postgres
+DB_TABLES_LAYOUT = "per_repo"
+
+DB_PARTITIONED_TABLES_NAMES = {
+    "general_info": "general_commits_info",
+    "authors_stats": "authors_stats",
+    "messages_all_words": "messages_all_words",
+    "messages_raw_words_freq": "messages_raw_words_freq",
+    "messages_stemmed_words_freq": "messages_stemmed_words_freq",
+    "commits_daily": "commits_daily",
+    "commits_author_daily": "commits_author_daily",
+    "commits_hour_weekday": "commits_hour_weekday",
+    "changes_histogram": "changes_histogram",
+    "commits_days_to_merge": "commits_days_to_merge"
+}
+
+### INCREMENTAL ETL
+# Extract and load only commits added since the previous run. Watermark (tips
+# of all refs at the moment of extraction) is stored in the database for each
+# repository. If history was rewritten since the previous run (e.g. after
+# force-push) the repository is fully rebuilt.
+INCREMENTAL_ETL = True
+
+# Name of the table storing watermarks
+WATERMARKS_TABLE_NAME = "etl_watermarks"
+
+# Name of the file, stored next to raw .csv files, describing whether
+# given extraction was incremental
+EXTRACTION_STATE_FILE = "extraction_state.json"
+
+### STREAMING ETL
+# Parse git output into chunks of commits which are preprocessed and loaded
+# to the database one by one, without writing raw .csv files. Raw .csv files
+# are still generated if CLEAN_RAW_DATA is False (debug mode), so they can
+# be inspected after the pipeline is finished
+STREAMING_ETL = True
+
+# Maximum number of commits processed at once in the streaming and chunked
+# modes (actual size of chunks is limited by PREPROCESSING_MEMORY_BUDGET_MB)
+STREAMING_CHUNK_SIZE = 50000
+
+### OUT-OF-CORE PREPROCESSING
+# Way of preprocessing raw .csv files:
+# - 'in_memory' - whole files are loaded and preprocessed at once
+# - 'chunked' - files are read and preprocessed in chunks, row-level tables
+#   are loaded to the database chunk by chunk and aggregated tables are
+#   merged from partial results (recommended for very large repositories)
+PREPROCESSING_MODE = "in_memory"
+
+# Memory budget (in megabytes) of preprocessing in the chunked and streaming
+# modes. Chunks are sized so that estimated memory usage doesn't exceed it,
+# processing fails if aggregated tables alone don't fit into it. In the
+# streaming mode it's split between repositories processed at the same time
+PREPROCESSING_MEMORY_BUDGET_MB = 2048
+
+### PREPROCESSING BACKEND
+# Engine which preprocesses raw data files in the 'in_memory' mode:
+# - 'pandas' - pandas joins and aggregations
+# - 'duckdb' - SQL queries run in the embedded DuckDB database (multithreaded,
+#   memory limited to PREPROCESSING_MEMORY_BUDGET_MB, above which data is
+#   spilled to disk; split between PREPROCESSING_WORKERS). Results are the
+#   same, it requires the duckdb package
+# Streaming ETL and the 'chunked' mode always use pandas
+PREPROCESSING_BACKEND = "pandas"
+
+# Number of threads used by DuckDB (None - number of CPU cores). When
+# repositories are preprocessed in parallel, each process uses at most
+# its share of CPU cores (number of cores / PREPROCESSING_WORKERS)
+DUCKDB_THREADS = None
+
+### DATABASE LOADING
+# Method of loading tables to the postgres database:
+# - 'copy' - rows are streamed with the COPY FROM STDIN command (fast bulk load)
+# - 'insert' - rows are inserted with INSERT statements ('DataFrame.to_sql' default)
+# Other databases (e.g. SQLite used by benchmarks) always use INSERT statements
+DB_LOADING_METHOD = "copy"
+
+# Replaced tables are loaded into staging tables and swapped with the existing
+# ones in a single transaction, so the dashboard never sees missing or
+# half-filled tables. Whether staging tables are created as UNLOGGED in
+# postgres - rows are loaded without writing WAL, tables are set LOGGED
+# right before the swap
+DB_UNLOGGED_STAGING = True
+
+# Maximum time (in milliseconds) the swap waits for queries reading the
+# swapped tables - new queries would wait behind it otherwise - and number
+# of attempts made before loading fails
+DB_SWAP_LOCK_TIMEOUT_MS = 2000
+DB_SWAP_RETRIES = 10
+
+### DATABASE CONNECTIONS
+# Engines of the services connecting to the database. Each process creates
+# single engine per service, shared by all its threads (see
+# database.get_db_engine). Parameters of the pool of connections:
+# - pool_size - number of connections kept open
+# - max_overflow - number of additional connections opened under load
+# - pool_timeout - maximum time (in seconds) of waiting for a free connection
+# - pool_recycle - connections older than this (in seconds) are replaced
+#   before they are dropped by the server or network (-1 - never)
+# - pool_pre_ping - whether connections are checked before they are used
+# and settings of sessions:
+# - statement_timeout_ms - queries running longer are cancelled (None - no
+#   limit, applied only to postgres)
+# - read_only - whether transactions can only read data
+# The ETL runs few long bulk loads (see DB_LOADING_WORKERS), while the
+# dashboard runs many short queries which shouldn't block each other
+DB_ENGINES_SETTINGS = {
+    "etl": {
+        "pool_size": 4,
+        "max_overflow": 4,
+        "pool_timeout": 60,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": None,
+        "read_only": False
+    },
+    "analysis": {
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 60,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 300000,
+        "read_only": True
+    },
+    "dashboard": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 5,
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 5000,
+        "read_only": True
+    }
 }
 
+### PARALLEL LOADING
+# Number of processes preprocessing raw data of different repositories at the
+# same time (1 - repositories are preprocessed and loaded one by one). Each
+# repository is loaded to the database as soon as it's preprocessed, while
+# the next ones are still being preprocessed. Memory budget of preprocessing
+# ('chunked' mode and 'duckdb' backend) and CPU cores used by DuckDB are
+# split between the processes
+PREPROCESSING_WORKERS = 4
+
+# Maximum number of repositories loaded to the database at the same time
+# (number of database connections used for loading)
+DB_LOADING_WORKERS = 2
+
+### MIRROR POOL
+# Keep bare mirrors of analyzed repositories between runs and only update them
+# with 'git fetch', instead of cloning them as submodules and deleting after
+# raw data is generated
+USE_MIRROR_POOL = True
+
+# Directory in which mirrors are stored
+MIRRORS_DIR = "cache/mirrors"
+
+# Maximum total size of mirrors in gigabytes - least recently used mirrors
+# are evicted when it's exceeded
+MIRRORS_DISK_BUDGET_GB = 20
+
+# Strategy of cloning mirrors:
+# - 'full' - all objects are downloaded
+# - 'blobless' - partial clone without files contents ('--filter=blob:none');
+#   they are fetched lazily, only when diff stats are computed
+# - 'treeless' - partial clone containing only commits ('--filter=tree:0');
+#   recommended only if EXTRACT_DIFF_STATS is False
+# - 'auto' - 'treeless' if EXTRACT_DIFF_STATS is False, 'full' otherwise
+CLONE_STRATEGY = "auto"
+
+# Write commit-graph files (with changed-paths Bloom filters, unless mirror is
+# treeless) after each update of mirrors
+WRITE_COMMIT_GRAPH = True
+
 ### LOCAL PATHS
 # Directory in which we would like to store repos as submodules
 # during the ETL process
@@ -70,6 +330,10 @@ SUBMODULES_DIR = "submodules_repo/submodules"
 # ETL process
 RAW_DATA_DIR = "raw_data"
 
+# Directory in which cache of words stems is persisted between runs (set
+# None to keep it only in memory)
+STEM_CACHE_DIR = "cache/stems"
+
 # Directory in which analysis results will be saved
 ANALYSIS_RESULTS_DIR = "results"
 
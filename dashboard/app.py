@@ -3,7 +3,9 @@ Dash application
 """
 
 # Import packages
+from flask import jsonify
 from dash import Dash, html, dcc, Input, Output, callback
+from database.get_db_engine import get_pool_metrics
 from dashboard.utils import get_names_of_availables_repos
 from dashboard.callbacks import get_callbacks
 from dashboard.tabs_components import *
@@ -77,6 +79,15 @@ def render_tab_content(tab_name: str) -> html.Div:
 get_callbacks(app)
 
 
+@app.server.route("/db_pool_metrics")
+def db_pool_metrics():
+    """
+    Get statistics of database connections checkouts of the dashboard
+    (see database.get_db_engine.get_pool_metrics).
+    """
+    return jsonify(get_pool_metrics())
+
+
 # Run the app
 if __name__ == '__main__':
     app.run(debug=True, host="0.0.0.0")
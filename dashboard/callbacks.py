@@ -9,15 +9,26 @@ import base64
 import dash_bootstrap_components as dbc
 
 from io import BytesIO
+from sqlalchemy import Engine
 
 from dash.dash import Dash
 from dash import Input, Output
-from config.config import DB_TABLES_NAMES
 from database.get_db_engine import get_db_engine
+from database.rollups import describe_histogram
+from database.tables_layout import select_repo_table
 from config.config import TOP_N_CONTRIBUTORS_DASHBOARD, TOP_N_WORDS_DASHBOARD, DASHBOARD_SD_OUTLIERS_BORDER
 from wordcloud import WordCloud
 
-_ENGINE = get_db_engine(inside_compose_network=True)
+
+def _get_engine() -> Engine:
+    """
+    Get database engine of the dashboard, shared by all the callbacks (see
+    database.get_db_engine) - pool of connections and read-only sessions
+    with short statement timeout configured for interactive queries.
+
+    :return: Engine object
+    """
+    return get_db_engine(inside_compose_network=True, service="dashboard")
 
 
 def _render_word_cloud_image(freq_table: pd.DataFrame):
@@ -68,23 +79,18 @@ def get_callbacks(app: Dash):
         :param repo_name: name of selected repository
         :param agg_period: aggregation period - might be a day or month
         """
-        tab_name = DB_TABLES_NAMES.get("general_info").format(repo_name)
-        sql_query = 'SELECT date_str, commit_hash FROM public."{0}"'.format(
-            tab_name
-        )
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        sql_query = select_repo_table("commits_daily", repo_name, ["date_str", "commits_num"])
+        df = pd.read_sql_query(sql_query, _get_engine())
         df["date_dt"] = pd.to_datetime(df.date_str)
         if agg_period == "Day":
-            df_agg = df.groupby("date_dt").agg(
-                commits_num=("commit_hash", "count")
-            ).reset_index()
+            df_agg = df[["date_dt", "commits_num"]].sort_values("date_dt")
         else:
             df_agg = df.assign(
                 date_dt=pd.to_datetime(df.date_str).dt.strftime("%Y-%m")
             ).groupby(
                 "date_dt"
             ).agg(
-                commits_num=("commit_hash", "count")
+                commits_num=("commits_num", "sum")
             ).reset_index()
 
             df_agg["date_dt"] = pd.to_datetime(df_agg.date_dt)
@@ -107,11 +113,10 @@ def get_callbacks(app: Dash):
 
         :param repo_name: name of selected repository
         """
-        tab_name = DB_TABLES_NAMES.get("authors_stats").format(repo_name)
-        sql_query = 'SELECT author_name, number_of_insertions, number_of_commits FROM public."{0}"'.format(
-            tab_name
+        sql_query = select_repo_table(
+            "authors_stats", repo_name, ["author_name", "number_of_insertions", "number_of_commits"]
         )
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        df = pd.read_sql_query(sql_query, _get_engine())
 
         top_commits_tab = df[["author_name", "number_of_commits"]].sort_values(
             "number_of_commits", ascending=False
@@ -160,19 +165,15 @@ def get_callbacks(app: Dash):
         :param word_type: type of words to analyze (either 'raw' or 'stemmed')
         """
         if word_type == "raw":
-            tab_name = DB_TABLES_NAMES.get("messages_raw_words_freq").format(repo_name)
+            table_type = "messages_raw_words_freq"
             word_col_name = "raw_word"
             freq_col_name = "raw_word_freq"
         else:
-            tab_name = DB_TABLES_NAMES.get("messages_stemmed_words_freq").format(repo_name)
+            table_type = "messages_stemmed_words_freq"
             word_col_name = "stemmed_word"
             freq_col_name = "stemmed_word_freq"
-        sql_query = 'SELECT {0}, {1} FROM public."{2}"'.format(
-            word_col_name,
-            freq_col_name,
-            tab_name
-        )
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        sql_query = select_repo_table(table_type, repo_name, [word_col_name, freq_col_name])
+        df = pd.read_sql_query(sql_query, _get_engine())
 
         img = BytesIO()
         _render_word_cloud_image(df).save(img, format="PNG")
@@ -206,28 +207,25 @@ def get_callbacks(app: Dash):
 
         :param repo_name: name of selected repository
         """
-        tab_name = DB_TABLES_NAMES.get("general_info").format(repo_name)
-        sql_query = 'SELECT DISTINCT author_name FROM public."{0}"'.format(
-            tab_name
-        )
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        sql_query = select_repo_table("commits_author_daily", repo_name, ["author_name"], distinct=True)
+        df = pd.read_sql_query(sql_query, _get_engine())
         res = ["All"] + df.author_name.to_list()
         return res, "All"
 
     def _generate_heatmap_data(date_df: pd.DataFrame, dates_range: pd.DatetimeIndex) -> pd.DataFrame:
         """
-        Transform pandas dataframe containing column denoting date of a
-        commit to dataframe suitable for heatmap needs.
+        Transform pandas dataframe containing numbers of commits per day
+        to dataframe suitable for heatmap needs.
 
-        :param date_df: input DataFrame containing single column 'date_str'
-            in format "%Y-%m-%d"
+        :param date_df: input DataFrame containing columns 'date_str' and
+            'commits_num'
         :param date_range: date range to plot the heatmap
         :return: DataFrame suitable for heatmap, with weekdays in rows and
             year + number of week in column
         """
 
         df_commits_count_added = date_df.groupby("date_str").agg(
-            commits_count=("date_str", "count")
+            commits_count=("commits_num", "sum")
         )
 
         # Transform index to DateTime
@@ -257,13 +255,10 @@ def get_callbacks(app: Dash):
         :param repo_name: name of the repository
         :return: date range in the form of DateTimeIndex object
         """
-        tab_name = DB_TABLES_NAMES.get("general_info").format(repo_name)
+        # date_str is the primary key, so both values are read from its index
+        sql_query = select_repo_table("commits_daily", repo_name, ["MIN(date_str)", "MAX(date_str)"])
 
-        sql_min_date = 'SELECT MIN(TO_DATE(date_str, \'YYYY-MM-DD\')) FROM public."{0}"'.format(tab_name)
-        sql_max_date = 'SELECT MAX(TO_DATE(date_str, \'YYYY-MM-DD\')) FROM public."{0}"'.format(tab_name)
-
-        min_date_val = pd.read_sql_query(sql_min_date, _ENGINE).iloc[0, 0]
-        max_date_val = pd.read_sql_query(sql_max_date, _ENGINE).iloc[0, 0]
+        min_date_val, max_date_val = pd.read_sql_query(sql_query, _get_engine()).iloc[0]
 
         res = pd.date_range(min_date_val, max_date_val)
 
@@ -284,16 +279,17 @@ def get_callbacks(app: Dash):
         :param repo_name: name of selected repository
         :param author_name: name of author to plot ('All' as default)
         """
-        tab_name = DB_TABLES_NAMES.get("general_info").format(repo_name)
-        sql_query = 'SELECT date_str FROM public."{0}"'.format(tab_name)
         # In case when there is a quote sign in an author's name
         author_name = author_name.replace("'", "''")
         if author_name != "All":
-            sql_query += " WHERE author_name = \'{0}\'".format(author_name)
+            condition = "author_name = \'{0}\'".format(author_name)
+            sql_query = select_repo_table("commits_author_daily", repo_name, ["date_str", "commits_num"], condition)
+        else:
+            sql_query = select_repo_table("commits_daily", repo_name, ["date_str", "commits_num"])
 
         d_range = _get_date_range_from_db(repo_name)
 
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        df = pd.read_sql_query(sql_query, _get_engine())
         df_prepared = _generate_heatmap_data(df, d_range)
 
         fig = px.imshow(
@@ -304,26 +300,28 @@ def get_callbacks(app: Dash):
         fig.layout.height = 400
         return fig
 
-    def _generate_histogram_of_insertions(input_df: pd.DataFrame):
+    def _generate_histogram_of_insertions(input_df: pd.DataFrame, insertions_stats: pd.Series):
         """
         Generate histogram showing distribution of number of insertions
         across commits
 
-        :param input_df: data frame containing input data
-        :param col_name: name of column storing variable to plot
+        :param input_df: data frame containing numbers of insertions
+            ('insertions') and numbers of commits ('commits_num')
+        :param insertions_stats: statistics of number of insertions (see
+            database.rollups.describe_histogram)
         """
 
         # Set upper x lim to make the plot readable. It is calculated
         # as mean value of variable + x*standard deviation of variable
         # where 'x' comes from configuration file (SD_OUTLIERS_BORDER)
-        mean_val = input_df["insertions"].mean()
-        std_val = input_df["insertions"].std()
-        max_val = mean_val + (DASHBOARD_SD_OUTLIERS_BORDER*std_val)
+        max_val = insertions_stats["mean"] + (DASHBOARD_SD_OUTLIERS_BORDER*insertions_stats["std"])
         input_df_filtered = input_df[input_df["insertions"] < max_val]
 
         fig = px.histogram(
             input_df_filtered,
             x="insertions",
+            y="commits_num",
+            histfunc="sum",
             nbins=20
         )
 
@@ -343,14 +341,14 @@ def get_callbacks(app: Dash):
 
         :param repo_name: name of selected repository
         """
-        tab_name = DB_TABLES_NAMES.get("general_info").format(repo_name)
-        sql_query = 'SELECT commit_hash, insertions FROM public."{0}"'.format(
-            tab_name
+        sql_query = select_repo_table(
+            "changes_histogram", repo_name, ["lines AS insertions", "commits_num"], "change_type = 'insertions'"
         )
-        df = pd.read_sql_query(sql_query, _ENGINE)
+        df = pd.read_sql_query(sql_query, _get_engine())
 
-        histogram_fig = _generate_histogram_of_insertions(df)
-        insertions_stats = df.insertions.describe().to_frame(
+        insertions_summary = describe_histogram(df, "insertions", "insertions")
+        histogram_fig = _generate_histogram_of_insertions(df, insertions_summary)
+        insertions_stats = insertions_summary.to_frame(
         ).reset_index().rename(
             columns={"index": "Measure", "insertions": "Insertions"}
         ).round(2)
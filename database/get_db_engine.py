@@ -1,38 +1,309 @@
 """
-Get database engine
+Get database engine. Engines are created once per process and service (see
+DB_ENGINES_SETTINGS in config) and shared by all its threads, so connections
+are reused between requests of the dashboard and repositories loaded by the
+ETL. Each engine has a pool of connections configured for its workload
+(few long bulk loads or many short interactive queries) and measures how
+long connections are waited for.
+
+Database is either postgres server or embedded SQLite file (see DB_BACKEND
+in config). SQLite databases are opened in the WAL mode, so readers (the
+dashboard and analysis) don't block the ETL and aren't blocked by it, while
+the ETL workers take the write lock at the beginning of their transactions
+and wait for each other (see EMBEDDED_DB_BUSY_TIMEOUT_S).
 """
 
 import os
+import time
+import threading
 
 import logging.config
 from config.config import *
-from sqlalchemy import create_engine, Engine
+from typing import Dict, Union
+from sqlalchemy import create_engine, event, make_url, Connection, Engine, URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, ConnectionPoolEntry
 
 logging.config.fileConfig(os.path.join("config", "logging.conf"))
 logger = logging.getLogger("consoleLogger")
 
+_ENGINES: Dict[tuple, Engine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+class PoolMetrics:
+    """
+    Statistics of connections checkouts from the pool - time of waiting for
+    a free connection (or opening a new one) and number of checkouts which
+    failed because no connection was released in time (see 'pool_timeout').
+    """
+
+    def __init__(self):
+        """
+        Create an instance of the class with empty statistics
+        """
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def add(self, wait_time: float, timed_out: bool = False) -> None:
+        """
+        Add single checkout to the statistics.
+
+        :param wait_time: time of waiting for the connection in seconds
+        :param timed_out: whether checkout failed after 'pool_timeout'
+        """
+
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.total_wait += wait_time
+            self.max_wait = max(self.max_wait, wait_time)
+
+    def to_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Get current statistics.
+
+        :return: dictionary containing number of checkouts and timeouts and
+            mean and max time of waiting in milliseconds
+        """
+
+        with self._lock:
+            res = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": 1000 * self.total_wait / self.checkouts if self.checkouts > 0 else 0.0,
+                "max_wait_ms": 1000 * self.max_wait
+            }
+
+        return res
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    Default pool of SQLAlchemy engines measuring time of connections
+    checkouts (see PoolMetrics).
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Create an instance of the class - parameters are the same as
+        parameters of QueuePool
+        """
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> "MeteredQueuePool":
+        """
+        Create new pool with the same parameters (called when engine is
+        disposed), keeping the statistics.
+
+        :return: new pool
+        """
 
-def get_db_engine(inside_compose_network: bool = False) -> Engine:
+        res = super().recreate()
+        res.metrics = self.metrics
+
+        return res
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        """
+        Get connection from the pool, waiting for it if all connections
+        are used, and record time of waiting.
+
+        :return: connection from the pool
+        """
+
+        start = time.perf_counter()
+        try:
+            res = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.add(time.perf_counter() - start, timed_out=True)
+            raise
+
+        self.metrics.add(time.perf_counter() - start)
+
+        return res
+
+
+def get_db_url(inside_compose_network: bool = False, backend: str = DB_BACKEND) -> URL:
     """
-    Get database Engine object
+    Get URL of the database
 
     :param inside_compose_network: bool indicating whether connection is established
-        inside docker compose network or not
-    :return: Engine object
+        inside docker compose network or not (used only by postgres)
+    :param backend: type of the database - 'postgres' or 'sqlite' (see
+        DB_BACKEND in config)
+    :return: URL object
     """
 
+    if backend == "sqlite":
+        return URL.create("sqlite", database=EMBEDDED_DB_PATH)
+    elif backend != "postgres":
+        raise ValueError("Unknown database backend: '{0}'".format(backend))
+
     if inside_compose_network:
         PG_HOST = POSTGRES_HOST_COMPOSE
     else:
         PG_HOST = POSTGRES_HOST
 
-    connection_string = "postgresql://{username}:{password}@{host}:{port}/{db_name}".format(
+    res = URL.create(
+        "postgresql+psycopg2",
         username=POSTGRES_USER,
         password=POSTGRES_PASSWORD,
         host=PG_HOST,
-        port=POSTGRES_PORT,
-        db_name=POSTGRES_DB
+        port=int(POSTGRES_PORT),
+        database=POSTGRES_DB
+    )
+
+    return res
+
+
+def _set_up_sqlite_engine(engine: Engine, read_only: bool) -> None:
+    """
+    Configure connections of SQLite engine. The sqlite3 module begins
+    transactions only before data modifications, so DDL statements of the
+    tables swap (see ETL.table_swap) would be committed one by one - the
+    module's transactions handling is switched off and SQLAlchemy
+    transactions are begun explicitly instead. Writing transactions take
+    the write lock immediately, so concurrent writers wait for each other
+    instead of failing when they upgrade their locks.
+
+    :param engine: SQLite Engine object
+    :param read_only: whether connections can only read data
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable in the WAL mode, except of transactions committed right before power loss
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn: Connection) -> None:
+        conn.exec_driver_sql("BEGIN" if read_only else "BEGIN IMMEDIATE")
+
+
+def _create_engine(db_url: URL, service: str) -> Engine:
+    """
+    Create database engine with pool and sessions configured for given service.
+    Statement timeout is applied only to postgres databases.
+
+    :param db_url: URL of the database
+    :param service: name of the service (key of DB_ENGINES_SETTINGS)
+    :return: Engine object
+    """
+
+    settings = DB_ENGINES_SETTINGS.get(service)
+    if settings is None:
+        raise ValueError("Unknown database service: '{0}'".format(service))
+
+    connect_args = {}
+    if db_url.get_backend_name() == "postgresql":
+        options = []
+        if settings.get("statement_timeout_ms") is not None:
+            options.append("-c statement_timeout={0}".format(int(settings.get("statement_timeout_ms"))))
+        if settings.get("read_only"):
+            options.append("-c default_transaction_read_only=on")
+        connect_args["application_name"] = "commits_analyzer_{0}".format(service)
+        if options:
+            connect_args["options"] = " ".join(options)
+    elif db_url.get_backend_name() == "sqlite":
+        connect_args["timeout"] = EMBEDDED_DB_BUSY_TIMEOUT_S
+        if db_url.database and db_url.database != ":memory:" and os.path.dirname(db_url.database):
+            os.makedirs(os.path.dirname(db_url.database), exist_ok=True)
+
+    logger.info("Creating DB engine, service: '{0}'".format(service))
+    res = create_engine(
+        db_url,
+        poolclass=MeteredQueuePool,
+        pool_size=settings.get("pool_size"),
+        max_overflow=settings.get("max_overflow"),
+        pool_timeout=settings.get("pool_timeout"),
+        pool_recycle=settings.get("pool_recycle"),
+        pool_pre_ping=settings.get("pool_pre_ping"),
+        connect_args=connect_args
     )
-    logger.info("Creating DB engine")
-    engine = create_engine(connection_string)
-    return engine
+    if db_url.get_backend_name() == "sqlite":
+        _set_up_sqlite_engine(res, settings.get("read_only"))
+
+    return res
+
+
+def get_engine_for_url(db_url: Union[str, URL], service: str = "etl") -> Engine:
+    """
+    Get engine of given service connected to given database, creating it
+    the first time it's requested in the process.
+
+    :param db_url: URL of the database
+    :param service: name of the service (key of DB_ENGINES_SETTINGS)
+    :return: Engine object
+    """
+
+    db_url = make_url(db_url)
+    key = (service, db_url.render_as_string(hide_password=False))
+    with _ENGINES_LOCK:
+        if key not in _ENGINES:
+            _ENGINES[key] = _create_engine(db_url, service)
+        res = _ENGINES.get(key)
+
+    return res
+
+
+def get_db_engine(inside_compose_network: bool = False, service: str = "etl") -> Engine:
+    """
+    Get database Engine object shared by the whole process
+
+    :param inside_compose_network: bool indicating whether connection is established
+        inside docker compose network or not
+    :param service: name of the service using the engine (key of
+        DB_ENGINES_SETTINGS) - 'etl', 'analysis' or 'dashboard'
+    :return: Engine object
+    """
+
+    return get_engine_for_url(get_db_url(inside_compose_network), service)
+
+
+def get_pool_metrics() -> Dict[str, Dict[str, Union[int, float]]]:
+    """
+    Get statistics of connections checkouts of all engines created in the
+    process, together with current state of their pools.
+
+    :return: dictionary containing names of the services as keys and
+        dictionaries of statistics as values
+    """
+
+    with _ENGINES_LOCK:
+        engines = list(_ENGINES.items())
+
+    res = {}
+    for (service, _), engine in engines:
+        pool = engine.pool
+        metrics = pool.metrics.to_dict() if isinstance(pool, MeteredQueuePool) else {}
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                pool_size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0)
+            )
+        res[service] = metrics
+
+    return res
+
+
+def dispose_db_engines() -> None:
+    """
+    Close all connections of all engines created in the process.
+    """
+
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
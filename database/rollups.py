@@ -0,0 +1,61 @@
+"""
+Tools reading rollup tables (see ETL.rollups), shared by the analysis and
+dashboard. Rollups contain numbers of commits per key, so statistics of
+the original rows are calculated from the counts.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Column containing number of commits in all the rollup tables
+COUNT_COLUMN = "commits_num"
+
+
+def _get_quantile(values: np.ndarray, cum_counts: np.ndarray, q: float) -> float:
+    """
+    Get quantile of the values repeated given number of times, using
+    linear interpolation (the same as pandas' 'quantile' method).
+
+    :param values: sorted values
+    :param cum_counts: cumulative numbers of repetitions of the values
+    :param q: quantile to calculate, between 0 and 1
+    :return: value of the quantile
+    """
+
+    position = (cum_counts[-1] - 1) * q
+    lower, upper = np.searchsorted(cum_counts, [np.floor(position), np.ceil(position)], side="right")
+
+    res = values[lower] + (values[upper] - values[lower]) * (position - np.floor(position))
+
+    return float(res)
+
+
+def describe_histogram(histogram: pd.DataFrame, value_col_name: str, name: str = None) -> pd.Series:
+    """
+    Get the same statistics as pandas' 'describe' method would return for
+    the rows counted in the histogram.
+
+    :param histogram: table containing values and numbers of commits
+    :param value_col_name: name of column containing values
+    :param name: name of the output series
+    :return: series containing count, mean, std, min, quartiles and max
+    """
+
+    histogram = histogram.sort_values(value_col_name)
+    values = histogram[value_col_name].to_numpy(dtype=np.float64)
+    counts = histogram[COUNT_COLUMN].to_numpy(dtype=np.float64)
+    cum_counts = np.cumsum(counts)
+    count = cum_counts[-1] if len(cum_counts) > 0 else 0.0
+
+    if count == 0:
+        stats = [0.0] + [np.nan] * 7
+    else:
+        mean = np.sum(values * counts) / count
+        std = np.sqrt(np.sum(counts * (values - mean) ** 2) / (count - 1)) if count > 1 else np.nan
+        stats = [count, mean, std, values[0]] + [
+            _get_quantile(values, cum_counts, q) for q in (0.25, 0.5, 0.75)
+        ] + [values[-1]]
+
+    res = pd.Series(stats, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], name=name)
+
+    return res
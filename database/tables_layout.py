@@ -0,0 +1,141 @@
+"""
+Layout of tables storing data of analyzed repositories (see DB_TABLES_LAYOUT
+in config), shared by the ETL, analysis and dashboard:
+    - 'per_repo' - separate set of tables for each repository, with names
+        prefixed with the name of the repository (DB_TABLES_NAMES)
+    - 'partitioned' - single set of tables (DB_PARTITIONED_TABLES_NAMES)
+        with the repo_name column, list-partitioned by repository. Each
+        partition is a regular table, which can be loaded and queried
+        directly by the ETL, while the analysis and dashboard query the
+        parent tables - filter on repo_name is pruned to single partition,
+        queries without it read all the repositories
+"""
+
+import pandas as pd
+
+from typing import List, Optional, Union
+from sqlalchemy import Engine, Connection
+from config.config import DB_TABLES_LAYOUT, DB_TABLES_NAMES, DB_PARTITIONED_TABLES_NAMES
+
+# Column identifying repository in the partitioned layout (partition key)
+REPO_COLUMN = "repo_name"
+
+
+def is_partitioned() -> bool:
+    """
+    Check whether tables are stored in the partitioned layout.
+
+    :return: True in case of the 'partitioned' layout
+    """
+
+    if DB_TABLES_LAYOUT not in ("per_repo", "partitioned"):
+        raise ValueError("Unknown tables layout: '{0}'".format(DB_TABLES_LAYOUT))
+
+    return DB_TABLES_LAYOUT == "partitioned"
+
+
+def get_parent_table_name(table_type: str) -> str:
+    """
+    Get name of the partitioned table of given type, containing data of
+    all the repositories.
+
+    :param table_type: type of the table
+    :return: name of the table
+    """
+
+    return DB_PARTITIONED_TABLES_NAMES.get(table_type)
+
+
+def get_table_name(table_type: str, repo_name: str) -> str:
+    """
+    Get name of the table storing data of single repository - the table
+    prefixed with repo name or partition of the parent table.
+
+    :param table_type: type of the table
+    :param repo_name: name of the repository
+    :return: name of the table
+    """
+
+    if is_partitioned():
+        return "{0}__{1}".format(get_parent_table_name(table_type), repo_name)
+
+    return DB_TABLES_NAMES.get(table_type).format(repo_name)
+
+
+def quote_literal(value: str) -> str:
+    """
+    Quote string as SQL literal.
+
+    :param value: string to quote
+    :return: quoted string
+    """
+
+    return "'{0}'".format(value.replace("'", "''"))
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote name of the table or column as SQL identifier (the standard
+    double quotes, understood by postgres and SQLite). Tables are looked up
+    in the default schema of the database - 'public' in case of postgres.
+
+    :param name: name to quote
+    :return: quoted name
+    """
+
+    return '"{0}"'.format(name.replace('"', '""'))
+
+
+def select_repo_table(
+        table_type: str,
+        repo_name: Optional[str],
+        columns: List[str],
+        condition: Optional[str] = None,
+        distinct: bool = False
+) -> str:
+    """
+    Get SQL query reading columns of the table of single repository (or
+    all the repositories in the partitioned layout, if repo_name is None).
+
+    :param table_type: type of the table
+    :param repo_name: name of the repository
+    :param columns: columns (or expressions) to select
+    :param condition: additional condition of the WHERE clause
+    :param distinct: whether to select distinct rows
+    :return: SQL query
+    """
+
+    conditions = [condition] if condition is not None else []
+    if is_partitioned():
+        table_name = get_parent_table_name(table_type)
+        if repo_name is not None:
+            conditions.insert(0, "{0} = {1}".format(REPO_COLUMN, quote_literal(repo_name)))
+    else:
+        table_name = get_table_name(table_type, repo_name)
+
+    res = "SELECT {0}{1} FROM {2}".format(
+        "DISTINCT " if distinct else "", ", ".join(columns), quote_identifier(table_name)
+    )
+    if conditions:
+        res += " WHERE " + " AND ".join("({0})".format(c) for c in conditions)
+
+    return res
+
+
+def read_repo_table(table_type: str, repo_name: str, db_engine: Union[Engine, Connection]) -> pd.DataFrame:
+    """
+    Read the whole table of single repository.
+
+    :param table_type: type of the table
+    :param repo_name: name of the repository
+    :param db_engine: database Engine object or connection
+    :return: table as pandas DataFrame (without the repo_name column)
+    """
+
+    if not is_partitioned():
+        return pd.read_sql_table(get_table_name(table_type, repo_name), db_engine)
+
+    res = pd.read_sql_query(select_repo_table(table_type, repo_name, ["*"]), db_engine).drop(columns=REPO_COLUMN)
+
+    return res
+